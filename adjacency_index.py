@@ -0,0 +1,27 @@
+"""Creates the adjacency index of a directory of filtered comparisons so the features correlated with a given feature
+can be looked up without iterating through all the comparisons"""
+
+from sys import argv
+from time import time
+
+from utils.feat_index import FeatIndex
+from utils.adjacency_index import write_adjacency_index
+
+
+def main():
+    """Main method"""
+
+    comp_dict_dir: str = argv[1]
+    adjacency_index_dir: str = argv[2]
+    start_time: float = time()
+
+    write_adjacency_index(
+        comp_dict_dir=comp_dict_dir, adjacency_index_dir=adjacency_index_dir, feat_index=FeatIndex()
+    )
+
+    print('Time Creating The Adjacency Index: {:.2f} Minutes'.format((time() - start_time) / 60))
+    print('Saved The Adjacency Index To:', adjacency_index_dir)
+
+
+if __name__ == '__main__':
+    main()
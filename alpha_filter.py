@@ -2,11 +2,12 @@
 
 from sys import argv
 from os import mkdir
-from os.path import isdir, join
+from os.path import isdir, join, basename, normpath
 from pickle import dump
 
 from utils.utils import get_comp_key
 from utils.iterate_comp_dicts import IterByIdx
+from utils.heartbeat import Heartbeat
 
 
 def main():
@@ -30,7 +31,23 @@ def main():
 
     start_idx: int = comp_dict_iter.start_idx
     stop_idx: int = comp_dict_iter.stop_idx
+
+    # The heartbeats of the jobs of a run are named after the directory they save to
+    comp_dict_iter.heartbeat = Heartbeat(
+        run='alpha-filter-' + basename(normpath(alpha_filtered_dir)), job_id=idx, n_cells=stop_idx - start_idx
+    )
+
     comp_dict_iter()
+    save_filtered_comparisons(
+        alpha_filtered_dir=alpha_filtered_dir, start_idx=start_idx, stop_idx=stop_idx,
+        filtered_comparisons=filtered_comparisons
+    )
+    comp_dict_iter.heartbeat.finish()
+
+
+def save_filtered_comparisons(alpha_filtered_dir: str, start_idx: int, stop_idx: int, filtered_comparisons: dict):
+    """Saves the filtered comparisons of a section of the comparison dictionaries"""
+
     print('Number of filtered comparisons:', len(filtered_comparisons))
     filtered_comparisons_path: str = join(alpha_filtered_dir, '{}-{}.p'.format(start_idx, stop_idx))
     dump(filtered_comparisons, open(filtered_comparisons_path, 'wb'))
@@ -44,5 +61,11 @@ def filter_by_alpha(feat1: str, feat2: str, p: float, alpha: float, filtered_com
         filtered_comparisons[key] = p
 
 
+def merge_filtered_comparisons(kwargs: dict, other_kwargs: dict):
+    """Merges the filtered comparisons of another section into those of a section"""
+
+    kwargs['filtered_comparisons'].update(other_kwargs['filtered_comparisons'])
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,361 @@
+"""Benchmarks the statistical tests and the iteration and aggregation of the comparisons on seeded synthetic data sets
+of several sizes. Each benchmark runs in a process of its own and the number of pairs it processes per second and its
+peak resident set size are saved to a CSV so regressions show up between runs"""
+
+from sys import argv, executable
+from os import chdir, getcwd, makedirs, listdir, devnull, environ
+from os.path import abspath, dirname, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from subprocess import run
+from multiprocessing import Pool
+from contextlib import redirect_stdout
+from pickle import load, dump
+from time import time
+from pandas import DataFrame
+from numpy import ndarray, zeros, triu_indices, array_split
+from numpy.random import Generator, default_rng
+
+from utils.utils import (
+    get_type, compare, nom_nom_test, num_nom_test, num_num_test, NUMERIC_TYPE, NOMINAL_TYPE, ALPHAS_PATH,
+    COL_TYPES_PICKLE_PATH, DOMAIN_TABLE_TYPE
+)
+from utils.synthetic_data import write_synthetic_data
+from utils.col_store import ColStore, get_col_store_dir
+from utils.col_stats import ColStats, get_col_stats_dir
+from utils.comp_shards import make_shard, save_shard, save_headers, is_comp_file, count_comps
+from utils.iterate_comp_dicts import BasicDictIter, ShardIter
+from utils.feat_index import FeatIndex
+from utils.memory import get_peak_rss
+from inter_counts_table import make_table, count_shard
+
+DATA_PATH: str = 'data/data.csv'
+COMP_DICT_DIR: str = 'data/comp-dicts'
+CHECKPOINT_DIR: str = 'data/checkpoint'
+PIPELINE_SCRIPTS: list = ['col_store.py', 'col_stats.py', 'feat_index.py']
+LIST_DELIMINATOR: str = ','
+N_ADNIMERGE_COLS: int = 13
+N_SHARDS: int = 8
+ALPHA: float = 0.05
+SUPER_ALPHA: float = 1e-100
+DEFAULT_N_ROWS: int = 500
+DEFAULT_N_TEST_PAIRS: int = 2000
+
+BENCHMARK_KEY: str = 'Benchmark'
+N_COLS_KEY: str = 'Number Of Columns'
+N_ROWS_KEY: str = 'Number Of Rows'
+N_PAIRS_KEY: str = 'Number Of Pairs'
+SECONDS_KEY: str = 'Seconds'
+PAIRS_PER_SECOND_KEY: str = 'Pairs Per Second'
+START_RSS_KEY: str = 'Start Peak RSS (MB)'
+PEAK_RSS_KEY: str = 'Peak RSS (MB)'
+
+
+def main():
+    """Main method"""
+
+    out_path: str = abspath(argv[1])
+    sizes: list = [int(size) for size in argv[2].split(LIST_DELIMINATOR)]
+    n_rows: int = int(argv[3]) if len(argv) > 3 else DEFAULT_N_ROWS
+    n_test_pairs: int = int(argv[4]) if len(argv) > 4 else DEFAULT_N_TEST_PAIRS
+    seed: int = int(argv[5]) if len(argv) > 5 else 0
+
+    repo_dir: str = dirname(abspath(__file__))
+    cwd: str = getcwd()
+    results: list = []
+
+    for n_cols in sizes:
+        # The scripts read and write the data directory relative to the working directory so each size gets its own
+        work_dir: str = mkdtemp(prefix='benchmark-{}-'.format(n_cols))
+        chdir(work_dir)
+        make_data(repo_dir=repo_dir, n_rows=n_rows, n_cols=n_cols, seed=seed)
+
+        for name, benchmark in BENCHMARKS:
+            print('Running {} On {} Columns'.format(name, n_cols))
+            n_pairs, seconds, start_rss, peak_rss = run_benchmark(
+                benchmark=benchmark, n_test_pairs=n_test_pairs, seed=seed
+            )
+
+            pairs_per_second: float = n_pairs / seconds if seconds > 0 else float('inf')
+            print('{} Pairs In {:.2f} Seconds, {:.1f} Pairs Per Second, {:.1f} MB Peak RSS'.format(
+                n_pairs, seconds, pairs_per_second, peak_rss
+            ))
+
+            results.append({
+                BENCHMARK_KEY: name,
+                N_COLS_KEY: n_cols,
+                N_ROWS_KEY: n_rows,
+                N_PAIRS_KEY: n_pairs,
+                SECONDS_KEY: seconds,
+                PAIRS_PER_SECOND_KEY: pairs_per_second,
+                START_RSS_KEY: start_rss,
+                PEAK_RSS_KEY: peak_rss
+            })
+
+        chdir(cwd)
+        rmtree(work_dir)
+
+    DataFrame(results).to_csv(out_path, index=False)
+    print('Saved The Benchmark Results To:', out_path)
+
+
+def make_data(repo_dir: str, n_rows: int, n_cols: int, seed: int):
+    """Makes a synthetic data set with about as many expression as MRI columns, runs the scripts that prepare it for the
+    comparisons and saves random comparisons of all its columns as shards"""
+
+    makedirs('data')
+    n_numeric: int = max(n_cols - N_ADNIMERGE_COLS, 2)
+
+    write_synthetic_data(
+        data_path=DATA_PATH, col_types_path=COL_TYPES_PICKLE_PATH, n_rows=n_rows, n_expression=n_numeric // 2,
+        n_mri=n_numeric - n_numeric // 2, seed=seed
+    )
+
+    env: dict = dict(environ, PYTHONPATH=repo_dir)
+
+    for script in PIPELINE_SCRIPTS:
+        run([executable, join(repo_dir, script), DATA_PATH], env=env, check=True, capture_output=True)
+
+    headers: list = ColStore(get_col_store_dir(data_path=DATA_PATH)).headers
+    n_headers: int = len(headers)
+    corrected_alpha: float = ALPHA / (n_headers * (n_headers - 1) // 2)
+    dump((ALPHA, corrected_alpha), open(ALPHAS_PATH, 'wb'))
+
+    # Like the real comparisons, which are filtered by the corrected alpha, the p-values are below the corrected alpha
+    # and spread over many orders of magnitude
+    rng: Generator = default_rng(seed)
+    feat1, feat2 = triu_indices(n_headers, k=1)
+    p: ndarray = corrected_alpha * rng.random(len(feat1)) ** 8
+    makedirs(COMP_DICT_DIR)
+    save_headers(shard_dir=COMP_DICT_DIR, headers=headers)
+
+    for i, positions in enumerate(array_split(range(len(p)), N_SHARDS)):
+        shard: ndarray = make_shard(feat1=feat1[positions], feat2=feat2[positions], p=p[positions])
+        save_shard(path=join(COMP_DICT_DIR, '{}.npy'.format(str(i).zfill(7))), shard=shard)
+
+
+def run_benchmark(benchmark: callable, n_test_pairs: int, seed: int) -> tuple:
+    """Runs a benchmark in a new process so its peak memory is its own, returning the number of pairs it processed, the
+    seconds it took and the peak resident set size of its process before and after it ran"""
+
+    with Pool(processes=1, maxtasksperchild=1) as pool:
+        return pool.apply(time_benchmark, (benchmark, n_test_pairs, seed))
+
+
+def time_benchmark(benchmark: callable, n_test_pairs: int, seed: int) -> tuple:
+    """Runs a benchmark, which times itself so its setup is left out, with its output discarded"""
+
+    start_rss: float = get_peak_rss()
+
+    with open(devnull, 'w') as f, redirect_stdout(f):
+        n_pairs, seconds = benchmark(n_test_pairs=n_test_pairs, seed=seed)
+
+    return n_pairs, seconds, start_rss, get_peak_rss()
+
+
+def load_dataset_cols() -> tuple:
+    """Loads the columns of the data set as lists, as the tests take them, along with the column types and statistics"""
+
+    col_store: ColStore = ColStore(get_col_store_dir(data_path=DATA_PATH))
+    col_stats: ColStats = ColStats(get_col_stats_dir(data_path=DATA_PATH))
+    dataset_cols: dict = {}
+
+    for i, col in zip(col_store.numeric_headers, col_store.numeric):
+        dataset_cols[col_store.headers[i]] = col.tolist()
+
+    for i, codes, categories in zip(col_store.nominal_headers, col_store.category_codes, col_store.categories):
+        dataset_cols[col_store.headers[i]] = [categories[code] for code in codes.tolist()]
+
+    return dataset_cols, col_store.col_types, col_stats
+
+
+def sample_pairs(headers: list, other_headers: list, n_pairs: int, seed: int) -> list:
+    """Samples pairs of distinct headers, the first from one list and the second from another"""
+
+    rng: Generator = default_rng(seed)
+    pairs: list = []
+
+    while len(pairs) < n_pairs:
+        header1: str = headers[rng.integers(len(headers))]
+        header2: str = other_headers[rng.integers(len(other_headers))]
+
+        if header1 != header2:
+            pairs.append((header1, header2))
+
+    return pairs
+
+
+def get_headers_by_type(dataset_cols: dict, col_types: dict) -> tuple:
+    """Gets the numeric and the nominal headers"""
+
+    numeric: list = [header for header in dataset_cols if get_type(header=header, col_types=col_types) == NUMERIC_TYPE]
+    nominal: list = [header for header in dataset_cols if get_type(header=header, col_types=col_types) == NOMINAL_TYPE]
+    return numeric, nominal
+
+
+def benchmark_compare(n_test_pairs: int, seed: int) -> tuple:
+    """Times compare on random pairs of any types, with the column statistics as the comparison jobs use them"""
+
+    dataset_cols, col_types, col_stats = load_dataset_cols()
+    headers: list = list(dataset_cols)
+    pairs: list = sample_pairs(headers=headers, other_headers=headers, n_pairs=n_test_pairs, seed=seed)
+    start_time: float = time()
+
+    for header1, header2 in pairs:
+        compare(header1=header1, header2=header2, dataset_cols=dataset_cols, col_types=col_types, col_stats=col_stats)
+
+    return len(pairs), time() - start_time
+
+
+def benchmark_nom_nom_test(n_test_pairs: int, seed: int) -> tuple:
+    """Times nom_nom_test on random pairs of nominal columns"""
+
+    dataset_cols, col_types, _ = load_dataset_cols()
+    _, nominal = get_headers_by_type(dataset_cols=dataset_cols, col_types=col_types)
+    pairs: list = sample_pairs(headers=nominal, other_headers=nominal, n_pairs=n_test_pairs, seed=seed)
+    start_time: float = time()
+
+    for header1, header2 in pairs:
+        nom_nom_test(list1=dataset_cols[header1], list2=dataset_cols[header2])
+
+    return len(pairs), time() - start_time
+
+
+def benchmark_num_nom_test(n_test_pairs: int, seed: int) -> tuple:
+    """Times num_nom_test on random pairs of a numeric and a nominal column, with the category codes from the column
+    statistics as compare uses them"""
+
+    dataset_cols, col_types, col_stats = load_dataset_cols()
+    numeric, nominal = get_headers_by_type(dataset_cols=dataset_cols, col_types=col_types)
+    pairs: list = sample_pairs(headers=numeric, other_headers=nominal, n_pairs=n_test_pairs, seed=seed)
+    start_time: float = time()
+
+    for header1, header2 in pairs:
+        num_nom_test(
+            numbers=dataset_cols[header1], categories=dataset_cols[header2],
+            category_codes=col_stats.get_category_codes(header=header2)
+        )
+
+    return len(pairs), time() - start_time
+
+
+def benchmark_num_num_test(n_test_pairs: int, seed: int) -> tuple:
+    """Times num_num_test on random pairs of numeric columns"""
+
+    dataset_cols, col_types, _ = load_dataset_cols()
+    numeric, _ = get_headers_by_type(dataset_cols=dataset_cols, col_types=col_types)
+    pairs: list = sample_pairs(headers=numeric, other_headers=numeric, n_pairs=n_test_pairs, seed=seed)
+    start_time: float = time()
+
+    for header1, header2 in pairs:
+        num_num_test(list1=dataset_cols[header1], list2=dataset_cols[header2])
+
+    return len(pairs), time() - start_time
+
+
+def benchmark_compare_batch(n_test_pairs: int, seed: int) -> tuple:
+    """Times compare_batch on every unit of work of a single job that compares all the columns, in this process"""
+
+    # The filter alpha is loaded when the module is imported, so it is imported once the alphas are saved
+    import col_comparison_dict
+
+    col_store: ColStore = ColStore(get_col_store_dir(data_path=DATA_PATH))
+    n_cols: int = len(col_store.headers)
+    col_comparison_dict.col_types = col_store.col_types
+    col_comparison_dict.col_stats = ColStats(get_col_stats_dir(data_path=DATA_PATH))
+    col_comparison_dict.headers = col_store.headers
+    col_comparison_dict.header_offset = 0
+    col_comparison_dict.checkpoint_dir = CHECKPOINT_DIR
+    col_comparison_dict.set_dataset_cols(col_store=col_store, store_start=0, store_stop=n_cols)
+    col_comparison_dict.set_numeric_cols()
+    makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+    arg_list: list = col_comparison_dict.get_arg_list(
+        n_rows=n_cols, n_cols=n_cols, n_threads=1, done_rows=zeros(n_cols, dtype=bool)
+    )
+
+    start_time: float = time()
+
+    for args in arg_list:
+        col_comparison_dict.compare_batch(args)
+
+    seconds: float = time() - start_time
+
+    for shared_memory in col_comparison_dict.shared_memories:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    rmtree(CHECKPOINT_DIR)
+    return n_cols * (n_cols - 1) // 2, seconds
+
+
+def count_comparison(feat1: str, feat2: str, p: float, n_comps: list):
+    """Counts a comparison"""
+
+    n_comps[0] += 1
+
+
+def count_shard_comparisons(feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, n_comps: list):
+    """Counts the comparisons in a shard"""
+
+    n_comps[0] += len(p)
+
+
+def benchmark_comp_dict_iter(n_test_pairs: int, seed: int) -> tuple:
+    """Times the iteration through every comparison in the comparison shards one comparison at a time"""
+
+    n_comps: list = [0]
+    comp_dict_iter: BasicDictIter = BasicDictIter(
+        comp_dict_dir=COMP_DICT_DIR, use_p=True, func=count_comparison, n_comps=n_comps
+    )
+
+    start_time: float = time()
+    comp_dict_iter()
+    return n_comps[0], time() - start_time
+
+
+def benchmark_shard_iter(n_test_pairs: int, seed: int) -> tuple:
+    """Times the iteration through the comparison shards a whole shard at a time"""
+
+    n_comps: list = [0]
+    comp_dict_iter: ShardIter = ShardIter(comp_dict_dir=COMP_DICT_DIR, func=count_shard_comparisons, n_comps=n_comps)
+    start_time: float = time()
+    comp_dict_iter()
+    return n_comps[0], time() - start_time
+
+
+def benchmark_count_shard(n_test_pairs: int, seed: int) -> tuple:
+    """Times counting the comparisons in the comparison shards into a counts table"""
+
+    n_comps: int = sum(
+        count_comps(path=join(COMP_DICT_DIR, file_name)) for file_name in listdir(COMP_DICT_DIR)
+        if is_comp_file(file_name)
+    )
+
+    _, corrected_alpha = load(open(ALPHAS_PATH, 'rb'))
+
+    comp_dict_iter: ShardIter = ShardIter(
+        comp_dict_dir=COMP_DICT_DIR, func=count_shard, feat_index=FeatIndex(),
+        table=make_table(table_type=DOMAIN_TABLE_TYPE), super_alpha=SUPER_ALPHA, corrected_alpha=corrected_alpha,
+        table_type=DOMAIN_TABLE_TYPE, header_codes={}
+    )
+
+    start_time: float = time()
+    comp_dict_iter()
+    return n_comps, time() - start_time
+
+
+BENCHMARKS: list = [
+    ('compare', benchmark_compare),
+    ('nom_nom_test', benchmark_nom_nom_test),
+    ('num_nom_test', benchmark_num_nom_test),
+    ('num_num_test', benchmark_num_num_test),
+    ('compare_batch', benchmark_compare_batch),
+    ('CompDictIter', benchmark_comp_dict_iter),
+    ('ShardIter', benchmark_shard_iter),
+    ('count_shard', benchmark_count_shard)
+]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Finds the Benjamini-Hochberg threshold of a false discovery rate over all the comparisons and writes the shards of
+the comparisons below it. The threshold is found from the log p-value histograms that the jobs made alongside their
+shards, with a pass over the shards for the exact p-values of only the bins that may hold it, so the p-values are never
+all held in memory or sorted. The filtered shards are written in the same format as the shards they came from"""
+
+from sys import argv
+from os import listdir, makedirs
+from os.path import join
+from pickle import dump
+from numpy import ndarray, empty, isin, concatenate, cumsum, sort, searchsorted
+
+from utils.comp_shards import is_comp_file, load_shard, save_shard, load_headers, save_headers, SHARD_EXT, P_FIELD
+from utils.iterate_comp_dicts import ShardIter
+from utils.log_p_hist import (
+    merge_log_p_hists, get_candidate_bins, get_threshold_in_bin, get_bins, LOG_P_HIST_EXT
+)
+
+FDR_ALPHAS_PATH: str = 'data/fdr-alphas.p'
+
+# The most p-values that are read into memory in one pass over the shards to find the threshold
+MAX_REFINE_P_VALUES: int = 2 ** 26
+
+
+def main():
+    """Main method"""
+
+    comp_dict_dir: str = argv[1]
+    q: float = float(argv[2])
+    out_dir: str = argv[3]
+
+    log_p_hist_paths: list = [
+        join(comp_dict_dir, file_name) for file_name in sorted(listdir(comp_dict_dir))
+        if file_name.endswith(LOG_P_HIST_EXT)
+    ]
+
+    shard_names: list = sorted(file_name for file_name in listdir(comp_dict_dir) if is_comp_file(file_name))
+
+    # Each job makes the histogram of its shard so every shard must have one
+    assert all(file_name.endswith(SHARD_EXT) for file_name in shard_names)
+    assert len(log_p_hist_paths) == len(shard_names)
+
+    log_p_hist, exact_alpha, shard_alpha = merge_log_p_hists(paths=log_p_hist_paths)
+    n_tests: int = int(log_p_hist.sum())
+    print('False Discovery Rate:', q)
+    print('Number Of Comparisons / Statistical Tests:', n_tests)
+
+    # The threshold is at most the rate so the p-values up to it must be exact
+    assert q <= exact_alpha
+
+    threshold: float = find_threshold(comp_dict_dir=comp_dict_dir, log_p_hist=log_p_hist, q=q, shard_alpha=shard_alpha)
+
+    if threshold is None:
+        print('No Comparisons Reach The Benjamini-Hochberg Threshold')
+        return
+
+    print('Benjamini-Hochberg Threshold:', threshold)
+    dump((q, threshold), open(FDR_ALPHAS_PATH, 'wb'))
+
+    n_kept: int = filter_shards(
+        comp_dict_dir=comp_dict_dir, shard_names=shard_names, threshold=threshold, out_dir=out_dir
+    )
+
+    print('Number Of Comparisons Below The Threshold:', n_kept)
+
+
+def find_threshold(comp_dict_dir: str, log_p_hist: ndarray, q: float, shard_alpha: float) -> float:
+    """Finds the Benjamini-Hochberg threshold from the exact p-values of the bins of the histogram that may hold it,
+    from the largest p-values down. The p-values of as many of the bins as fit in memory are read in each pass over the
+    shards"""
+
+    n_tests: int = int(log_p_hist.sum())
+    n_up_to: ndarray = cumsum(log_p_hist)
+    candidates: list = get_candidate_bins(log_p_hist=log_p_hist, q=q).tolist()
+    print('Number Of Bins That May Hold The Threshold:', len(candidates))
+
+    while len(candidates) > 0:
+        n_bins: int = 1
+
+        while n_bins < len(candidates) and log_p_hist[candidates[:n_bins + 1]].sum() <= MAX_REFINE_P_VALUES:
+            n_bins += 1
+
+        bins: list = candidates[:n_bins]
+        candidates: list = candidates[n_bins:]
+        bin_p_values: list = [empty(0)]
+        ShardIter(comp_dict_dir=comp_dict_dir, func=collect_bin_p_values, bins=bins, bin_p_values=bin_p_values)()
+
+        # The bins increase with the p-values so sorting the p-values groups them by bin
+        all_p: ndarray = sort(concatenate(bin_p_values))
+        all_bins: ndarray = get_bins(p=all_p)
+
+        for b in bins:
+            p: ndarray = all_p[searchsorted(all_bins, b, side='left'):searchsorted(all_bins, b, side='right')]
+
+            # The shards only have the p-values up to the alpha they were filtered at
+            if len(p) != log_p_hist[b]:
+                print('ERROR: The threshold may be above the shard alpha {}'.format(shard_alpha))
+                exit(1)
+
+            threshold: float = get_threshold_in_bin(p=p, n_below=n_up_to[b] - log_p_hist[b], n_tests=n_tests, q=q)
+
+            if threshold is not None:
+                return threshold
+
+    return None
+
+
+def collect_bin_p_values(feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, bins: list, bin_p_values: list):
+    """Adds the p-values of a shard that are in the given bins of the histogram to the collected p-values"""
+
+    p: ndarray = p[p <= 1.0]
+    bin_p_values.append(p[isin(get_bins(p=p), bins)])
+
+
+def filter_shards(comp_dict_dir: str, shard_names: list, threshold: float, out_dir: str) -> int:
+    """Writes the comparisons of each shard with p-values at or below the threshold to a shard of the same name in the
+    output directory, returning the number of comparisons written"""
+
+    makedirs(out_dir, exist_ok=True)
+    save_headers(shard_dir=out_dir, headers=load_headers(shard_dir=comp_dict_dir))
+    n_kept: int = 0
+
+    for shard_name in shard_names:
+        shard: ndarray = load_shard(path=join(comp_dict_dir, shard_name))
+        kept: ndarray = shard[shard[P_FIELD] <= threshold]
+        save_shard(path=join(out_dir, shard_name), shard=kept)
+        n_kept += len(kept)
+
+    return n_kept
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,42 @@
 """Creates a column comparison dictionary, a mapping of a tuple of 2 column headers to a p-value which is the result of
-a statistical test between those 2 columns. This dictionary represents and is more efficient than a comparison matrix"""
+a statistical test between those 2 columns. This dictionary represents and is more efficient than a comparison matrix.
+It is saved as a comparison shard, which holds the indices of the 2 headers rather than the headers themselves"""
 
-from os import popen
 from pandas import DataFrame, read_csv
-from pickle import dump
 from time import time
 from sys import argv, stdout
+from os.path import isfile, splitext
+from os import getpid
 from multiprocessing import Pool, freeze_support
-from math import ceil
 from pickle import load
+from numpy import (
+	ndarray, array, searchsorted, nonzero, newaxis, arange, full, where, unique, cumsum, zeros, ones, isin, minimum,
+	maximum, int64, argsort
+)
 
 from utils.utils import (
-	get_type, NUMERIC_TYPE, get_col_types, START_IDX_KEY, STOP_IDX_KEY, N_ROWS_KEY, compare, get_comp_key,
-	ALPHAS_PATH
+	get_type, NUMERIC_TYPE, START_IDX_KEY, STOP_IDX_KEY, N_ROWS_KEY, ALPHAS_PATH, NORMALITY_ALPHA
+)
+from utils.batch_tests import num_num_tests, num_num_row_tests, nom_nom_tests, num_nom_tests, standardize, moments
+from utils.col_stats import ColStats, get_col_stats_dir
+from utils.col_store import ColStore, get_col_store_dir
+from utils.comp_shards import (
+	make_shard, merge_shards, save_shard, save_headers, FEAT1_FIELD, FEAT2_FIELD, P_FIELD, SHARD_EXT
+)
+from utils.memory import share_array, get_peak_rss, get_private_memory
+from utils.heartbeat import Heartbeat
+from utils.checkpoints import (
+	get_checkpoint_dir, save_partial_shard, load_partial_shard, record_progress, load_progress, remove_checkpoint,
+	get_partial_profile_path, load_partial_profiles, get_partial_log_p_hist_path, get_partial_top_k_path
+)
+from utils.log_p_hist import (
+	make_log_p_hist, add_to_log_p_hist, save_log_p_hist, merge_log_p_hists, get_log_p_hist_path
+)
+from utils.lsh import get_screened, merge_screened, get_recall, LSH_BAND_SIZE, VERIFY_FRACTION
+from utils.top_k import TopK, save_top_k_table, load_top_k_table, merge_top_k_tables, get_top_k_path
+from utils.profiling import (
+	enable_profiling, is_profiling, profiled, add_time, get_profile, save_profile, reset_profile, merge_profiles,
+	report_profile, PROFILE_EXT
 )
 
 """
@@ -27,21 +51,77 @@ Base Number Of Rows: 55
 
 dataset_cols: dict = {}
 col_types: dict = {}
+col_stats: ColStats = None
 headers: list = []
+header_offset: int = 0
+header_rank: ndarray = None
+numeric_headers: ndarray = None
+nominal_headers: ndarray = None
+nominal_codes: ndarray = None
+numeric_cols: ndarray = None
+rank_cols: ndarray = None
+standardized_cols: ndarray = None
+rank_standardized_cols: ndarray = None
+not_normal_cols: ndarray = None
+checkpoint_dir: str = None
+heartbeat: Heartbeat = None
+log_p_hist: ndarray = None
+top_k: TopK = None
+num_num_screened: dict = None
+num_num_samples: dict = None
+shared_memories: list = []
 PTID_COL: str = 'PTID'
-CSV_DELIMINATOR: str = ','
+ROW_BLOCK_SIZE: int = 16
+NUMERIC_BLOCK_SIZE: int = 4096
+UNITS_PER_THREAD: int = 8
+
+# The estimated cost of each type of comparison relative to a numeric to numeric comparison, which is a single cell of a
+# matrix product, used to balance the work of the threads
+NUM_NUM_COST: float = 1.0
+NUM_NOM_COST: float = 8.0
+NOM_NOM_COST: float = 4.0
 FILTER_ALPHA = load(open(ALPHAS_PATH, 'rb'))[1]
 
 assert type(FILTER_ALPHA) is float
 
+# The alpha below which the tests compute exact p-values and the alpha that the comparisons in the shard are filtered
+# at, which are both the filter alpha unless the log p-value histogram of the false discovery rate is being made
+test_alpha: float = FILTER_ALPHA
+shard_alpha: float = FILTER_ALPHA
+
 
 def main():
 	"""Main method"""
 
 	global col_types
+	global col_stats
 	global headers
-
-	data_path, start_idx, stop_idx, n_rows, n_cores, out_dir = get_args()
+	global header_offset
+	global checkpoint_dir
+	global test_alpha
+	global shard_alpha
+	global log_p_hist
+	global top_k
+
+	data_path, job_n, start_idx, stop_idx, n_rows, n_cores, out_dir, profile, fdr_q, fdr_shard_alpha, k, lsh_bands, \
+		lsh_band_size = get_args()
+
+	# Profiling is also enabled by its environment variable. It must be enabled before the threads are forked
+	if profile:
+		enable_profiling()
+
+	# Given a false discovery rate, the histogram of the log p-values of every comparison is made for finding the
+	# Benjamini-Hochberg threshold, which is at most the rate, so the p-values are exact up to the rate
+	if fdr_q is not None:
+		test_alpha = max(FILTER_ALPHA, fdr_q)
+		shard_alpha = fdr_shard_alpha
+		log_p_hist = make_log_p_hist()
+		print('False Discovery Rate: {} | Shard Alpha: {}'.format(fdr_q, shard_alpha))
+
+	# Given a K, the K strongest comparisons of each feature in the shard are kept along with their effect sizes
+	if k is not None:
+		top_k = TopK(k=k)
+		print('Strongest Comparisons Kept Per Feature:', k)
 
 	# We don't want to begin at the PTID column
 	assert start_idx >= 2
@@ -54,66 +134,139 @@ def main():
 	print('Number Of Rows:', n_rows)
 	print('Number of Cores and Threads:', n_cores)
 
-	start_time: float = time()
+	# The indices in the shard refer to the headers of the whole column store, which are saved once for all the jobs
+	shard_dir: str = 'data/{}'.format(out_dir)
+	shard_path: str = '{}/{}{}'.format(shard_dir, str(start_idx).zfill(7), SHARD_EXT)
 
-	# Construct the data set from the input file as a mapping from a header to its corresponding column
-	df: str = get_cut_command_result(
-		start_idx=start_idx, stop_idx=stop_idx, data_path=data_path
-	)
-	df: list = df.split('\n')
+	if isfile(shard_path):
+		print('Shard Already Complete:', shard_path)
+		n_cells: int = get_n_cells(n_rows=n_rows, n_cols=stop_idx - start_idx + 1)
+		Heartbeat(run=out_dir, job_id=job_n, n_cells=n_cells, n_cells_done=n_cells).finish()
+		return
 
-	# Separate the headers from the rest of the data frame
-	headers = df[0].split(CSV_DELIMINATOR)
-	df: list = df[1:]
-	df.remove('')
-	assert '' not in df
+	# Completed units of rows are saved here so that the job can resume from them if it is restarted
+	checkpoint_dir = get_checkpoint_dir(shard_path=shard_path)
+	check_resumed_units()
+
+	start_time: float = time()
+
+	# Memory map the column store of the data set, of which only this process's section of columns will be read
+	col_store: ColStore = ColStore(get_col_store_dir(data_path=data_path))
 
 	# Load in the column types which will indicate whether a column is numeric or nominal
-	col_types = get_col_types()
+	col_types = col_store.col_types
+
+	# Load in the statistics of each column which are computed once for the whole data set
+	col_stats = ColStats(get_col_stats_dir(data_path=data_path))
+
+	# Fields of the data file are numbered from 1 and the first one is the PTID column which is not in the column store
+	store_start: int = start_idx - 2
+	store_stop: int = stop_idx - 1
+	headers = col_store.headers[store_start:store_stop]
+	header_offset = store_start
+	set_dataset_cols(col_store=col_store, store_start=store_start, store_stop=store_stop)
+	set_numeric_cols()
+
+	# Given a number of bands, only the numeric to numeric comparisons that are candidates of the locality sensitive
+	# hashing or in its verification sample get exact tests
+	if lsh_bands is not None:
+		set_num_num_screened(n_rows=n_rows, n_bands=lsh_bands, band_size=lsh_band_size)
+
+	setup_time: float = time() - start_time
+	print('Setup Time: {}'.format(setup_time))
+	freeze_support()
+
+	# The heartbeats of the jobs of a run are named after the directory of their shards
+	comparison_shard: ndarray = col_comparison_dict(n_rows=n_rows, n_threads=n_cores, run=out_dir, job_n=job_n)
+
+	# The setup is only added to the profile once the threads are done so that they do not inherit it
+	add_time(name='col_comparison_dict/setup', seconds=setup_time)
+
+	if num_num_screened is not None:
+		report_lsh_recall(comparison_shard=comparison_shard)
+
+	# The shard marks the job as complete so the files that go with it are saved before it, or a job killed in between
+	# would never save them
+	if is_profiling():
+		save_job_profile(profile_path=splitext(shard_path)[0] + PROFILE_EXT)
 
-	# Construct the data set from which this process's section of the column comparison dictionary will be computed
-	for i, row in enumerate(df):
-		row = row.split(CSV_DELIMINATOR)
+	if log_p_hist is not None:
+		save_job_log_p_hist(log_p_hist_path=get_log_p_hist_path(shard_path=shard_path))
 
-		assert len(row) == len(headers)
+	if top_k is not None:
+		save_job_top_k_table(top_k_path=get_top_k_path(shard_path=shard_path))
 
-		# Add each value of the current row to its respective column
-		for j, val in enumerate(row):
-			header: str = headers[j]
+	save_headers(shard_dir=shard_dir, headers=col_store.headers)
+	save_shard(path=shard_path, shard=comparison_shard)
+	remove_checkpoint(checkpoint_dir=checkpoint_dir)
+	heartbeat.finish()
 
-			if header not in dataset_cols:
-				dataset_cols[header] = []
+	for shared_memory in shared_memories:
+		shared_memory.close()
+		shared_memory.unlink()
 
-			col: list = dataset_cols[header]
 
-			if get_type(header=header, col_types=col_types) == NUMERIC_TYPE:
-				val: float = float(val)
+def set_dataset_cols(col_store: ColStore, store_start: int, store_stop: int):
+	"""Maps each header in this process's section of the data set to its memory mapped column in the column store,
+	records which of the columns are numeric and which are nominal and ranks the headers in sorted order"""
 
-			col.append(val)
+	global header_rank
+	global numeric_headers
+	global nominal_headers
+	global numeric_cols
+	global nominal_codes
 
-		# Validate that the row was added correctly to the data set's columns
-		for j, header in enumerate(headers):
-			if get_type(header=header, col_types=col_types) == NUMERIC_TYPE:
-				assert dataset_cols[header][i] == float(row[j])
-			else:
-				assert dataset_cols[header][i] == row[j]
+	numeric_start, numeric_stop = col_store.get_numeric_range(start=store_start, stop=store_stop)
+	nominal_start, nominal_stop = col_store.get_nominal_range(start=store_start, stop=store_stop)
+	numeric_cols = col_store.numeric[numeric_start:numeric_stop]
+	nominal_codes = col_store.category_codes[nominal_start:nominal_stop]
+	numeric_headers = col_store.numeric_headers[numeric_start:numeric_stop] - store_start
+	nominal_headers = col_store.nominal_headers[nominal_start:nominal_stop] - store_start
 
-		# Free the memory usage from the current row that has been saved in the columns dictionary
-		df[i] = None
-		del row
+	# The nominal columns are represented by the integer codes of their categories
+	for i, col in zip(numeric_headers, numeric_cols):
+		dataset_cols[headers[i]] = col
+
+	for i, col in zip(nominal_headers, nominal_codes):
+		dataset_cols[headers[i]] = col
 
-	# Free the memory usage from the cut command result and ensure the dataset columns were created from it correctly
-	del df
 	assert len(dataset_cols) == len(headers)
-	assert set(dataset_cols.keys()) == set(headers)
 
-	print('Setup Time: {}'.format(time() - start_time))
-	freeze_support()
+	# Comparing the ranks of two headers is the same as comparing the headers, without a string comparison per pair
+	header_rank = argsort(argsort(array(headers)))
+
+
+def set_numeric_cols():
+	"""Stacks the numeric columns into matrices of standardized values and standardized ranks so that the numeric to
+	numeric comparisons of a block of rows can be computed with a single matrix product. The normality and ranks of the
+	columns come from the column statistics. The matrices are put in shared memory so the threads all read the same
+	copy"""
+
+	global rank_cols
+	global standardized_cols
+	global rank_standardized_cols
+	global not_normal_cols
 
-	comparison_dict: dict = col_comparison_dict(n_rows=n_rows, n_threads=n_cores)
+	# The numeric columns of this section of the data set are a contiguous range of those in the column statistics
+	stats_start: int = col_stats.numeric_idx[headers[numeric_headers[0]]] if len(numeric_headers) > 0 else 0
+	stats_stop: int = stats_start + len(numeric_headers)
+	assert col_stats.numeric_headers[stats_start:stats_stop] == [headers[i] for i in numeric_headers]
 
-	with open('data/{}/{}.p'.format(out_dir, str(start_idx).zfill(7)), 'wb') as f:
-		dump(comparison_dict, f)
+	means: ndarray = col_stats.means[stats_start:stats_stop]
+	stds: ndarray = col_stats.stds[stats_start:stats_stop]
+	rank_cols = col_stats.ranks[stats_start:stats_stop]
+	ranks: ndarray = array(rank_cols, dtype=float)
+	not_normal_cols = col_stats.normality_p[stats_start:stats_stop] < NORMALITY_ALPHA
+	standardized_cols = standardize(data=numeric_cols, means=means, stds=stds)
+
+	# The mean of the ranks of n values is always (n + 1) / 2 but ties change their standard deviation
+	rank_means, rank_stds = moments(data=ranks)
+	rank_standardized_cols = standardize(data=ranks, means=rank_means, stds=rank_stds)
+
+	# The other columns are already memory mapped from the column store and the column statistics
+	standardized_memory, standardized_cols = share_array(array=standardized_cols)
+	rank_standardized_memory, rank_standardized_cols = share_array(array=rank_standardized_cols)
+	shared_memories.extend([standardized_memory, rank_standardized_memory])
 
 
 def get_args() -> tuple:
@@ -130,64 +283,254 @@ def get_args() -> tuple:
 	n_rows: int = inputs.loc[job_n][N_ROWS_KEY]
 	n_cores: int = int(argv[4])
 	out_dir: str = argv[5]
+	profile: bool = len(argv) > 6 and argv[6] == 'true'
+	fdr_q: float = float(argv[7]) if len(argv) > 7 and argv[7] != 'none' else None
+	fdr_shard_alpha: float = float(argv[8]) if len(argv) > 8 and argv[8] != 'none' else fdr_q
+	k: int = int(argv[9]) if len(argv) > 9 and argv[9] != 'none' else None
+	lsh_bands: int = int(argv[10]) if len(argv) > 10 and argv[10] != 'none' else None
+	lsh_band_size: int = int(argv[11]) if len(argv) > 11 else LSH_BAND_SIZE
+
+	return (
+		data_path, job_n, start_idx, stop_idx, n_rows, n_cores, out_dir, profile, fdr_q, fdr_shard_alpha, k, lsh_bands,
+		lsh_band_size
+	)
+
+
+def set_num_num_screened(n_rows: int, n_bands: int, band_size: int):
+	"""Finds the numeric columns to the right of each numeric row that get exact tests, which are its candidates from
+	the sign random projection sketches of the numeric columns and a sample of the rest for verifying the candidates'
+	recall"""
+
+	global num_num_screened
+	global num_num_samples
+
+	start_time: float = time()
+	rows: ndarray = arange(searchsorted(numeric_headers, n_rows))
+
+	candidates, samples = get_screened(
+		standardized=standardized_cols, rank_standardized=rank_standardized_cols, rows=rows, n_bands=n_bands,
+		band_size=band_size
+	)
+
+	num_num_screened = dict(zip(rows.tolist(), merge_screened(candidates=candidates, samples=samples)))
+	num_num_samples = dict(zip(rows.tolist(), samples))
+	n_pairs: int = sum(len(numeric_headers) - row - 1 for row in rows.tolist())
+	n_candidates: int = sum(len(row_candidates) for row_candidates in candidates)
+
+	print('LSH Bands: {} Of {} Bits | Candidates: {} Of {} Numeric Pairs ({:.2f}%) | Time: {}'.format(
+		n_bands, band_size, n_candidates, n_pairs, n_candidates / n_pairs * 100 if n_pairs > 0 else 0.0,
+		time() - start_time
+	))
 
-	return data_path, start_idx, stop_idx, n_rows, n_cores, out_dir
 
+def report_lsh_recall(comparison_shard: ndarray):
+	"""Prints the estimated recall of the candidates of the locality sensitive hashing, which is the fraction of the
+	significant numeric to numeric comparisons that are candidates, from the significant comparisons in the verification
+	sample"""
 
-def get_cut_command_result(start_idx: int, stop_idx: int, data_path: str) -> str:
-	"""Gets the portion of the data set needed for this section of the column comparison dictionary"""
+	# The comparisons in the shard are only those up to the shard alpha
+	alpha: float = min(FILTER_ALPHA, shard_alpha)
+	n_headers: int = len(headers) + header_offset
+	significant: ndarray = comparison_shard[comparison_shard[P_FIELD] <= alpha]
+	feat1: ndarray = significant[FEAT1_FIELD].astype(int64)
+	feat2: ndarray = significant[FEAT2_FIELD].astype(int64)
+	significant_keys: ndarray = minimum(feat1, feat2) * n_headers + maximum(feat1, feat2)
 
-	# Computation of the comparison dictionary is divided into sections, each of which is performed by its own process
-	# Each section of the comparison dictionary represents a number of rows in its equivalent comparison matrix
-	# The cut command will load in the section of the data set for this process
-	command: str = 'cut -f {}-{} -d \',\' {}'.format(start_idx, stop_idx, data_path)
-	return popen(command).read()
+	# The numeric headers increase so the row of each pair is its smaller header
+	n_found: int = 0
+	n_sample_found: int = 0
 
+	for row, screened in num_num_screened.items():
+		row_key: int = (numeric_headers[row] + header_offset) * n_headers
+		screened_keys: ndarray = row_key + numeric_headers[screened] + header_offset
+		sample_keys: ndarray = row_key + numeric_headers[num_num_samples[row]] + header_offset
+		n_sample_found += int(isin(sample_keys, significant_keys).sum())
+		n_found += int(isin(screened_keys, significant_keys).sum())
 
-def col_comparison_dict(n_rows: int, n_threads: int) -> dict:
+	n_found -= n_sample_found
+
+	print('Significant Numeric Pairs At {}: {} Candidates, {} Of {} In The Verification Sample Of {:.2%}'.format(
+		alpha, n_found, n_sample_found, sum(len(sample) for sample in num_num_samples.values()), VERIFY_FRACTION
+	))
+
+	print('Estimated LSH Recall: {:.4f}'.format(get_recall(n_found=n_found, n_sample_found=n_sample_found)))
+
+
+def check_resumed_units():
+	"""Checks that the units of rows completed before the job was restarted, if it was, have the log p-value histograms
+	and top K tables that the job merges, before any work is done. A unit completed without the false discovery rate or
+	the top K table has none and the merged one would miss its comparisons"""
+
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+
+	if log_p_hist is not None and not all(
+		isfile(get_partial_log_p_hist_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))
+		for start, stop, _ in progress
+	):
+		print('ERROR: Units of rows completed without the false discovery rate have no log p-value histogram')
+		print('Remove The Checkpoint Directory To Start Over:', checkpoint_dir)
+		exit(1)
+
+	if top_k is not None and not all(
+		isfile(get_partial_top_k_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))
+		for start, stop, _ in progress
+	):
+		print('ERROR: Units of rows completed without the top K table have no top K table')
+		print('Remove The Checkpoint Directory To Start Over:', checkpoint_dir)
+		exit(1)
+
+
+def save_job_log_p_hist(log_p_hist_path: str):
+	"""Merges the log p-value histograms of the units of rows, which each thread saved next to its partial shard, and
+	saves the histogram of the job next to its shard. Every unit has one since the resumed units were checked"""
+
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+
+	paths: list = [
+		get_partial_log_p_hist_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop)
+		for start, stop, _ in progress
+	]
+
+	merged, exact_alpha, merged_shard_alpha = merge_log_p_hists(paths=paths)
+
+	assert exact_alpha == test_alpha and merged_shard_alpha == shard_alpha
+
+	save_log_p_hist(path=log_p_hist_path, log_p_hist=merged, exact_alpha=test_alpha, shard_alpha=shard_alpha)
+	print('Number Of Tests In The Log P-Value Histogram:', int(merged.sum()))
+
+
+def save_job_top_k_table(top_k_path: str):
+	"""Merges the top K tables of the units of rows, which each thread saved next to its partial shard, and saves the
+	top K table of the job next to its shard. Every unit has one since the resumed units were checked, and they must all
+	have the same K"""
+
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+
+	paths: list = [
+		get_partial_top_k_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop) for start, stop, _ in progress
+	]
+
+	tables: list = []
+
+	for path in paths:
+		table, k = load_top_k_table(path=path)
+
+		assert k == top_k.k
+
+		tables.append(table)
+
+	merged: ndarray = merge_top_k_tables(tables=tables, k=top_k.k)
+	save_top_k_table(path=top_k_path, table=merged, k=top_k.k)
+	print('Number Of Entries In The Top K Table:', len(merged))
+
+
+def save_job_profile(profile_path: str):
+	"""Merges the profiles of the units of rows, which each thread saved next to its partial shard, with the profile of
+	the main process and saves the merged profile of the job next to its shard"""
+
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+	profiles: list = load_partial_profiles(checkpoint_dir=checkpoint_dir, progress=progress)
+	profile: dict = merge_profiles(profiles=profiles + [get_profile()])
+	save_profile(path=profile_path, profile=profile)
+
+	print('Number Of Units Profiled: {} Of {}'.format(len(profiles), len(progress)))
+	report_profile(profile=profile)
+
+
+def col_comparison_dict(n_rows: int, n_threads: int, run: str, job_n: int) -> ndarray:
 	"""Constructs the column comparison dictionary with comparisons of each column in a dataset to every other column.
 	This dictionary represents the portion of a square matrix up and to the right of the diagonal, considering the
-	diagonal itself is useless and everything below and to the left of it is redundant"""
+	diagonal itself is useless and everything below and to the left of it is redundant. The progress of the job is
+	recorded in its heartbeats as each unit of rows is completed"""
+
+	global heartbeat
 
 	n_cols: int = len(headers)
-	comparison_dict: dict = {}
+
+	# Get the units of rows that were completed before the job was restarted, if it was
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+	done_rows: ndarray = zeros(n_rows, dtype=bool)
+
+	for start, stop, _ in progress:
+		assert not done_rows[start:stop].any()
+		done_rows[start:stop] = True
+
+	print('Number Of Rows Already Completed:', int(done_rows.sum()))
+
+	row_cells: ndarray = n_cols - arange(n_rows) - 1
+	heartbeat = Heartbeat(
+		run=run, job_id=job_n, n_cells=get_n_cells(n_rows=n_rows, n_cols=n_cols),
+		n_cells_done=int(row_cells[done_rows].sum())
+	)
 
 	# Initialize the thread pool
 	p = Pool(processes=n_threads)
 
-	# Get the list of arguments for each thread which has its own batch of arguments
-	arg_list: list = get_arg_list(n_rows=n_rows, n_cols=n_cols, n_threads=n_threads)
+	# Get the list of arguments for each unit of work, which are handed to the threads as they become free
+	arg_list: list = get_arg_list(n_rows=n_rows, n_cols=n_cols, n_threads=n_threads, done_rows=done_rows)
 
 	start_time: float = time()
-
-	# Compute the sub dictionary in each thread according to that thread's batch
-	sub_dicts: list = p.map(compare_batch, arg_list)
-
-	stdout.write('Time Threading: ' + str(time() - start_time))
+	unit_results: list = []
+
+	# Compute the partial shard of each unit in whichever thread is free, the most expensive units first, recording each
+	# unit as completed once its partial shard is saved
+	for unit_result in p.imap_unordered(compare_batch, arg_list, chunksize=1):
+		start, stop, n_skipped = unit_result[:3]
+		record_progress(checkpoint_dir=checkpoint_dir, start=start, stop=stop, n_skipped=n_skipped)
+		unit_results.append(unit_result)
+		n_unit_cells: int = int(row_cells[start:stop].sum())
+		heartbeat.add(n_cells=n_unit_cells, n_pairs=n_unit_cells, rss=unit_result[5])
+
+	threading_time: float = time() - start_time
+	stdout.write('Time Threading: ' + str(threading_time))
+	add_time(name='col_comparison_dict/threading', seconds=threading_time)
+	report_utilization(unit_results=unit_results, threading_time=threading_time)
 
 	p.close()
 	start_time: float = time()
 	n_comps_skipped: int = 0
 
-	# Add all the sub-dictionaries to the main column comparison dictionary
-	for sub_dict, n_skipped in sub_dicts:
-		comparison_dict.update(sub_dict)
+	# Add all the partial shards, including those from before a restart, to the main column comparison shard in the
+	# order of their rows
+	progress: list = load_progress(checkpoint_dir=checkpoint_dir)
+	assert sum(stop - start for start, stop, _ in progress) == n_rows
+
+	comparison_shard: ndarray = merge_shards([
+		load_partial_shard(checkpoint_dir=checkpoint_dir, start=start, stop=stop) for start, stop, _ in progress
+	])
+
+	for _, _, n_skipped in progress:
 		n_comps_skipped += n_skipped
-		del sub_dict
 
 	stdout.write('Time Stitching Batch Threads: ' + str(time() - start_time))
+	add_time(name='col_comparison_dict/stitching', seconds=time() - start_time)
 
 	# Ensure the dictionary represents the number of cells that would be in this process's section of the matrix
+	n_total_cells: int = get_n_cells(n_rows=n_rows, n_cols=n_cols)
+	assert len(comparison_shard) == n_total_cells - n_comps_skipped
+
+	# Ensure no comparison was computed twice
+	keys: ndarray = comparison_shard[FEAT1_FIELD].astype(int) * (len(headers) + header_offset)
+	keys += comparison_shard[FEAT2_FIELD]
+	assert len(unique(keys)) == len(keys)
+
+	return comparison_shard
+
+
+def get_n_cells(n_rows: int, n_cols: int) -> int:
+	"""Gets the number of cells in a job's section of the conceptual matrix, which are up and to the right of the
+	diagonal"""
+
 	n_cells_left_and_below_diagonal: int = (n_rows ** 2 - n_rows) // 2
 	n_cells_in_diagonal: int = n_rows
-	n_total_cells: int = n_rows * n_cols - n_cells_left_and_below_diagonal - n_cells_in_diagonal
-	assert len(comparison_dict) == n_total_cells - n_comps_skipped
+	return n_rows * n_cols - n_cells_left_and_below_diagonal - n_cells_in_diagonal
 
-	return comparison_dict
 
-
-def get_arg_list(n_rows: int, n_cols: int, n_threads: int) -> list:
-	"""Creates the list of arguments for each thread"""
+def get_arg_list(n_rows: int, n_cols: int, n_threads: int, done_rows: ndarray) -> list:
+	"""Creates the list of arguments for each unit of work. Row i of the conceptual matrix has n_cols - i - 1 cells so
+	rather than giving each thread the same number of rows, the rows are split into contiguous units of about the same
+	estimated cost, several per thread so a thread that finishes early can take another unit. Rows that were completed
+	before a restart are left out"""
 
 	all_indices: list = []
 
@@ -198,51 +541,331 @@ def get_arg_list(n_rows: int, n_cols: int, n_threads: int) -> list:
 		indices: tuple = (i, (i + 1, n_cols))
 		all_indices.append(indices)
 
-	batch_size: int = ceil(n_rows / n_threads)
+	row_costs: ndarray = where(done_rows, 0.0, get_row_costs(n_rows=n_rows, n_cols=n_cols))
+	cum_costs: ndarray = cumsum(row_costs)
+	n_units: int = min(int((~done_rows).sum()), n_threads * UNITS_PER_THREAD)
+
+	# Cut the rows where the cumulative cost crosses each multiple of the cost of a unit and where the completed rows
+	# begin and end
+	unit_costs: ndarray = arange(1, n_units) * cum_costs[-1] / n_units
+	done_changes: ndarray = nonzero(done_rows[1:] != done_rows[:-1])[0] + 1
+	cuts: list = searchsorted(cum_costs, unit_costs, side='right').tolist() + done_changes.tolist() + [n_rows]
+	stops: list = sorted(set(cuts) - {0})
 	args: list = []
 	start: int = 0
 
-	for i in range(n_threads):
-		# If on the last batch, only use the indices that go to the last conceptual row
-		if n_rows - start < batch_size:
-			stop: int = n_rows
-			assert i == n_threads - 1
-		else:
-			stop: int = start + batch_size
+	for stop in stops:
+		if not done_rows[start]:
+			args.append(all_indices[start:stop])
 
-		args.append(all_indices[start:stop])
 		start: int = stop
 
-	assert sum(args, []) == all_indices
+	assert sum(args, []) == [indices for indices, done in zip(all_indices, done_rows) if not done]
+
+	# Start the most expensive units first so the cheap ones fill in the gaps at the end
+	unit_costs: list = [cum_costs[batch[-1][0]] - cum_costs[batch[0][0]] + row_costs[batch[0][0]] for batch in args]
+	args: list = [batch for _, batch in sorted(zip(unit_costs, args), key=lambda unit: -unit[0])]
 
 	return args
 
 
-def compare_batch(args: tuple) -> dict:
-	"""Runs the correlation algorithm on all the columns in a thread's batch"""
+def get_row_costs(n_rows: int, n_cols: int) -> ndarray:
+	"""Estimates the cost of each row of this process's section of the conceptual matrix from the number of numeric and
+	nominal columns to its right and the cost of each type of comparison"""
+
+	is_numeric: ndarray = zeros(n_cols, dtype=bool)
+	is_numeric[numeric_headers] = True
+
+	# The number of numeric columns to the right of each column
+	n_numeric_right: ndarray = cumsum(is_numeric[::-1])[::-1] - is_numeric
+	n_nominal_right: ndarray = arange(n_cols - 1, -1, -1) - n_numeric_right
+	n_numeric_right: ndarray = n_numeric_right[:n_rows]
+	n_nominal_right: ndarray = n_nominal_right[:n_rows]
+	is_numeric: ndarray = is_numeric[:n_rows]
+
+	numeric_costs: ndarray = n_numeric_right * NUM_NUM_COST + n_nominal_right * NUM_NOM_COST
+	nominal_costs: ndarray = n_numeric_right * NUM_NOM_COST + n_nominal_right * NOM_NOM_COST
+	return where(is_numeric, numeric_costs, nominal_costs)
 
+
+def report_utilization(unit_results: list, threading_time: float):
+	"""Prints the time each thread spent comparing columns as a percentage of the time spent threading and the peak
+	resident set size and private memory of each thread in megabytes. Since the columns are shared, the private memory
+	of a thread should not depend on the number of threads"""
+
+	busy_times: dict = {}
+	n_units: dict = {}
+	peak_rss: dict = {}
+	private_memory: dict = {}
+
+	for _, _, _, pid, busy_time, rss, private in unit_results:
+		busy_times[pid] = busy_times.get(pid, 0.0) + busy_time
+		n_units[pid] = n_units.get(pid, 0) + 1
+		peak_rss[pid] = max(peak_rss.get(pid, 0.0), rss)
+
+		if private is not None:
+			private_memory[pid] = max(private_memory.get(pid, 0.0), private)
+
+	print()
+	print('Main Process: {:.2f} MB Peak RSS'.format(get_peak_rss()))
+
+	for pid in sorted(busy_times):
+		print('Thread {}: {} Units, {:.2f} Seconds, {:.2f}% Utilization, {:.2f} MB Peak RSS, {} MB Private'.format(
+			pid, n_units[pid], busy_times[pid], busy_times[pid] / threading_time * 100, peak_rss[pid],
+			'{:.2f}'.format(private_memory[pid]) if pid in private_memory else 'Unknown'
+		))
+
+
+def compare_batch(args: list) -> tuple:
+	"""Runs the correlation algorithm on all the columns in a unit of work, a block of rows at a time, and saves the
+	unit's partial shard, returning the start and stop rows of the unit, the number of comparisons skipped, the thread's
+	ID, the time it took and the thread's peak resident set size and private memory"""
+
+	start_time: float = time()
 	n_comps_skipped: int = 0
-	result_dict: dict = {}
+	results: list = []
 	batch_size: int = len(args)
 
-	for i, (row_idx, (col_start, col_stop)) in enumerate(args):
-		if i % 10 == 0:
-			print('Thread Progress of Batch Beginning at {}: {:.2f}%'.format(args[0][0], i / batch_size * 100))
+	for i in range(0, batch_size, ROW_BLOCK_SIZE):
+		print('Thread Progress of Batch Beginning at {}: {:.2f}%'.format(args[0][0], i / batch_size * 100))
+
+		block: list = args[i:i + ROW_BLOCK_SIZE]
+		numeric_block, row_positions = get_numeric_rows(block=block)
+
+		if len(numeric_block) > 0:
+			with profiled(name='compare_batch/num_num_block'):
+				n_comps_skipped += compare_num_num_block(
+					block=numeric_block, row_positions=row_positions, results=results
+				)
+
+			with profiled(name='compare_batch/num_nom_block'):
+				n_comps_skipped += compare_num_nom_block(
+					block=numeric_block, row_positions=row_positions, results=results
+				)
+
+		with profiled(name='compare_batch/nominal_rows'):
+			for row_idx, (col_start, col_stop) in block:
+				if get_type(header=headers[row_idx], col_types=col_types) != NUMERIC_TYPE:
+					n_comps_skipped += compare_nominal_row(
+						row_idx=row_idx, col_start=col_start, col_stop=col_stop, results=results
+					)
+
+	start: int = args[0][0]
+	stop: int = args[-1][0] + 1
+
+	with profiled(name='compare_batch/save_partial_shard'):
+		save_partial_shard(checkpoint_dir=checkpoint_dir, start=start, stop=stop, shard=merge_shards(results))
+
+	if log_p_hist is not None:
+		save_log_p_hist(
+			path=get_partial_log_p_hist_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop),
+			log_p_hist=log_p_hist, exact_alpha=test_alpha, shard_alpha=shard_alpha
+		)
+
+		log_p_hist[:] = 0
+
+	if top_k is not None:
+		save_top_k_table(
+			path=get_partial_top_k_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop), table=top_k.get_table(),
+			k=top_k.k
+		)
+
+		top_k.reset()
+
+	# The profile of each unit is saved next to its partial shard, so a restarted job still has the profiles of the
+	# units completed before it was restarted
+	if is_profiling():
+		n_cells: int = sum(col_stop - col_start for _, (col_start, col_stop) in args)
+		add_time(name='compare_batch', seconds=time() - start_time, n_pairs=n_cells)
+		save_profile(path=get_partial_profile_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))
+		reset_profile()
+
+	return start, stop, n_comps_skipped, getpid(), time() - start_time, get_peak_rss(), get_private_memory()
+
+
+def get_numeric_rows(block: list) -> tuple:
+	"""Gets the numeric rows of a block and their positions in the numeric matrices"""
+
+	row_indices: ndarray = array([row_idx for row_idx, _ in block], dtype=int)
+	row_positions: ndarray = searchsorted(numeric_headers, row_indices)
+	is_numeric: ndarray = row_positions < len(numeric_headers)
+	is_numeric[is_numeric] = numeric_headers[row_positions[is_numeric]] == row_indices[is_numeric]
+	numeric_block: list = [indices for indices, numeric in zip(block, is_numeric) if numeric]
+	return numeric_block, row_positions[is_numeric]
+
+
+def compare_num_num_block(block: list, row_positions: ndarray, results: list) -> int:
+	"""Compares the numeric rows of a block to the numeric columns to their right all at once and adds the comparisons
+	that pass the filter alpha to the result dictionary, returning the number of comparisons skipped"""
+
+	if num_num_screened is not None:
+		return compare_screened_num_num_block(block=block, row_positions=row_positions, results=results)
+
+	# Get the range of numeric columns of each row in the block and the range that covers all of them
+	col_starts: ndarray = searchsorted(numeric_headers, [col_start for _, (col_start, _) in block])
+	col_stops: ndarray = searchsorted(numeric_headers, [col_stop for _, (_, col_stop) in block])
+	block_start: int = col_starts.min()
+	block_stop: int = col_stops.max()
+
+	p, effects = split_effects(result=num_num_tests(
+		standardized=standardized_cols, rank_standardized=rank_standardized_cols, not_normal=not_normal_cols,
+		rows=row_positions, col_start=block_start, col_stop=block_stop, alpha=test_alpha, effect_sizes=top_k is not None
+	))
+
+	# Only keep the cells of the block that are in each row's own range of columns
+	col_positions: ndarray = arange(block_start, block_stop)[newaxis, :]
+	in_range: ndarray = (col_positions >= col_starts[:, newaxis]) & (col_positions < col_stops[:, newaxis])
+	block_rows, block_cols = nonzero(in_range)
+	row_indices: ndarray = array([row_idx for row_idx, _ in block], dtype=int)[block_rows]
+	col_indices: ndarray = numeric_headers[block_start + block_cols]
+
+	return add_comparisons(
+		row_indices=row_indices, col_indices=col_indices, p=p[block_rows, block_cols], results=results,
+		effects=None if effects is None else effects[block_rows, block_cols]
+	)
+
+
+def compare_screened_num_num_block(block: list, row_positions: ndarray, results: list) -> int:
+	"""Compares each numeric row of a block to the numeric columns to its right that were screened for it, which are its
+	candidates and its verification sample, and adds the comparisons that pass the filter alpha to the result
+	dictionary, returning the number of comparisons skipped. The other columns are presumed not to be correlated with
+	the row and get a p-value of one like those that are certain to be above the alpha"""
+
+	n_comps_skipped: int = 0
+
+	for (row_idx, (col_start, col_stop)), row_position in zip(block, row_positions):
+		col_positions: ndarray = arange(
+			searchsorted(numeric_headers, col_start), searchsorted(numeric_headers, col_stop)
+		)
+		screened: ndarray = num_num_screened[row_position]
+
+		assert len(col_positions) == 0 or col_positions[0] == row_position + 1
+		assert len(screened) == 0 or screened[-1] < col_positions[-1] + 1
+
+		p: ndarray = ones(len(col_positions))
+		effects: ndarray = zeros(len(col_positions)) if top_k is not None else None
+
+		for start in range(0, len(screened), NUMERIC_BLOCK_SIZE):
+			cols: ndarray = screened[start:start + NUMERIC_BLOCK_SIZE]
+
+			screened_p, screened_effects = split_effects(result=num_num_row_tests(
+				standardized=standardized_cols, rank_standardized=rank_standardized_cols, not_normal=not_normal_cols,
+				row=row_position, cols=cols, alpha=test_alpha, effect_sizes=top_k is not None
+			))
+
+			p[cols - row_position - 1] = screened_p
+
+			if effects is not None:
+				effects[cols - row_position - 1] = screened_effects
+
+		n_comps_skipped += add_comparisons(
+			row_indices=full(len(p), row_idx), col_indices=numeric_headers[col_positions], p=p, results=results,
+			effects=effects
+		)
+
+	return n_comps_skipped
+
+
+def compare_num_nom_block(block: list, row_positions: ndarray, results: list) -> int:
+	"""Compares the numeric rows of a block to each nominal column to their right, all the rows at once for each nominal
+	column, and adds the comparisons that pass the filter alpha to the result dictionary, returning the number of
+	comparisons skipped"""
+
+	row_indices: ndarray = array([row_idx for row_idx, _ in block], dtype=int)
+	col_starts: ndarray = array([col_start for _, (col_start, _) in block], dtype=int)
+	col_stops: ndarray = array([col_stop for _, (_, col_stop) in block], dtype=int)
+	nominal_start: int = searchsorted(nominal_headers, col_starts.min())
+	nominal_stop: int = searchsorted(nominal_headers, col_stops.max())
+	n_comps_skipped: int = 0
+
+	for col_idx, codes in zip(nominal_headers[nominal_start:nominal_stop], nominal_codes[nominal_start:nominal_stop]):
+		in_range: ndarray = (col_starts <= col_idx) & (col_idx < col_stops)
+
+		if not in_range.any():
+			continue
+
+		positions: ndarray = row_positions[in_range]
+		p, effects = split_effects(result=num_nom_tests(
+			codes=codes, numbers=numeric_cols[positions], ranks=rank_cols[positions], alpha=test_alpha,
+			effect_sizes=top_k is not None
+		))
+
+		n_comps_skipped += add_comparisons(
+			row_indices=row_indices[in_range], col_indices=full(len(p), col_idx), p=p, results=results, effects=effects
+		)
+
+	return n_comps_skipped
+
+
+def compare_nominal_row(row_idx: int, col_start: int, col_stop: int, results: list) -> int:
+	"""Compares a nominal row to all the nominal columns to its right at once and to the numeric columns to its right a
+	block at a time and adds the comparisons that pass the filter alpha to the result dictionary, returning the number
+	of comparisons skipped"""
+
+	codes: ndarray = dataset_cols[headers[row_idx]]
+	nominal_start: int = searchsorted(nominal_headers, col_start)
+	nominal_stop: int = searchsorted(nominal_headers, col_stop)
+	p, effects = split_effects(result=nom_nom_tests(
+		codes=codes, others=nominal_codes[nominal_start:nominal_stop], alpha=test_alpha, effect_sizes=top_k is not None
+	))
+
+	n_comps_skipped: int = add_comparisons(
+		row_indices=full(len(p), row_idx), col_indices=nominal_headers[nominal_start:nominal_stop], p=p,
+		results=results, effects=effects
+	)
+
+	numeric_start: int = searchsorted(numeric_headers, col_start)
+	numeric_stop: int = searchsorted(numeric_headers, col_stop)
+
+	for start in range(numeric_start, numeric_stop, NUMERIC_BLOCK_SIZE):
+		stop: int = min(start + NUMERIC_BLOCK_SIZE, numeric_stop)
+		p, effects = split_effects(result=num_nom_tests(
+			codes=codes, numbers=numeric_cols[start:stop], ranks=rank_cols[start:stop], alpha=test_alpha,
+			effect_sizes=top_k is not None
+		))
+
+		n_comps_skipped += add_comparisons(
+			row_indices=full(len(p), row_idx), col_indices=numeric_headers[start:stop], p=p, results=results,
+			effects=effects
+		)
+
+	return n_comps_skipped
+
+
+def split_effects(result) -> tuple:
+	"""Splits the result of a batch of tests into its p-values and its effect sizes, which the tests only compute when
+	the top K table is being kept"""
+
+	return result if top_k is not None else (result, None)
+
+
+def add_comparisons(
+	row_indices: ndarray, col_indices: ndarray, p: ndarray, results: list, effects: ndarray = None
+) -> int:
+	"""Adds the comparisons between the rows and columns at the same positions of the given arrays that pass the filter
+	alpha to the results as a shard, and to the top K table along with their effect sizes if it is being kept, returning
+	the number of comparisons skipped"""
+
+	if log_p_hist is not None:
+		add_to_log_p_hist(log_p_hist=log_p_hist, p=p)
+
+	kept: ndarray = ~(p > shard_alpha)
+	row_indices: ndarray = row_indices[kept]
+	col_indices: ndarray = col_indices[kept]
 
-		for col_idx in range(col_start, col_stop):
-			header1: str = headers[row_idx]
-			header2: str = headers[col_idx]
-			key: tuple = get_comp_key(feat1=header1, feat2=header2)
-			p: float = compare(header1, header2, dataset_cols=dataset_cols, col_types=col_types)
+	# Like the keys of a comparison dictionary, the first feature of each comparison is the one with the smaller header
+	with profiled(name='add_comparisons', n_pairs=len(row_indices)):
+		row_first: ndarray = header_rank[row_indices] < header_rank[col_indices]
 
-			if p > FILTER_ALPHA:
-				n_comps_skipped += 1
-				continue
+		feat1: ndarray = where(row_first, row_indices, col_indices) + header_offset
+		feat2: ndarray = where(row_first, col_indices, row_indices) + header_offset
+		results.append(make_shard(feat1=feat1, feat2=feat2, p=p[kept]))
 
-			assert key not in result_dict
-			result_dict[key] = p
+	if top_k is not None:
+		with profiled(name='add_comparisons/top_k', n_pairs=len(feat1)):
+			top_k.add(feat1=feat1, feat2=feat2, p=p[kept], effect=effects[kept])
 
-	return result_dict, n_comps_skipped
+	return int((~kept).sum())
 
 
 if __name__ == '__main__':
@@ -1,102 +1,263 @@
-"""Re-runs the comparisons that were below the bonferroni alpha on a sub set of the individuals in the data set"""
+"""Re-runs the comparisons that were below the bonferroni alpha on sub sets of the individuals in the data set. The
+columns of the comparisons are loaded once from the column store of the full data set and each sub set is a mask of its
+rows, so several sub sets are re-analyzed in one job with the vectorized tests"""
 
 from sys import argv
 from os import listdir, mkdir
-from os.path import join, isdir
-from pickle import load, dump
-from pandas import read_csv, DataFrame
-from tqdm import tqdm
+from os.path import join, isdir, dirname
+from pickle import load
 from time import time
+from numpy import (
+    ndarray, arange, array, asarray, concatenate, unique, isin, searchsorted, full, empty, zeros, inf, isinf, argsort,
+    flatnonzero, split
+)
+from scipy.stats import rankdata
 
-from utils.utils import compare, get_col_types, SUBSET_PATH, get_comp_key, SUBSET_COMP_DICTS_PATH
+from utils.utils import SUBSET_COMP_DICTS_PATH
+from utils.batch_tests import (
+    num_nom_tests, nom_nom_tests, pearson_p_values, spearman_p_values, not_normal_distributions, standardize, moments
+)
+from utils.col_store import ColStore, get_col_store_dir
+from utils.comp_shards import (
+    is_comp_file, load_shard, load_headers, comp_dict_to_shard_and_headers, make_shard, save_shard, save_headers,
+    FEAT1_FIELD, FEAT2_FIELD, SHARD_EXT
+)
+from utils.subset_masks import get_subset_mask
+from utils.heartbeat import Heartbeat
+
+DATA_PATH: str = 'data/data.csv'
+SUBSET_DELIMINATOR: str = ','
+PAIR_BLOCK_SIZE: int = 65536
 
 
 def main():
     """Main method"""
 
     idx: int = int(argv[1])
-    subset: str = argv[2]
+    subsets: list = argv[2].split(SUBSET_DELIMINATOR)
     comp_dir: str = argv[3]
+    data_path: str = argv[4] if len(argv) == 5 else DATA_PATH
 
-    comp_dicts_path: str = SUBSET_COMP_DICTS_PATH.format(subset)
-
-    if not isdir(comp_dicts_path):
-        mkdir(comp_dicts_path)
-
-    col_types: dict = get_col_types()
-    new_comps: list = sorted(listdir(comp_dir))
-
-    for i, file_name in enumerate(list(new_comps)):
-        if not file_name.endswith('.p'):
-            del new_comps[i]
-
+    col_store: ColStore = ColStore(get_col_store_dir(data_path=data_path))
+    new_comps: list = sorted(file_name for file_name in listdir(comp_dir) if is_comp_file(file_name))
     new_comps: str = new_comps[idx]
-
-    assert new_comps.endswith('.p')
-
     new_comps: str = join(comp_dir, new_comps)
     print('Loading Filtered Comparisons at:', new_comps)
-    new_comps: dict = load(open(new_comps, 'rb'))
-    original_len: int = len(new_comps)
+    feat1, feat2 = load_filtered_comparisons(path=new_comps, col_store=col_store)
+    original_len: int = len(feat1)
     print('Number Of Filtered Comparisons (Original Length):', original_len)
     t1: float = time()
-    dataset_cols: dict = get_dataset_cols(subset=subset, filtered_comps=new_comps)
+    numeric_feats, numeric_cols, nominal_feats, nominal_codes = get_dataset_cols(
+        col_store=col_store, feat1=feat1, feat2=feat2
+    )
+
     print('Time Extracting The Data Set Columns: {:.2f} Minutes'.format((time() - t1) / 60))
-    print('Number Of Features To Re-Analyze:', len(dataset_cols))
-    n_skipped: int = 0
-    t1: float = time()
+    print('Number Of Features To Re-Analyze:', len(numeric_feats) + len(nominal_feats))
+
+    # Each comparison is a cell of the job's work once for each sub set
+    heartbeat: Heartbeat = Heartbeat(
+        run='col-comparison-subset-' + '-'.join(subsets), job_id=idx, n_cells=original_len * len(subsets)
+    )
+
+    for subset in subsets:
+        print('Sub Set:', subset)
+        t1: float = time()
+        mask: ndarray = get_subset_mask(subset=subset, ptids=col_store.ptids)
+
+        p, n_single_value = compare_subset(
+            feat1=feat1, feat2=feat2, numeric_feats=numeric_feats, numeric_cols=numeric_cols[:, mask],
+            nominal_feats=nominal_feats, nominal_codes=nominal_codes[:, mask]
+        )
+
+        # Comparisons with a feature that has only one unique value in the sub set or that could not be computed have a
+        # p-value of infinity
+        kept: ndarray = ~isinf(p)
+        new_len: int = int(kept.sum())
+        print('Time Re-Analyzing On The Sub Set: {:.2f} Minutes'.format((time() - t1) / 60))
+        print('Number Of Comparisons Skipped Due To One Unique Value In Sub Set:', n_single_value)
+        print('Number Of Comparisons Skipped In Total:', original_len - new_len)
+        print('Number Of Comparisons Left (New Length):', new_len)
+
+        comp_dicts_path: str = SUBSET_COMP_DICTS_PATH.format(subset)
+
+        if not isdir(comp_dicts_path):
+            mkdir(comp_dicts_path)
+
+        new_comps_path: str = join(comp_dicts_path, str(idx).zfill(7) + SHARD_EXT)
+        save_headers(shard_dir=comp_dicts_path, headers=col_store.headers)
+        save_shard(path=new_comps_path, shard=make_shard(feat1=feat1[kept], feat2=feat2[kept], p=p[kept]))
+        heartbeat.add(n_cells=original_len, n_pairs=original_len)
+
+    heartbeat.finish()
+
+
+def load_filtered_comparisons(path: str, col_store: ColStore) -> tuple:
+    """Loads the first and second features of the filtered comparisons in a shard or comparison dictionary as the
+    indices of their headers in the column store"""
+
+    if path.endswith(SHARD_EXT):
+        shard: ndarray = load_shard(path=path)
+        headers: list = load_headers(shard_dir=dirname(path))
+    else:
+        shard, headers = comp_dict_to_shard_and_headers(comp_dict=load(open(path, 'rb')))
+
+    if headers == col_store.headers:
+        header_idx: ndarray = arange(len(headers))
+    else:
+        col_store_idx: dict = {header: i for i, header in enumerate(col_store.headers)}
+        header_idx: ndarray = array([col_store_idx[header] for header in headers], dtype=int)
+
+    return header_idx[shard[FEAT1_FIELD]], header_idx[shard[FEAT2_FIELD]]
+
+
+def get_dataset_cols(col_store: ColStore, feat1: ndarray, feat2: ndarray) -> tuple:
+    """Reads the columns of the features in the comparisons from the column store, returning the numeric features and
+    their columns and the nominal features and the codes of their categories, both in the order of the features"""
+
+    feats: ndarray = unique(concatenate([feat1, feat2]))
+    numeric_feats: ndarray = feats[isin(feats, col_store.numeric_headers)]
+    nominal_feats: ndarray = feats[isin(feats, col_store.nominal_headers)]
+    numeric_cols: ndarray = asarray(col_store.numeric[searchsorted(col_store.numeric_headers, numeric_feats)])
+    nominal_codes: ndarray = asarray(col_store.category_codes[searchsorted(col_store.nominal_headers, nominal_feats)])
+    return numeric_feats, numeric_cols, nominal_feats, nominal_codes
+
+
+def compare_subset(
+    feat1: ndarray, feat2: ndarray, numeric_feats: ndarray, numeric_cols: ndarray, nominal_feats: ndarray,
+    nominal_codes: ndarray
+) -> tuple:
+    """Computes the p-values of the comparisons on the columns of a sub set, returning them and the number of
+    comparisons with a feature that has only one unique value in the sub set. Those comparisons get a p-value of
+    infinity, as do the comparisons that the tests give a p-value of infinity"""
+
+    is_numeric1: ndarray = isin(feat1, numeric_feats)
+    is_numeric2: ndarray = isin(feat2, numeric_feats)
+    rows1: ndarray = get_rows(
+        feats=feat1, is_numeric=is_numeric1, numeric_feats=numeric_feats, nominal_feats=nominal_feats
+    )
+
+    rows2: ndarray = get_rows(
+        feats=feat2, is_numeric=is_numeric2, numeric_feats=numeric_feats, nominal_feats=nominal_feats
+    )
+
+    # We can't compare features that have only one unique value as a result of the sub setting
+    numeric_single_value: ndarray = (numeric_cols == numeric_cols[:, :1]).all(axis=1)
+    nominal_single_value: ndarray = (nominal_codes == nominal_codes[:, :1]).all(axis=1)
+    single_value: ndarray = zeros(len(feat1), dtype=bool)
+
+    for rows, is_numeric in [(rows1, is_numeric1), (rows2, is_numeric2)]:
+        single_value[is_numeric] |= numeric_single_value[rows[is_numeric]]
+        single_value[~is_numeric] |= nominal_single_value[rows[~is_numeric]]
+
+    p: ndarray = full(len(feat1), inf)
+    num_num: ndarray = ~single_value & is_numeric1 & is_numeric2
+    num_nom: ndarray = ~single_value & (is_numeric1 != is_numeric2)
+    nom_nom: ndarray = ~single_value & ~is_numeric1 & ~is_numeric2
+    ranks: ndarray = rankdata(numeric_cols, axis=1)
+
+    if num_num.any():
+        p[num_num] = num_num_pairs(numeric_cols=numeric_cols, ranks=ranks, rows1=rows1[num_num], rows2=rows2[num_num])
+
+    if num_nom.any():
+        # Either feature of a numeric to nominal comparison may be the numeric one
+        numeric_rows: ndarray = choose_rows(first=is_numeric1[num_nom], rows1=rows1[num_nom], rows2=rows2[num_nom])
+        nominal_rows: ndarray = choose_rows(first=~is_numeric1[num_nom], rows1=rows1[num_nom], rows2=rows2[num_nom])
+
+        p[num_nom] = num_nom_pairs(
+            numeric_cols=numeric_cols, ranks=ranks, nominal_codes=nominal_codes, numeric_rows=numeric_rows,
+            nominal_rows=nominal_rows
+        )
+
+    if nom_nom.any():
+        p[nom_nom] = nom_nom_pairs(nominal_codes=nominal_codes, rows1=rows1[nom_nom], rows2=rows2[nom_nom])
+
+    return p, int(single_value.sum())
+
+
+def get_rows(feats: ndarray, is_numeric: ndarray, numeric_feats: ndarray, nominal_feats: ndarray) -> ndarray:
+    """Gets the rows of the features in either the numeric columns or the nominal codes, depending on their type"""
+
+    rows: ndarray = empty(len(feats), dtype=int)
+    rows[is_numeric] = searchsorted(numeric_feats, feats[is_numeric])
+    rows[~is_numeric] = searchsorted(nominal_feats, feats[~is_numeric])
+    return rows
+
+
+def choose_rows(first: ndarray, rows1: ndarray, rows2: ndarray) -> ndarray:
+    """Gets the row of the first feature of each comparison where chosen and of the second feature otherwise"""
+
+    rows: ndarray = rows2.copy()
+    rows[first] = rows1[first]
+    return rows
+
+
+def get_groups(rows: ndarray) -> list:
+    """Groups the positions of the comparisons by a row that they share, returning each row with its positions"""
+
+    order: ndarray = argsort(rows, kind='stable')
+    sorted_rows: ndarray = rows[order]
+    starts: ndarray = flatnonzero(sorted_rows[1:] != sorted_rows[:-1]) + 1
+    group_rows: list = sorted_rows[concatenate([[0], starts])].tolist() if len(rows) > 0 else []
+    return list(zip(group_rows, split(order, starts)))
+
+
+def num_num_pairs(numeric_cols: ndarray, ranks: ndarray, rows1: ndarray, rows2: ndarray) -> ndarray:
+    """Computes the p-values between pairs of numeric columns a block of pairs at a time. Like num_num_test, a pair uses
+    Spearman's correlation if either column is not normally distributed and Pearson's correlation otherwise"""
+
+    n: int = numeric_cols.shape[1]
+    not_normal: ndarray = not_normal_distributions(data=numeric_cols)
+    standardized: ndarray = standardize(numeric_cols, *moments(data=numeric_cols))
+    rank_standardized: ndarray = standardize(ranks, *moments(data=ranks))
+    use_spearman: ndarray = not_normal[rows1] | not_normal[rows2]
+    p: ndarray = empty(len(rows1))
+
+    for start in range(0, len(rows1), PAIR_BLOCK_SIZE):
+        stop: int = start + PAIR_BLOCK_SIZE
+        block1: ndarray = rows1[start:stop]
+        block2: ndarray = rows2[start:stop]
+        spearman: ndarray = use_spearman[start:stop]
+        pearson: ndarray = ~spearman
+        block_p: ndarray = empty(len(block1))
 
-    for (feat1, feat2), p in tqdm(list(new_comps.items())):
-        key: tuple = get_comp_key(feat1=feat1, feat2=feat2)
+        # The dot product of two standardized columns is their correlation coefficient
+        if spearman.any():
+            r: ndarray = (rank_standardized[block1[spearman]] * rank_standardized[block2[spearman]]).sum(axis=1)
+            block_p[spearman] = spearman_p_values(r=r, n=n)
 
-        if dataset_cols[feat1] is None or dataset_cols[feat2] is None:
-            # We can't compare features that have only one unique value as a result of the sub setting
-            n_skipped += 1
-            del new_comps[key]
-        else:
-            p: float = compare(header1=feat1, header2=feat2, dataset_cols=dataset_cols, col_types=col_types)
+        if pearson.any():
+            r: ndarray = (standardized[block1[pearson]] * standardized[block2[pearson]]).sum(axis=1)
+            block_p[pearson] = pearson_p_values(r=r, n=n)
 
-            if p == float('inf'):
-                n_skipped += 1
-                del new_comps[key]
-            else:
-                new_comps[key] = p
+        p[start:stop] = block_p
 
-    new_len: int = len(new_comps)
+    return p
 
-    assert new_len + n_skipped == original_len
 
-    print('Time Re-Analyzing On The Sub Set: {:.2f} Minutes'.format((time() - t1) / 60))
-    print('Number Of Comparisons Skipped Due To One Unique Value In Sub Set:', n_skipped)
-    print('Number Of Comparisons Left (New Length):', new_len)
-    new_comps_path: str = '{}.p'.format(idx)
-    new_comps_path: str = join(comp_dicts_path, new_comps_path)
-    dump(new_comps, open(new_comps_path, 'wb'))
+def num_nom_pairs(
+    numeric_cols: ndarray, ranks: ndarray, nominal_codes: ndarray, numeric_rows: ndarray, nominal_rows: ndarray
+) -> ndarray:
+    """Computes the p-values between pairs of numeric and nominal columns, all the numeric columns at once for each
+    nominal column"""
 
+    p: ndarray = empty(len(numeric_rows))
 
-def get_dataset_cols(subset: str, filtered_comps: dict) -> dict:
-    """Gets the columns from the subset to be used in the new comparisons"""
+    for nominal_row, positions in get_groups(rows=nominal_rows):
+        rows: ndarray = numeric_rows[positions]
+        p[positions] = num_nom_tests(codes=nominal_codes[nominal_row], numbers=numeric_cols[rows], ranks=ranks[rows])
 
-    filtered_headers: set = set()
+    return p
 
-    for feat1, feat2 in filtered_comps.keys():
-        filtered_headers.add(feat1)
-        filtered_headers.add(feat2)
 
-    subset_path: str = SUBSET_PATH.format(subset)
-    subset: DataFrame = read_csv(subset_path, usecols=filtered_headers)
-    dataset_cols: dict = {}
+def nom_nom_pairs(nominal_codes: ndarray, rows1: ndarray, rows2: ndarray) -> ndarray:
+    """Computes the p-values between pairs of nominal columns, all the second columns at once for each first column"""
 
-    for header in filtered_headers:
-        col: list = list(subset[header])
+    p: ndarray = empty(len(rows1))
 
-        if len(set(col)) == 1:
-            # We can't compare features that have only one unique value as a result of the sub setting
-            dataset_cols[header] = None
-        else:
-            dataset_cols[header] = col
+    for row1, positions in get_groups(rows=rows1):
+        p[positions] = nom_nom_tests(codes=nominal_codes[row1], others=nominal_codes[rows2[positions]])
 
-    return dataset_cols
+    return p
 
 
 if __name__ == '__main__':
@@ -0,0 +1,62 @@
+"""Computes the statistics of each column of a data set once so every comparison can reuse them: the normality p-value,
+ranks, mean and standard deviation of each numeric column and the integer category codes of each nominal column. The
+statistics are computed from the column store of the data set"""
+
+from sys import argv
+from time import time
+from numpy import ndarray, empty, float32
+from scipy.stats import normaltest, rankdata
+
+from utils.col_stats import get_col_stats_dir, save_col_stats
+from utils.col_store import ColStore, get_col_store_dir
+from utils.batch_tests import moments
+
+BATCH_SIZE: int = 10000
+
+
+def main():
+    """Main method"""
+
+    data_path: str = argv[1]
+    col_stats_dir: str = get_col_stats_dir(data_path=data_path)
+    col_store: ColStore = ColStore(get_col_store_dir(data_path=data_path))
+    numeric_cols: ndarray = col_store.numeric
+    numeric_headers: list = [col_store.headers[i] for i in col_store.numeric_headers]
+    nominal_headers: list = [col_store.headers[i] for i in col_store.nominal_headers]
+    print('Number Of Numeric Columns:', len(numeric_headers))
+    print('Number Of Nominal Columns:', len(nominal_headers))
+
+    start_time: float = time()
+    n_numeric: int = len(numeric_headers)
+    normality_p: ndarray = empty(n_numeric)
+    means: ndarray = empty(n_numeric)
+    stds: ndarray = empty(n_numeric)
+
+    # Ranks are multiples of one half so single precision stores them exactly for any realistic number of rows
+    ranks: ndarray = empty(numeric_cols.shape, dtype=float32)
+
+    # Compute the numeric statistics a batch of columns at a time to bound the size of the intermediate arrays
+    for start in range(0, n_numeric, BATCH_SIZE):
+        batch: ndarray = numeric_cols[start:start + BATCH_SIZE]
+        stop: int = start + len(batch)
+        normality_p[start:stop] = normaltest(batch, axis=1)[1]
+        means[start:stop], stds[start:stop] = moments(data=batch)
+        ranks[start:stop] = rankdata(batch, axis=1)
+
+    # The nominal columns are already dictionary encoded in the column store
+    categories: list = col_store.categories
+    category_codes: ndarray = col_store.category_codes
+
+    print('Time Computing The Column Statistics: {:.2f} Minutes'.format((time() - start_time) / 60))
+
+    save_col_stats(
+        col_stats_dir=col_stats_dir, headers=col_store.headers, numeric_headers=numeric_headers,
+        nominal_headers=nominal_headers, categories=categories, normality_p=normality_p, means=means, stds=stds,
+        ranks=ranks, category_codes=category_codes
+    )
+
+    print('Saved The Column Statistics To:', col_stats_dir)
+
+
+if __name__ == '__main__':
+    main()
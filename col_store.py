@@ -0,0 +1,22 @@
+"""Converts a data set CSV into a column store that the comparison jobs memory map instead of re-reading the CSV"""
+
+from sys import argv
+from time import time
+
+from utils.utils import get_col_types
+from utils.col_store import get_col_store_dir, write_col_store
+
+
+def main():
+    """Main method"""
+
+    data_path: str = argv[1]
+    col_store_dir: str = get_col_store_dir(data_path=data_path)
+    start_time: float = time()
+    write_col_store(data_path=data_path, col_store_dir=col_store_dir, col_types=get_col_types())
+    print('Time Converting The Data Set: {:.2f} Minutes'.format((time() - start_time) / 60))
+    print('Saved The Column Store To:', col_store_dir)
+
+
+if __name__ == '__main__':
+    main()
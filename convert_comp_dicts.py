@@ -0,0 +1,42 @@
+"""Migrates a directory of pickled comparison dictionaries to comparison shards, one dictionary at a time so the disk
+usage never grows by more than one shard"""
+
+from sys import argv
+from os import remove, listdir
+from os.path import join
+from pickle import load
+from tqdm import tqdm
+
+from utils.col_store import ColStore, get_col_store_dir
+from utils.comp_shards import (
+    comp_dict_to_shard, save_shard, save_headers, is_comp_file, COMP_DICT_EXT, SHARD_EXT
+)
+
+
+def main():
+    """Main method"""
+
+    comp_dict_dir: str = argv[1]
+    data_path: str = argv[2]
+
+    # The feature indices of the shards refer to the headers of the data set's column store
+    headers: list = ColStore(get_col_store_dir(data_path=data_path)).headers
+    header_idx: dict = {header: i for i, header in enumerate(headers)}
+    save_headers(shard_dir=comp_dict_dir, headers=headers)
+    comp_dicts: list = sorted(f for f in listdir(comp_dict_dir) if is_comp_file(f) and f.endswith(COMP_DICT_EXT))
+    n_comps: int = 0
+
+    for comp_dict_file in tqdm(comp_dicts):
+        comp_dict_path: str = join(comp_dict_dir, comp_dict_file)
+        comp_dict: dict = load(open(comp_dict_path, 'rb'))
+        shard_path: str = comp_dict_path[:-len(COMP_DICT_EXT)] + SHARD_EXT
+        save_shard(path=shard_path, shard=comp_dict_to_shard(comp_dict=comp_dict, header_idx=header_idx))
+        n_comps += len(comp_dict)
+        remove(comp_dict_path)
+
+    print('Number Of Comparison Dictionaries Converted:', len(comp_dicts))
+    print('Number Of Comparisons Converted:', n_comps)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
-"""Creates a subset of the data set by only including patients that have a particular value of a nominal feature"""
+"""Creates subsets of the data set by only including patients that have a particular value of a nominal feature. The
+data set is streamed and each subset is saved as the indices of its rows in the data set rather than as a copy of the
+data set, and optionally as a column store made from the column store of the data set"""
 
 from sys import argv
 from pickle import load
+from numpy import ndarray, array, flatnonzero, int32
 
 from utils.utils import SUBSET_PATH
+from utils.subset_masks import save_subset_rows
+from utils.col_store import ColStore, get_col_store_dir, write_subset_col_store
+
+CSV_DELIMINATOR: str = ','
 
 
 def main():
@@ -12,6 +19,7 @@ def main():
 	original_data_file: str = argv[1]
 	feat_map: str = argv[2]
 	cohort: str = argv[3]
+	make_col_stores: bool = len(argv) > 4 and argv[4] == 'true'
 
 	feat_map: str = 'data/feat-maps/{}/{}.p'.format(cohort, feat_map)
 
@@ -20,37 +28,39 @@ def main():
 
 	unique_values: list = sorted(set(feat_map.values()))
 	print('The Feature\'s Unique Values:', *unique_values)
-	n_subsets: int = len(unique_values)
-	subsets: list = [[] for _ in range(n_subsets)]
+	value_idx: dict = {val: i for i, val in enumerate(unique_values)}
+
+	# Only the patient ID of each line is parsed and only the index of its subset is kept
+	row_subsets: list = []
 
 	with open(original_data_file, 'r') as f:
-		headers: str = next(f)
+		next(f)
 
 		for line in f:
-			row: list = line.strip().split(',')
-			ptid: str = row[0]
-			val = feat_map[ptid]
-			idx: int = unique_values.index(val)
-			subsets[idx].append(line)
+			# Blank lines are not rows of the data set, as in the column store
+			if line.strip() == '':
+				continue
 
-	for i in range(n_subsets):
-		val = unique_values[i]
+			ptid: str = line.split(CSV_DELIMINATOR, 1)[0]
+			row_subsets.append(value_idx[feat_map[ptid]])
 
-		if type(val) is str:
-			val = val.lower()
+	row_subsets: ndarray = array(row_subsets, dtype=int32)
+	col_store: ColStore = ColStore(get_col_store_dir(data_path=original_data_file)) if make_col_stores else None
 
-		subset_path: str = SUBSET_PATH.format(val)
-		write_file(subset_path=subset_path, subset=subsets[i], headers=headers)
+	if col_store is not None:
+		assert len(col_store.ptids) == len(row_subsets)
 
+	for i, val in enumerate(unique_values):
+		if type(val) is str:
+			val = val.lower()
 
-def write_file(subset_path: str, subset: list, headers: str):
-	"""Saves the subset after the correct patients have been selected"""
-
-	with open(subset_path, 'w') as f:
-		f.write(headers)
+		rows: ndarray = flatnonzero(row_subsets == i)
+		print('Number Of Rows In Subset {}:'.format(val), len(rows))
+		save_subset_rows(subset=val, rows=rows)
 
-		for line in subset:
-			f.write(line)
+		if col_store is not None:
+			col_store_dir: str = get_col_store_dir(data_path=SUBSET_PATH.format(val))
+			write_subset_col_store(col_store=col_store, col_store_dir=col_store_dir, rows=rows)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,6 @@
-"""Takes comparison dictionaries from a given directory and makes them more equal in size"""
+"""Takes comparison dictionaries from a given directory and makes them more equal in size. By default, a manifest of
+logical shards of equal size is written to the directory so that no data is moved, while the rewrite mode saves the
+comparisons again as dictionaries of equal size"""
 
 from sys import argv
 from os import mkdir, rename
@@ -8,6 +10,7 @@ from pickle import dump
 
 from utils.utils import get_comp_key
 from utils.iterate_comp_dicts import BasicDictIter
+from utils.comp_shards import make_manifest, save_manifest, MANIFEST_SHARDS_KEY
 
 LOADED_KEY: str = 'total-len-loaded'
 SAVED_KEY: str = 'total-len-saved'
@@ -15,6 +18,8 @@ NEXT_DICT_KEY: str = 'next-dict'
 N_COMPS_PER_FILE_KEY: str = 'n-comps-per-file'
 IDX_KEY: str = 'idx'
 TMP_DIR: str = '.tmp/'
+MANIFEST_MODE: str = 'manifest'
+REWRITE_MODE: str = 'rewrite'
 
 
 def main():
@@ -22,6 +27,15 @@ def main():
 
     comp_dict_dir: str = argv[1]
     n_comps_per_file: str = int(argv[2])
+    mode: str = argv[3] if len(argv) == 4 else MANIFEST_MODE
+
+    assert mode in {MANIFEST_MODE, REWRITE_MODE}
+
+    if mode == MANIFEST_MODE:
+        manifest: dict = make_manifest(comp_dict_dir=comp_dict_dir, n_comps_per_shard=n_comps_per_file)
+        save_manifest(comp_dict_dir=comp_dict_dir, manifest=manifest)
+        print('Number of logical shards:', len(manifest[MANIFEST_SHARDS_KEY]))
+        return
 
     local_vars: dict = {
         LOADED_KEY: 0,
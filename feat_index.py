@@ -0,0 +1,22 @@
+"""Creates the feature index, which gives every feature an integer ID and the codes of its domain and data type so that
+the downstream scripts can classify features by indexing arrays instead of loading and looking up the column types"""
+
+from sys import argv
+from time import time
+
+from utils.utils import get_col_types
+from utils.feat_index import write_feat_index, FEAT_INDEX_DIR
+
+
+def main():
+    """Main method"""
+
+    data_path: str = argv[1]
+    start_time: float = time()
+    write_feat_index(data_path=data_path, col_types=get_col_types())
+    print('Time Creating The Feature Index: {:.2f} Seconds'.format(time() - start_time))
+    print('Saved The Feature Index To:', FEAT_INDEX_DIR)
+
+
+if __name__ == '__main__':
+    main()
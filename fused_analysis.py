@@ -0,0 +1,127 @@
+"""Runs several analyses of the comparison dictionaries in a single read of each comparison dictionary: filtering by
+any number of alphas, both types of counts tables and the significance frequencies and features. The outputs are the
+same as those of alpha_filter.py, inter_counts_table.py, sig_freqs.py and sig_feats.py"""
+
+from sys import argv
+from os import mkdir
+from os.path import isdir, splitext
+from pickle import load, dump
+from pandas import DataFrame
+from numpy import ndarray
+
+from utils.utils import ALPHAS_PATH, DATA_TYPE_TABLE_TYPE, DOMAIN_TABLE_TYPE
+from utils.iterate_comp_dicts import FusedIter
+from utils.feat_index import FeatIndex
+from alpha_filter import filter_by_alpha, save_filtered_comparisons, merge_filtered_comparisons
+from inter_counts_table import make_table, count_shard, save_table, merge_tables
+from sig_freqs import make_frequencies, add_shard_frequencies, merge_frequencies
+from sig_feats import add_shard_feats, merge_feats
+
+LIST_DELIMINATOR: str = ','
+
+
+def main():
+    """Main method"""
+
+    comp_dict_dir: str = argv[1]
+    idx: int = int(argv[2])
+    section_size: int = int(argv[3])
+    super_alpha: float = float(argv[4])
+    sig_freqs_path: str = argv[5]
+    sig_feats_path: str = argv[6]
+    alphas: list = [float(alpha) for alpha in argv[7].split(LIST_DELIMINATOR)]
+    alpha_filtered_dirs: list = argv[8].split(LIST_DELIMINATOR)
+    n_processes: int = int(argv[9])
+    subset: str = argv[10] if len(argv) == 11 else None
+
+    assert len(alphas) == len(alpha_filtered_dirs)
+
+    _, corrected_alpha = load(open(ALPHAS_PATH, 'rb'))
+    feat_index: FeatIndex = FeatIndex()
+    fused_iter: FusedIter = FusedIter(comp_dict_dir=comp_dict_dir, idx=idx, section_size=section_size)
+
+    # Register the alpha filters
+    all_filtered_comparisons: list = []
+
+    for alpha, alpha_filtered_dir in zip(alphas, alpha_filtered_dirs):
+        if not isdir(alpha_filtered_dir):
+            mkdir(alpha_filtered_dir)
+
+        filtered_comparisons: dict = {}
+        all_filtered_comparisons.append(filtered_comparisons)
+        fused_iter.register(
+            func=filter_by_alpha, merge=merge_filtered_comparisons, alpha=alpha,
+            filtered_comparisons=filtered_comparisons
+        )
+
+    # Register the counts tables
+    tables: dict = {}
+
+    for table_type in [DATA_TYPE_TABLE_TYPE, DOMAIN_TABLE_TYPE]:
+        table: DataFrame = make_table(table_type=table_type)
+        tables[table_type] = table
+
+        fused_iter.register(
+            func=count_shard, merge=merge_tables, per_shard=True, feat_index=feat_index, table=table,
+            super_alpha=super_alpha, corrected_alpha=corrected_alpha, table_type=table_type, header_codes={}
+        )
+
+    # Register the significance frequencies and features
+    significance_frequencies: ndarray = make_frequencies(feat_index=feat_index)
+    significance_feats: dict = {}
+
+    fused_iter.register(
+        func=add_shard_frequencies, merge=merge_frequencies, per_shard=True,
+        significance_frequencies=significance_frequencies, feat_index=feat_index, alpha=None
+    )
+
+    fused_iter.register(
+        func=add_shard_feats, merge=merge_feats, per_shard=True, significance_feats=significance_feats,
+        feat_index=feat_index, alpha=None
+    )
+
+    start_idx: int = fused_iter.start_idx
+    stop_idx: int = fused_iter.stop_idx
+
+    # With more than one process, the section is split among a pool of processes whose results are merged
+    if n_processes > 1:
+        fused_iter.map_reduce(n_processes=n_processes)
+    else:
+        fused_iter()
+
+    for alpha_filtered_dir, filtered_comparisons in zip(alpha_filtered_dirs, all_filtered_comparisons):
+        save_filtered_comparisons(
+            alpha_filtered_dir=alpha_filtered_dir, start_idx=start_idx, stop_idx=stop_idx,
+            filtered_comparisons=filtered_comparisons
+        )
+
+    for table_type, table in tables.items():
+        save_table(table=table, table_type=table_type, subset=subset, start_idx=start_idx, stop_idx=stop_idx)
+
+    # The significance frequencies and features are those of all the comparisons if the section is the whole directory
+    is_whole_dir: bool = start_idx == 0 and stop_idx == fused_iter.n_comp_dicts
+    sig_freqs_path: str = get_section_path(
+        file_path=sig_freqs_path, start_idx=start_idx, stop_idx=stop_idx, is_whole_dir=is_whole_dir
+    )
+
+    sig_feats_path: str = get_section_path(
+        file_path=sig_feats_path, start_idx=start_idx, stop_idx=stop_idx, is_whole_dir=is_whole_dir
+    )
+
+    dump(significance_frequencies, open(sig_freqs_path, 'wb'))
+    dump(significance_feats, open(sig_feats_path, 'wb'))
+
+
+def get_section_path(file_path: str, start_idx: int, stop_idx: int, is_whole_dir: bool) -> str:
+    """Gets the path of a file for a section of the comparison dictionaries, which is the path itself if the section is
+    the whole directory and otherwise has the section's start and stop indices added to it"""
+
+    if is_whole_dir:
+        return file_path
+
+    name, ext = splitext(file_path)
+    return '{}-{}-{}{}'.format(name, start_idx, stop_idx, ext)
+
+
+if __name__ == '__main__':
+    main()
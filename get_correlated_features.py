@@ -1,6 +1,7 @@
 """Gets all the features that are correlated with a given feature for a given alpha"""
 
-from utils.iterate_comp_dicts import iterate_filtered_dicts
+from utils.feat_index import FeatIndex
+from utils.adjacency_index import AdjacencyIndex, ADJACENCY_INDEX_DIR
 
 from sys import argv
 from pickle import dump, load
@@ -18,6 +19,7 @@ def main():
     header: str = argv[1]
     alpha: str = argv[2]
     mode: str = argv[3]
+    adjacency_index_dir: str = argv[4] if len(argv) == 5 else ADJACENCY_INDEX_DIR
 
     assert mode == PRINT_MODE or mode == GET_MODE
 
@@ -30,8 +32,13 @@ def main():
         for feat in correlated_feats:
             print(feat)
     else:
-        correlated_feats: list = []
-        iterate_filtered_dicts(alpha=alpha, func=check_comparison, header=header, correlated_feats=correlated_feats)
+        # Only the neighbors of the header in the adjacency index are read rather than all the comparisons
+        adjacency_index: AdjacencyIndex = AdjacencyIndex(
+            adjacency_index_dir=adjacency_index_dir, feat_index=FeatIndex()
+        )
+
+        correlates: list = adjacency_index.get_correlates(feat=header, alpha=float(alpha))
+        correlated_feats: list = [feat for feat, _ in correlates]
 
         assert header not in correlated_feats
         assert len(correlated_feats) > 0
@@ -43,15 +50,5 @@ def main():
         dump(correlated_feats, open(save_path, 'wb'))
 
 
-def check_comparison(feat1: str, feat2: str, header: str, correlated_feats: list):
-    """Adds the other feature to the list if it is correlated"""
-
-    if feat1 == header or feat2 == header:
-        if feat1 == header:
-            correlated_feats.append(feat2)
-        elif feat2 == header:
-            correlated_feats.append(feat1)
-
-
 if __name__ == '__main__':
     main()
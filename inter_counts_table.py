@@ -4,17 +4,42 @@ from sys import argv
 from os.path import join
 from pickle import load
 from pandas import DataFrame
+from numpy import ndarray, array, searchsorted, bincount
 
 from utils.utils import (
-    ALPHAS_PATH, CORRECTED_ALPHA_KEY, SUPER_ALPHA_KEY, MAX_SIGNIFICANCE_KEY, get_col_types, IDX_COL,
-    get_comparison_type, NUM_NUM_KEY, NOM_NOM_KEY, NUM_NOM_KEY, MRI_MRI_KEY, EXPRESSION_EXPRESSION_KEY,
-    ADNIMERGE_ADNIMERGE_KEY, MRI_EXPRESSION_KEY, MRI_ADNIMERGE_KEY, EXPRESSION_ADNIMERGE_KEY, DATA_TYPE_TABLE_TYPE,
-    DOMAIN_TABLE_TYPE, MIN_ALPHA, get_inter_counts_tables_dir, get_domain, ADNIMERGE_KEY, EXPRESSION_KEY, MRI_KEY
+    ALPHAS_PATH, CORRECTED_ALPHA_KEY, SUPER_ALPHA_KEY, MAX_SIGNIFICANCE_KEY, IDX_COL, NUM_NUM_KEY, NOM_NOM_KEY,
+    NUM_NOM_KEY, MRI_MRI_KEY, EXPRESSION_EXPRESSION_KEY, ADNIMERGE_ADNIMERGE_KEY, MRI_EXPRESSION_KEY, MRI_ADNIMERGE_KEY,
+    EXPRESSION_ADNIMERGE_KEY, DATA_TYPE_TABLE_TYPE, DOMAIN_TABLE_TYPE, MIN_ALPHA, get_inter_counts_tables_dir,
+    ADNIMERGE_KEY, EXPRESSION_KEY, MRI_KEY, NUMERIC_TYPE, NOMINAL_TYPE
 )
 
-from utils.iterate_comp_dicts import IterByIdx
+from utils.iterate_comp_dicts import ShardIterByIdx
+from utils.heartbeat import Heartbeat
+from utils.feat_index import FeatIndex, DOMAINS, DATA_TYPES
 
 TOTAL_KEY: str = 'Total'
+HEADERS_KEY: str = 'headers'
+CODES_KEY: str = 'codes'
+PAIR_ROWS_KEY: str = 'pair rows'
+
+DATA_TYPE_PAIR_KEYS: dict = {
+    (NUMERIC_TYPE, NUMERIC_TYPE): NUM_NUM_KEY,
+    (NOMINAL_TYPE, NOMINAL_TYPE): NOM_NOM_KEY,
+    (NUMERIC_TYPE, NOMINAL_TYPE): NUM_NOM_KEY,
+    (NOMINAL_TYPE, NUMERIC_TYPE): NUM_NOM_KEY
+}
+
+DOMAIN_PAIR_KEYS: dict = {
+    (MRI_KEY, MRI_KEY): MRI_MRI_KEY,
+    (EXPRESSION_KEY, EXPRESSION_KEY): EXPRESSION_EXPRESSION_KEY,
+    (ADNIMERGE_KEY, ADNIMERGE_KEY): ADNIMERGE_ADNIMERGE_KEY,
+    (MRI_KEY, EXPRESSION_KEY): MRI_EXPRESSION_KEY,
+    (EXPRESSION_KEY, MRI_KEY): MRI_EXPRESSION_KEY,
+    (MRI_KEY, ADNIMERGE_KEY): MRI_ADNIMERGE_KEY,
+    (ADNIMERGE_KEY, MRI_KEY): MRI_ADNIMERGE_KEY,
+    (EXPRESSION_KEY, ADNIMERGE_KEY): EXPRESSION_ADNIMERGE_KEY,
+    (ADNIMERGE_KEY, EXPRESSION_KEY): EXPRESSION_ADNIMERGE_KEY
+}
 
 
 def main():
@@ -32,16 +57,25 @@ def main():
     assert table is not None
 
     _, corrected_alpha = load(open(ALPHAS_PATH, 'rb'))
-    col_types: dict = get_col_types()
+    feat_index: FeatIndex = FeatIndex()
 
-    comp_dict_iter: IterByIdx = IterByIdx(
-        comp_dict_dir=comp_dict_dir, func=count_comparisons, idx=idx, section_size=section_size, col_types=col_types,
-        table=table, super_alpha=super_alpha, corrected_alpha=corrected_alpha, table_type=table_type
+    comp_dict_iter: ShardIterByIdx = ShardIterByIdx(
+        comp_dict_dir=comp_dict_dir, func=count_shard, idx=idx, section_size=section_size, feat_index=feat_index,
+        table=table, super_alpha=super_alpha, corrected_alpha=corrected_alpha, table_type=table_type, header_codes={}
     )
 
     start_idx: int = comp_dict_iter.start_idx
     stop_idx: int = comp_dict_iter.stop_idx
+    run: str = 'inter-counts-table-{}'.format(table_type) + ('' if subset is None else '-' + subset)
+    comp_dict_iter.heartbeat = Heartbeat(run=run, job_id=idx, n_cells=stop_idx - start_idx)
     comp_dict_iter()
+    save_table(table=table, table_type=table_type, subset=subset, start_idx=start_idx, stop_idx=stop_idx)
+    comp_dict_iter.heartbeat.finish()
+
+
+def save_table(table: DataFrame, table_type: str, subset: str, start_idx: int, stop_idx: int):
+    """Saves the counts table of a section of the comparison dictionaries"""
+
     print(table)
     inter_counts_tables_dir: str = get_inter_counts_tables_dir(table_type=table_type, subset=subset)
     counts_table_path: str = join(inter_counts_tables_dir, '{}-{}.csv'.format(start_idx, stop_idx))
@@ -79,57 +113,76 @@ def make_table(table_type: str) -> DataFrame:
     return table
 
 
-def count_comparisons(
-    feat1: str, feat2: str, p: float, col_types: dict, table: DataFrame, super_alpha: float, corrected_alpha: float,
-    table_type: str
+def count_shard(
+    feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, feat_index: FeatIndex, table: DataFrame,
+    super_alpha: float, corrected_alpha: float, table_type: str, header_codes: dict
 ):
-    """Determines the type of comparison and the alpha it is lower than and updates the counts table accordingly"""
-
-    if table_type == DATA_TYPE_TABLE_TYPE:
-        row_key: str = get_comparison_type(feat1=feat1, feat2=feat2, col_types=col_types)
-    else:
-        row_key: str = get_comparison_domains(feat1=feat1, feat2=feat2, col_types=col_types)
-
-    if p < MIN_ALPHA:
-        col_key: str = MAX_SIGNIFICANCE_KEY
-    elif p < super_alpha:
-        col_key: str = SUPER_ALPHA_KEY
-    else:
-        assert p <= corrected_alpha
+    """Determines the type of each comparison in a shard and the alpha it is lower than and adds the counts to the
+    counts table all at once. The features are mapped to their data type or domain codes, the p-values are bucketed by
+    the alphas and the counts of each row and column of the table come from a single bincount"""
 
-        col_key: str = CORRECTED_ALPHA_KEY
-
-    table[col_key][row_key] += 1
-    table[TOTAL_KEY][row_key] += 1
-    table[col_key][TOTAL_KEY] += 1
-    table[TOTAL_KEY][TOTAL_KEY] += 1
-
-
-def get_comparison_domains(feat1: str, feat2: str, col_types: dict) -> str:
-    """Indicates which domains the two features of a comparison come from"""
-
-    domain1: str = get_domain(feat=feat1, col_types=col_types)
-    domain2: str = get_domain(feat=feat2, col_types=col_types)
-
-    if domain1 == MRI_KEY and domain2 == MRI_KEY:
-        return MRI_MRI_KEY
+    codes, pair_rows = get_header_codes(
+        headers=headers, feat_index=feat_index, table=table, table_type=table_type, header_codes=header_codes
+    )
 
-    if domain1 == EXPRESSION_KEY and domain2 == EXPRESSION_KEY:
-        return EXPRESSION_EXPRESSION_KEY
+    n_codes: int = int(len(pair_rows) ** 0.5)
+    rows: ndarray = pair_rows[codes[feat1] * n_codes + codes[feat2]]
+
+    # Bucket each p-value as below the minimum alpha, below the super alpha or only below the corrected alpha
+    alpha_cols: ndarray = array([
+        table.columns.get_loc(MAX_SIGNIFICANCE_KEY), table.columns.get_loc(SUPER_ALPHA_KEY),
+        table.columns.get_loc(CORRECTED_ALPHA_KEY)
+    ])
+
+    buckets: ndarray = searchsorted([MIN_ALPHA, super_alpha], p, side='right')
+    cols: ndarray = alpha_cols[buckets]
+
+    assert (p[buckets == 2] <= corrected_alpha).all()
+
+    total_row: int = table.index.get_loc(TOTAL_KEY)
+    total_col: int = table.columns.get_loc(TOTAL_KEY)
+    n_rows, n_cols = table.shape
+    counts: ndarray = bincount(rows * n_cols + cols, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+    counts[:, total_col] = counts.sum(axis=1)
+    counts[total_row, :] = counts.sum(axis=0)
+    table.iloc[:, :] = table.to_numpy() + counts
+
+
+def get_header_codes(
+    headers: list, feat_index: FeatIndex, table: DataFrame, table_type: str, header_codes: dict
+) -> tuple:
+    """Gets the data type or domain code of each header from the feature index and the row of the counts table for each
+    pair of codes. The codes are kept in a cache so those of the shared headers of a directory of shards are only looked
+    up once"""
+
+    if header_codes.get(HEADERS_KEY) is not headers:
+        ids: ndarray = feat_index.get_ids(feats=headers)
+
+        if table_type == DATA_TYPE_TABLE_TYPE:
+            code_names: list = DATA_TYPES
+            pair_keys: dict = DATA_TYPE_PAIR_KEYS
+            codes: ndarray = feat_index.type_codes[ids]
+        else:
+            code_names: list = DOMAINS
+            pair_keys: dict = DOMAIN_PAIR_KEYS
+            codes: ndarray = feat_index.domain_codes[ids]
+
+        pair_rows: list = [
+            table.index.get_loc(pair_keys[(name1, name2)]) for name1 in code_names for name2 in code_names
+        ]
 
-    if domain1 == ADNIMERGE_KEY and domain2 == ADNIMERGE_KEY:
-        return ADNIMERGE_ADNIMERGE_KEY
+        header_codes[HEADERS_KEY] = headers
+        header_codes[CODES_KEY] = codes.astype(int)
+        header_codes[PAIR_ROWS_KEY] = array(pair_rows, dtype=int)
 
-    if (domain1 == MRI_KEY and domain2 == EXPRESSION_KEY) or (domain1 == EXPRESSION_KEY and domain2 == MRI_KEY):
-        return MRI_EXPRESSION_KEY
+    return header_codes[CODES_KEY], header_codes[PAIR_ROWS_KEY]
 
-    if (domain1 == MRI_KEY and domain2 == ADNIMERGE_KEY) or (domain1 == ADNIMERGE_KEY and domain2 == MRI_KEY):
-        return MRI_ADNIMERGE_KEY
 
-    assert (domain1 == EXPRESSION_KEY and domain2 == ADNIMERGE_KEY) or\
-           (domain1 == ADNIMERGE_KEY and domain2 == EXPRESSION_KEY)
+def merge_tables(kwargs: dict, other_kwargs: dict):
+    """Adds the counts table of another section to that of a section"""
 
-    return EXPRESSION_ADNIMERGE_KEY
+    table: DataFrame = kwargs['table']
+    table += other_kwargs['table']
 
 
 if __name__ == '__main__':
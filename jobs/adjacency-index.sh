@@ -0,0 +1,8 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+COMP_DICT_DIR=$1
+ADJACENCY_INDEX_DIR=$2
+
+python3 adjacency_index.py ${COMP_DICT_DIR} ${ADJACENCY_INDEX_DIR}
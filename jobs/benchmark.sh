@@ -0,0 +1,9 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+OUT_PATH=$1
+SIZES=$2
+N_ROWS=$3
+
+python3 benchmark.py ${OUT_PATH} ${SIZES} ${N_ROWS}
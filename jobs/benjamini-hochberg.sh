@@ -0,0 +1,9 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+COMP_DICT_DIR=$1
+FDR_Q=$2
+OUT_DIR=$3
+
+python3 benjamini_hochberg.py $COMP_DICT_DIR $FDR_Q $OUT_DIR
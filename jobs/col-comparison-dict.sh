@@ -7,5 +7,11 @@ COL_COMP_INPUTS_PATH=$2
 JOB_N=$3
 N_CORES=$4
 OUT_DIR=$5
+PROFILE=$6
+FDR_Q=$7
+FDR_SHARD_ALPHA=$8
+TOP_K=$9
+LSH_BANDS=${10}
+LSH_BAND_SIZE=${11}
 
-python3 col_comparison_dict.py $DATA_PATH $COL_COMP_INPUTS_PATH $JOB_N $N_CORES $OUT_DIR
+python3 col_comparison_dict.py $DATA_PATH $COL_COMP_INPUTS_PATH $JOB_N $N_CORES $OUT_DIR $PROFILE $FDR_Q $FDR_SHARD_ALPHA $TOP_K $LSH_BANDS $LSH_BAND_SIZE
@@ -0,0 +1,8 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+COMP_DICT_DIR=$1
+DATA_PATH=$2
+
+python3 convert_comp_dicts.py ${COMP_DICT_DIR} ${DATA_PATH}
@@ -3,5 +3,6 @@
 source ../env/bin/activate
 
 FEAT_MAP=$1
+MAKE_COL_STORES=$2
 
-python3 create_subset.py data/data.csv $FEAT_MAP adni
+python3 create_subset.py data/data.csv $FEAT_MAP adni $MAKE_COL_STORES
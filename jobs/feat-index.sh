@@ -0,0 +1,7 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+DATA_PATH=$1
+
+python3 feat_index.py ${DATA_PATH}
@@ -0,0 +1,17 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+COMP_DICT_DIR=$1
+IDX=$2
+SECTION_SIZE=$3
+SUPER_ALPHA=$4
+SIG_FREQS_PATH=$5
+SIG_FEATS_PATH=$6
+ALPHAS=$7
+ALPHA_FILTERED_DIRS=$8
+N_PROCESSES=$9
+SUBSET=${10}
+
+python3 fused_analysis.py $COMP_DICT_DIR $IDX $SECTION_SIZE $SUPER_ALPHA $SIG_FREQS_PATH $SIG_FEATS_PATH $ALPHAS \
+    $ALPHA_FILTERED_DIRS $N_PROCESSES $SUBSET
@@ -5,5 +5,6 @@ source ../env/bin/activate
 HEADER=$1
 ALPHA=$2
 MODE=$3
+ADJACENCY_INDEX_DIR=$4
 
-python3 get_correlated_features.py ${HEADER} ${ALPHA} ${MODE}
+python3 get_correlated_features.py ${HEADER} ${ALPHA} ${MODE} ${ADJACENCY_INDEX_DIR}
@@ -0,0 +1,12 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+DATA_PATH=$1
+ALPHA=$2
+BAND_SIZE=$3
+
+# The rest of the arguments are the numbers of bands to measure the recall of
+shift 3
+
+python3 lsh_recall.py $DATA_PATH $ALPHA $BAND_SIZE $@
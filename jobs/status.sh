@@ -0,0 +1,9 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+RUN=$1
+N_JOBS=$2
+N_SLOWEST=$3
+
+python3 status.py $RUN $N_JOBS $N_SLOWEST
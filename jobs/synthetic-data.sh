@@ -0,0 +1,12 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+DATA_PATH=$1
+N_ROWS=$2
+N_EXPRESSION=$3
+N_MRI=$4
+SEED=$5
+COL_TYPES_PATH=$6
+
+python3 synthetic_data.py ${DATA_PATH} ${N_ROWS} ${N_EXPRESSION} ${N_MRI} ${SEED} ${COL_TYPES_PATH}
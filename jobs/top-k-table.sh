@@ -0,0 +1,9 @@
+#!/bin/sh
+
+source ../env/bin/activate
+
+COMP_DICT_DIR=$1
+TABLE_PATH=$2
+K=$3
+
+python3 top_k_table.py $COMP_DICT_DIR $TABLE_PATH $K
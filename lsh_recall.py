@@ -0,0 +1,104 @@
+"""Measures the recall of the locality sensitive hashing candidates of the numeric to numeric comparisons against the
+exhaustive comparisons of a data set, which should be small enough to compare exhaustively like the debug data set, for
+each of the given numbers of bands. The recall is the fraction of the significant comparisons that are candidates and
+is reported along with the fraction of the comparisons that are candidates and the recall estimated from the
+verification sample, so the size of the sketches can be chosen"""
+
+from sys import argv
+from pickle import load
+from time import time
+from numpy import ndarray, array, arange, concatenate, isin, triu, nonzero
+
+from utils.utils import ALPHAS_PATH, NORMALITY_ALPHA
+from utils.batch_tests import num_num_tests, standardize, moments
+from utils.col_stats import ColStats, get_col_stats_dir
+from utils.col_store import ColStore, get_col_store_dir
+from utils.lsh import get_screened, get_recall, LSH_BAND_SIZE
+
+DATA_PATH: str = 'data/debug-data.csv'
+ROW_BLOCK_SIZE: int = 256
+
+
+def main():
+    """Main method"""
+
+    data_path: str = argv[1] if len(argv) > 1 else DATA_PATH
+    alpha: float = float(argv[2]) if len(argv) > 2 and argv[2] != 'none' else load(open(ALPHAS_PATH, 'rb'))[1]
+    band_size: int = int(argv[3]) if len(argv) > 3 else LSH_BAND_SIZE
+    n_bands_list: list = [int(n_bands) for n_bands in argv[4:]] if len(argv) > 4 else [4, 8, 16, 32, 64]
+
+    col_store: ColStore = ColStore(get_col_store_dir(data_path=data_path))
+    col_stats: ColStats = ColStats(get_col_stats_dir(data_path=data_path))
+
+    # The numeric columns of the column store and the column statistics are in the same order
+    assert col_stats.numeric_headers == [col_store.headers[i] for i in col_store.numeric_headers]
+
+    standardized: ndarray = standardize(data=col_store.numeric, means=col_stats.means, stds=col_stats.stds)
+    ranks: ndarray = array(col_stats.ranks, dtype=float)
+    rank_standardized: ndarray = standardize(ranks, *moments(data=ranks))
+    not_normal: ndarray = col_stats.normality_p < NORMALITY_ALPHA
+    n_cols: int = len(standardized)
+    rows: ndarray = arange(n_cols)
+
+    start_time: float = time()
+    significant: ndarray = get_significant(
+        standardized=standardized, rank_standardized=rank_standardized, not_normal=not_normal, alpha=alpha
+    )
+
+    n_pairs: int = n_cols * (n_cols - 1) // 2
+    print('Numeric Columns: {} | Pairs: {} | Significant At {}: {}'.format(n_cols, n_pairs, alpha, len(significant)))
+    print('Exhaustive Time: {}'.format(time() - start_time))
+
+    for n_bands in n_bands_list:
+        start_time: float = time()
+
+        candidates, samples = get_screened(
+            standardized=standardized, rank_standardized=rank_standardized, rows=rows, n_bands=n_bands,
+            band_size=band_size
+        )
+
+        lsh_time: float = time() - start_time
+        candidate_keys: ndarray = get_keys(rows=rows, cols=candidates, n_cols=n_cols)
+        sample_keys: ndarray = get_keys(rows=rows, cols=samples, n_cols=n_cols)
+        n_found: int = int(isin(significant, candidate_keys).sum())
+        n_sample_found: int = int(isin(significant, sample_keys).sum())
+
+        print(
+            'Bands: {} Of {} Bits | Candidates: {:.2f}% | Recall: {:.4f} | Estimated Recall: {:.4f} | Time: {}'.format(
+                n_bands, band_size, len(candidate_keys) / n_pairs * 100 if n_pairs > 0 else 0.0,
+                n_found / len(significant) if len(significant) > 0 else 1.0,
+                get_recall(n_found=n_found, n_sample_found=n_sample_found), lsh_time
+            )
+        )
+
+
+def get_significant(standardized: ndarray, rank_standardized: ndarray, not_normal: ndarray, alpha: float) -> ndarray:
+    """Gets the keys of the numeric pairs with p-values at or below the alpha, comparing the columns exhaustively a
+    block of rows at a time"""
+
+    n_cols: int = len(standardized)
+    keys: list = []
+
+    for start in range(0, n_cols, ROW_BLOCK_SIZE):
+        stop: int = min(start + ROW_BLOCK_SIZE, n_cols)
+
+        p: ndarray = num_num_tests(
+            standardized=standardized, rank_standardized=rank_standardized, not_normal=not_normal,
+            rows=arange(start, stop), col_start=0, col_stop=n_cols, alpha=alpha
+        )
+
+        # Only the pairs up and to the right of the diagonal are compared
+        block_rows, block_cols = nonzero(triu(p <= alpha, k=start + 1))
+        keys.append((block_rows + start) * n_cols + block_cols)
+
+    return concatenate(keys)
+
+
+def get_keys(rows: ndarray, cols: list, n_cols: int) -> ndarray:
+    """Gets the keys of the pairs of each row and its columns"""
+
+    return concatenate([array([], dtype=int)] + [row * n_cols + row_cols for row, row_cols in zip(rows, cols)])
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,11 @@
 
 from sys import argv
 from pickle import dump
+from numpy import ndarray
 
-from utils.iterate_comp_dicts import BasicDictIter
-from utils.utils import get_domain, get_col_types, MRI_KEY
+from utils.iterate_comp_dicts import ShardIter
+from utils.feat_index import FeatIndex, DOMAINS
+from utils.utils import MRI_KEY
 
 
 def main():
@@ -18,50 +20,39 @@ def main():
         alpha: float = float(argv[3])
 
     significance_feats: dict = {}
-    col_types: dict = get_col_types()
+    feat_index: FeatIndex = FeatIndex()
 
-    comp_dict_iter: BasicDictIter = BasicDictIter(
-        comp_dict_dir=comp_dict_dir, use_p=True, func=add_feats,
-        significance_feats=significance_feats, col_types=col_types, alpha=alpha
+    comp_dict_iter: ShardIter = ShardIter(
+        comp_dict_dir=comp_dict_dir, func=add_shard_feats, significance_feats=significance_feats,
+        feat_index=feat_index, alpha=alpha
     )
 
     comp_dict_iter()
     dump(significance_feats, open(file_path, 'wb'))
 
 
-def add_feats(feat1: str, feat2: str, p: float, significance_feats: dict, col_types: dict, alpha: float):
-    """Appends to the list of strongly correlated features for the two features in a comparison"""
+def add_shard_feats(
+    feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, significance_feats: dict, feat_index: FeatIndex,
+    alpha: float
+):
+    """Appends to the lists of strongly correlated features for the two features in each comparison of a shard. The
+    comparisons are filtered all at once and only those that are kept are looked at one by one"""
 
-    add_feat(
-        feat=feat1, other=feat2, significance_feats=significance_feats, col_types=col_types, p=p,
-        alpha=alpha
-    )
-
-    add_feat(
-        feat=feat2, other=feat1, significance_feats=significance_feats, col_types=col_types, p=p,
-        alpha=alpha
-    )
-
-
-def add_feat(feat: str, other: str, significance_feats: dict, col_types: dict, p: float, alpha: float):
-    """Appends to the list of features that are strongly correlated with a given feature"""
+    # MRI features are not listed and should not be in the lists of other features either to save space
+    not_mri: ndarray = feat_index.domain_codes[feat_index.get_ids(feats=headers)] != DOMAINS.index(MRI_KEY)
+    kept: ndarray = not_mri[feat1] & not_mri[feat2]
 
     if alpha is not None:
         # If there is an alpha specified, ensure the p value meets the alpha
-        if p > alpha:
-            return
+        kept &= ~(p > alpha)
 
-    domain: str = get_domain(feat=feat, col_types=col_types)
+    for feat1, feat2 in zip(feat1[kept].tolist(), feat2[kept].tolist()):
+        add_feat(feat=headers[feat1], other=headers[feat2], significance_feats=significance_feats)
+        add_feat(feat=headers[feat2], other=headers[feat1], significance_feats=significance_feats)
 
-    if domain == MRI_KEY:
-        # Do not list MRI features
-        return
 
-    other_domain: str = get_domain(feat=other, col_types=col_types)
-
-    if other_domain == MRI_KEY:
-        # The other feature should not be MRI either to save space
-        return
+def add_feat(feat: str, other: str, significance_feats: dict):
+    """Appends to the list of features that are strongly correlated with a given feature"""
 
     if feat in significance_feats:
         significance_feats[feat].append(other)
@@ -69,5 +60,17 @@ def add_feat(feat: str, other: str, significance_feats: dict, col_types: dict, p
         significance_feats[feat] = [other]
 
 
+def merge_feats(kwargs: dict, other_kwargs: dict):
+    """Appends the significance features of another section to those of a section"""
+
+    significance_feats: dict = kwargs['significance_feats']
+
+    for feat, others in other_kwargs['significance_feats'].items():
+        if feat in significance_feats:
+            significance_feats[feat].extend(others)
+        else:
+            significance_feats[feat] = others
+
+
 if __name__ == '__main__':
     main()
@@ -1,20 +1,13 @@
-"""Makes a mapping from feature to the number of its comparisons that have a maximum significance (lowest possible p)"""
+"""Makes a mapping from feature to the number of its comparisons that have a maximum significance (lowest possible p).
+The mapping is an array with a row for each feature ID in the feature index and a column for each domain code, counting
+the significant comparisons of the feature with features of that domain"""
 
 from sys import argv
 from pickle import dump
+from numpy import ndarray, zeros, bincount, concatenate, int64
 
-from utils.iterate_comp_dicts import BasicDictIter
-
-from utils.utils import (
-    get_domain, get_col_types, ADNIMERGE_FREQ_KEY,
-    EXPRESSION_FREQ_KEY, MRI_FREQ_KEY, TOTAL_FREQ_KEY, ADNIMERGE_KEY, EXPRESSION_KEY, MRI_KEY
-)
-
-DOMAIN_TO_DOMAIN_FREQ_KEY: dict = {
-    ADNIMERGE_KEY: ADNIMERGE_FREQ_KEY,
-    EXPRESSION_KEY: EXPRESSION_FREQ_KEY,
-    MRI_KEY: MRI_FREQ_KEY
-}
+from utils.iterate_comp_dicts import ShardIter
+from utils.feat_index import FeatIndex, DOMAINS
 
 
 def main():
@@ -27,56 +20,53 @@ def main():
     if len(argv) > 3:
         alpha: float = float(argv[3])
 
-    significance_frequencies: dict = {}
-    col_types: dict = get_col_types()
+    feat_index: FeatIndex = FeatIndex()
+    significance_frequencies: ndarray = make_frequencies(feat_index=feat_index)
 
-    comp_dict_iter: BasicDictIter = BasicDictIter(
-        comp_dict_dir=comp_dict_dir, use_p=True, func=add_frequencies,
-        significance_frequencies=significance_frequencies, col_types=col_types, alpha=alpha
+    comp_dict_iter: ShardIter = ShardIter(
+        comp_dict_dir=comp_dict_dir, func=add_shard_frequencies, significance_frequencies=significance_frequencies,
+        feat_index=feat_index, alpha=alpha
     )
 
     comp_dict_iter()
     dump(significance_frequencies, open(file_path, 'wb'))
 
 
-def add_frequencies(feat1: str, feat2: str, p: float, significance_frequencies: dict, col_types: dict, alpha: float):
-    """Increments the frequencies of two features in a comparison"""
+def make_frequencies(feat_index: FeatIndex) -> ndarray:
+    """Makes the empty significance frequencies of every feature with every domain"""
 
-    add_frequency(
-        feat=feat1, other=feat2, significance_frequencies=significance_frequencies, col_types=col_types, p=p,
-        alpha=alpha
-    )
-
-    add_frequency(
-        feat=feat2, other=feat1, significance_frequencies=significance_frequencies, col_types=col_types, p=p,
-        alpha=alpha
-    )
+    return zeros((len(feat_index.headers), len(DOMAINS)), dtype=int64)
 
 
-def add_frequency(feat: str, other: str, significance_frequencies: dict, col_types: dict, p: float, alpha: float):
-    """Increments the frequency for a given feature"""
+def add_shard_frequencies(
+    feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, significance_frequencies: ndarray, feat_index: FeatIndex,
+    alpha: float
+):
+    """Increments the frequencies of both features of each comparison in a shard with the domain of the other feature"""
 
     if alpha is not None:
-        # If there is an alpha specified, ensure the p value meets the alpha
-        if p > alpha:
-            return
-
-    other_domain: str = get_domain(feat=other, col_types=col_types)
-    other_domain_freq_key: str = DOMAIN_TO_DOMAIN_FREQ_KEY[other_domain]
-
-    if feat in significance_frequencies:
-        significance_frequencies[feat][TOTAL_FREQ_KEY] += 1
-        significance_frequencies[feat][other_domain_freq_key] += 1
-    else:
-        freqs: dict = {
-            TOTAL_FREQ_KEY: 1,
-            ADNIMERGE_FREQ_KEY: 0,
-            EXPRESSION_FREQ_KEY: 0,
-            MRI_FREQ_KEY: 0
-        }
-
-        freqs[other_domain_freq_key] = 1
-        significance_frequencies[feat] = freqs
+        # If there is an alpha specified, ensure the p values meet the alpha. NaN p-values are kept as they always were
+        meets_alpha: ndarray = ~(p > alpha)
+        feat1: ndarray = feat1[meets_alpha]
+        feat2: ndarray = feat2[meets_alpha]
+
+    ids: ndarray = feat_index.get_ids(feats=headers)
+    feat1: ndarray = ids[feat1]
+    feat2: ndarray = ids[feat2]
+    feats: ndarray = concatenate([feat1, feat2]).astype(int64)
+    other_domains: ndarray = feat_index.domain_codes[concatenate([feat2, feat1])]
+
+    # Each feature and domain code pair is a cell of the flattened frequencies
+    n_domains: int = len(DOMAINS)
+    n_cells: int = significance_frequencies.size
+    counts: ndarray = bincount(feats * n_domains + other_domains, minlength=n_cells)
+    significance_frequencies += counts.reshape(significance_frequencies.shape)
+
+
+def merge_frequencies(kwargs: dict, other_kwargs: dict):
+    """Adds the significance frequencies of another section to those of a section"""
+
+    kwargs['significance_frequencies'] += other_kwargs['significance_frequencies']
 
 
 if __name__ == '__main__':
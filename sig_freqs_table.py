@@ -1,57 +1,80 @@
-"""Creates the table from the dictionary data created by the sig-freqs script"""
+"""Creates the table from the frequency data created by the sig-freqs script"""
 
 from pandas import DataFrame, unique
 from pickle import load
-from tqdm import tqdm
 from sys import argv
+from numpy import ndarray, array, argsort, flatnonzero
 
 from utils.utils import (
-    get_col_types, get_domain, TOTAL_FREQ_KEY, ADNIMERGE_FREQ_KEY, EXPRESSION_FREQ_KEY, MRI_FREQ_KEY, DOMAIN_KEY
+    TOTAL_FREQ_KEY, ADNIMERGE_FREQ_KEY, EXPRESSION_FREQ_KEY, MRI_FREQ_KEY, DOMAIN_KEY, ADNIMERGE_KEY, EXPRESSION_KEY,
+    MRI_KEY
 )
 
+from utils.feat_index import FeatIndex, DOMAINS
+from sig_freqs import make_frequencies
+
 FEAT_KEY: str = 'Feature'
 
+DOMAIN_TO_DOMAIN_FREQ_KEY: dict = {
+    ADNIMERGE_KEY: ADNIMERGE_FREQ_KEY,
+    EXPRESSION_KEY: EXPRESSION_FREQ_KEY,
+    MRI_KEY: MRI_FREQ_KEY
+}
+
 
 def main() -> DataFrame:
-    """Makes the significance frequencies table from the corresponding dictionary"""
+    """Makes the significance frequencies table from the corresponding frequencies"""
 
     dict_path: str = argv[1]
     table_path: str = argv[2]
 
-    significance_frequencies: dict = load(open(dict_path, 'rb'))
-    sort_func: callable = lambda key: significance_frequencies[key][TOTAL_FREQ_KEY]
+    feat_index: FeatIndex = FeatIndex()
+    significance_frequencies = load(open(dict_path, 'rb'))
 
-    significance_frequencies: list = [(key, significance_frequencies[key]) for key in sorted(
-        significance_frequencies, key=sort_func, reverse=True
-    )]
+    if isinstance(significance_frequencies, dict):
+        significance_frequencies: ndarray = dict_to_frequencies(
+            significance_frequencies=significance_frequencies, feat_index=feat_index
+        )
 
-    table: DataFrame = DataFrame(columns=[
-        FEAT_KEY, ADNIMERGE_FREQ_KEY, EXPRESSION_FREQ_KEY, MRI_FREQ_KEY, TOTAL_FREQ_KEY, DOMAIN_KEY
-    ])
+    table: DataFrame = make_sig_freqs_table(significance_frequencies=significance_frequencies, feat_index=feat_index)
 
-    col_types: dict = get_col_types()
+    assert len(unique(table[FEAT_KEY])) == len(table)
 
-    for feat, feat_freqs in tqdm(significance_frequencies):
-        adnimerge_freq: int = feat_freqs[ADNIMERGE_FREQ_KEY]
-        expression_freq: int = feat_freqs[EXPRESSION_FREQ_KEY]
-        mri_freq: int = feat_freqs[MRI_FREQ_KEY]
-        total_freq: int = feat_freqs[TOTAL_FREQ_KEY]
-        domain: str = get_domain(feat=feat, col_types=col_types)
+    table.to_csv(table_path, index=False)
 
-        row: dict = {
-            FEAT_KEY: feat,
-            ADNIMERGE_FREQ_KEY: adnimerge_freq,
-            EXPRESSION_FREQ_KEY: expression_freq,
-            MRI_FREQ_KEY: mri_freq,
-            TOTAL_FREQ_KEY: total_freq,
-            DOMAIN_KEY: domain
-        }
 
-        table: DataFrame = table.append(row, ignore_index=True)
+def make_sig_freqs_table(significance_frequencies: ndarray, feat_index: FeatIndex) -> DataFrame:
+    """Makes the table of the features in at least one significant comparison, sorted by their total frequency with ties
+    in the order of the feature IDs"""
 
-    assert len(unique(table[FEAT_KEY])) == len(table)
+    total_freqs: ndarray = significance_frequencies.sum(axis=1)
+    feat_ids: ndarray = flatnonzero(total_freqs)
+    feat_ids: ndarray = feat_ids[argsort(-total_freqs[feat_ids], kind='stable')]
+    headers: ndarray = array(feat_index.headers, dtype=object)
+    domains: ndarray = array(DOMAINS, dtype=object)
+    table: dict = {FEAT_KEY: headers[feat_ids]}
 
-    table.to_csv(table_path, index=False)
+    for domain, domain_freq_key in DOMAIN_TO_DOMAIN_FREQ_KEY.items():
+        table[domain_freq_key] = significance_frequencies[feat_ids, DOMAINS.index(domain)]
+
+    table[TOTAL_FREQ_KEY] = total_freqs[feat_ids]
+    table[DOMAIN_KEY] = domains[feat_index.domain_codes[feat_ids]]
+    return DataFrame(table)
+
+
+def dict_to_frequencies(significance_frequencies: dict, feat_index: FeatIndex) -> ndarray:
+    """Converts significance frequencies in the former format, a dictionary of the frequencies of each feature, to an
+    array"""
+
+    frequencies: ndarray = make_frequencies(feat_index=feat_index)
+
+    for feat, feat_freqs in significance_frequencies.items():
+        feat_id: int = feat_index.get_id(feat=feat)
+
+        for domain, domain_freq_key in DOMAIN_TO_DOMAIN_FREQ_KEY.items():
+            frequencies[feat_id, DOMAINS.index(domain)] = feat_freqs[domain_freq_key]
+
+    return frequencies
 
 
 if __name__ == '__main__':
@@ -0,0 +1,121 @@
+"""Reports the status of a run of jobs from their heartbeats: how many of the jobs are done, running, stalled or
+missing, the overall throughput of the running jobs, the estimated time until the run is done and the slowest jobs"""
+
+from sys import argv
+from time import time
+from datetime import timedelta
+
+from utils.heartbeat import (
+    load_latest_records, get_seconds_left, STATUS_DIR, TIME_KEY, CELLS_DONE_KEY, CELLS_TOTAL_KEY, CELLS_PER_SEC_KEY,
+    PAIRS_PER_SEC_KEY, PAIRS_DONE_KEY, RSS_KEY, DONE_KEY, HOST_KEY
+)
+
+N_SLOWEST: int = 10
+
+# A job that is not done and has not recorded a heartbeat in this many seconds is considered stalled
+STALL_SECONDS: float = 15 * 60.0
+
+
+def main():
+    """Main method"""
+
+    run: str = argv[1]
+    n_jobs: int = int(argv[2]) if len(argv) > 2 else None
+    n_slowest: int = int(argv[3]) if len(argv) > 3 else N_SLOWEST
+
+    records: dict = load_latest_records(run=run)
+    print('Run: {} | Status Directory: {}'.format(run, STATUS_DIR))
+
+    if len(records) == 0:
+        print('No Jobs Have Started')
+        return
+
+    now: float = time()
+    done: list = [job_id for job_id, record in records.items() if record[DONE_KEY]]
+    running: list = [job_id for job_id, record in records.items() if not record[DONE_KEY]]
+    stalled: list = [job_id for job_id in running if now - records[job_id][TIME_KEY] > STALL_SECONDS]
+    active: list = [job_id for job_id in running if job_id not in stalled]
+
+    # Given the number of jobs in the run, those numbered from 0 that have no heartbeats never started
+    if n_jobs is None:
+        missing: list = []
+    else:
+        missing: list = [job_id for job_id in range(n_jobs) if str(job_id) not in records]
+
+    print('Jobs: {} Started, {} Done, {} Running, {} Stalled, {} Missing'.format(
+        len(records), len(done), len(active), len(stalled), len(missing)
+    ))
+
+    report_throughput(records=records, active=active, n_missing=len(missing))
+    report_slowest(records=records, running=running, now=now, n_slowest=n_slowest)
+
+    if len(stalled) > 0:
+        print('Stalled Jobs:', ' '.join(sorted(stalled, key=sort_key)))
+
+    if len(missing) > 0:
+        print('Missing Jobs:', ' '.join(str(job_id) for job_id in missing))
+
+
+def report_throughput(records: dict, active: list, n_missing: int):
+    """Prints the cells done out of the total, the throughput of the running jobs and the estimated time until the run
+    is done. The cells of the missing jobs are estimated from the mean of the jobs that started"""
+
+    cells_done: int = sum(record[CELLS_DONE_KEY] for record in records.values())
+    cells_total: float = sum(record[CELLS_TOTAL_KEY] for record in records.values())
+    cells_total += cells_total / len(records) * n_missing
+    pairs_done: int = sum(record[PAIRS_DONE_KEY] for record in records.values())
+    cells_per_sec: float = sum(records[job_id][CELLS_PER_SEC_KEY] for job_id in active)
+    pairs_per_sec: float = sum(records[job_id][PAIRS_PER_SEC_KEY] for job_id in active)
+    peak_rss: float = max(record[RSS_KEY] for record in records.values())
+
+    print('Cells: {} Of {:.0f} Done ({:.2f}%)'.format(
+        cells_done, cells_total, cells_done / cells_total * 100 if cells_total > 0 else 100.0
+    ))
+
+    print('Pairs Done Since The Jobs Last Started: {}'.format(pairs_done))
+    print('Throughput: {:.1f} Pairs Per Second, {:.3f} Cells Per Second'.format(pairs_per_sec, cells_per_sec))
+    print('Peak RSS Of Any Job: {:.2f} MB'.format(peak_rss))
+
+    if cells_per_sec > 0:
+        print('Estimated Time Left:', format_seconds(seconds=(cells_total - cells_done) / cells_per_sec))
+    else:
+        print('Estimated Time Left: Unknown')
+
+
+def report_slowest(records: dict, running: list, now: float, n_slowest: int):
+    """Prints the running jobs that will take the longest to finish at their own rate"""
+
+    if len(running) == 0:
+        return
+
+    slowest: list = sorted(running, key=lambda job_id: -get_seconds_left(record=records[job_id]))[:n_slowest]
+    print('Slowest Jobs:')
+
+    for job_id in slowest:
+        record: dict = records[job_id]
+
+        print('Job {} On {}: {:.2f}% Done, {:.1f} Pairs Per Second, {:.2f} MB Peak RSS, {} Left, {} Since Beat'.format(
+            job_id, record[HOST_KEY],
+            record[CELLS_DONE_KEY] / record[CELLS_TOTAL_KEY] * 100 if record[CELLS_TOTAL_KEY] > 0 else 100.0,
+            record[PAIRS_PER_SEC_KEY], record[RSS_KEY], format_seconds(seconds=get_seconds_left(record=record)),
+            format_seconds(seconds=now - record[TIME_KEY])
+        ))
+
+
+def format_seconds(seconds: float) -> str:
+    """Formats a number of seconds as days, hours, minutes and seconds"""
+
+    if seconds == float('inf'):
+        return 'Unknown'
+
+    return str(timedelta(seconds=int(seconds)))
+
+
+def sort_key(job_id: str) -> tuple:
+    """Sorts numeric job IDs by their number and before the other job IDs"""
+
+    return (0, int(job_id), '') if job_id.isdigit() else (1, 0, job_id)
+
+
+if __name__ == '__main__':
+    main()
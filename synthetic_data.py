@@ -0,0 +1,33 @@
+"""Creates a seeded synthetic data set with the shape of the real data set for testing and benchmarking without the real
+data"""
+
+from sys import argv
+from os.path import isfile
+
+from utils.utils import COL_TYPES_PICKLE_PATH
+from utils.synthetic_data import write_synthetic_data
+
+
+def main():
+    """Main method"""
+
+    data_path: str = argv[1]
+    n_rows: int = int(argv[2])
+    n_expression: int = int(argv[3])
+    n_mri: int = int(argv[4])
+    seed: int = int(argv[5]) if len(argv) > 5 else 0
+    col_types_path: str = argv[6] if len(argv) > 6 else COL_TYPES_PICKLE_PATH
+
+    # The column types of the real data set are at the default path so existing column types are never overwritten
+    if isfile(col_types_path):
+        print('ERROR: Column types already exist at {}, which may be those of the real data set'.format(col_types_path))
+        exit(1)
+
+    write_synthetic_data(
+        data_path=data_path, col_types_path=col_types_path, n_rows=n_rows, n_expression=n_expression,
+        n_mri=n_mri, seed=seed
+    )
+
+
+if __name__ == '__main__':
+    main()
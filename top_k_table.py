@@ -0,0 +1,77 @@
+"""Merges the top K tables that the jobs made alongside their shards into the top K table of the whole data set and
+writes it as a CSV with the K strongest comparisons of each feature, from the strongest, along with their p-values and
+effect sizes. The tables are merged one at a time so only one of them and the merged table are ever in memory"""
+
+from sys import argv
+from os import listdir
+from os.path import join, isfile
+from pandas import DataFrame
+from numpy import ndarray, empty, array
+
+from utils.comp_shards import is_comp_file, load_headers, SHARD_EXT
+from utils.top_k import (
+    load_top_k_table, merge_top_k_tables, get_ranks, get_top_k_path, TOP_K_DTYPE, FEAT_FIELD, PARTNER_FIELD, P_FIELD,
+    EFFECT_FIELD
+)
+
+FEAT_KEY: str = 'Feature'
+RANK_KEY: str = 'Rank'
+PARTNER_KEY: str = 'Partner'
+P_KEY: str = 'P-Value'
+EFFECT_KEY: str = 'Effect Size'
+
+
+def main():
+    """Main method"""
+
+    comp_dict_dir: str = argv[1]
+    table_path: str = argv[2]
+    k: int = int(argv[3]) if len(argv) > 3 else None
+
+    shard_names: list = sorted(file_name for file_name in listdir(comp_dict_dir) if is_comp_file(file_name))
+    top_k_paths: list = [get_top_k_path(shard_path=join(comp_dict_dir, file_name)) for file_name in shard_names]
+
+    # Each job makes the top K table of its shard so every shard must have one or the partners in its comparisons would
+    # be missing from the table
+    assert all(file_name.endswith(SHARD_EXT) for file_name in shard_names)
+    assert len(top_k_paths) > 0
+    assert all(isfile(path) for path in top_k_paths)
+
+    merged: ndarray = empty(0, dtype=TOP_K_DTYPE)
+
+    for path in top_k_paths:
+        table, table_k = load_top_k_table(path=path)
+
+        # A table can only give the K strongest comparisons of its features for a K up to its own
+        if k is None:
+            k: int = table_k
+
+        assert k <= table_k
+
+        merged: ndarray = merge_top_k_tables(tables=[merged, table], k=k)
+
+    print('Number Of Top K Tables:', len(top_k_paths))
+    print('K:', k)
+    print('Number Of Features:', len(set(merged[FEAT_FIELD].tolist())))
+
+    table: DataFrame = make_top_k_csv_table(top_k_table=merged, headers=load_headers(shard_dir=comp_dict_dir))
+    table.to_csv(table_path, index=False)
+
+
+def make_top_k_csv_table(top_k_table: ndarray, headers: list) -> DataFrame:
+    """Makes the table of the K strongest comparisons of each feature, with the headers of the features and their
+    partners and the rank of each comparison within its feature, starting from 1"""
+
+    headers: ndarray = array(headers, dtype=object)
+
+    return DataFrame({
+        FEAT_KEY: headers[top_k_table[FEAT_FIELD]],
+        RANK_KEY: get_ranks(table=top_k_table) + 1,
+        PARTNER_KEY: headers[top_k_table[PARTNER_FIELD]],
+        P_KEY: top_k_table[P_FIELD],
+        EFFECT_KEY: top_k_table[EFFECT_FIELD]
+    })
+
+
+if __name__ == '__main__':
+    main()
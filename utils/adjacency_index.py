@@ -0,0 +1,96 @@
+"""Contains functionality for the adjacency index, a compressed sparse row structure of the comparisons in a directory
+of filtered comparisons. The neighbors of each feature and their p-values are stored contiguously between two offsets
+and sorted by p-value so the features correlated with a feature below an alpha can be found without a full scan"""
+
+from os import makedirs
+from os.path import join
+from numpy import (
+    ndarray, concatenate, empty, zeros, lexsort, bincount, cumsum, searchsorted, int32, int64, float64,
+    save as save_array, load as load_array
+)
+
+from utils.iterate_comp_dicts import ShardIter
+from utils.feat_index import FeatIndex
+
+ADJACENCY_INDEX_DIR: str = 'data/adjacency-index'
+OFFSETS_FILE: str = 'offsets.npy'
+NEIGHBORS_FILE: str = 'neighbors.npy'
+P_FILE: str = 'p.npy'
+
+
+def write_adjacency_index(comp_dict_dir: str, adjacency_index_dir: str, feat_index: FeatIndex):
+    """Creates the adjacency index of a directory of comparisons, which are expected to be filtered so that all their
+    edges fit in memory. Each comparison is an edge in both directions"""
+
+    sources: list = []
+    targets: list = []
+    all_p: list = []
+
+    comp_dict_iter: ShardIter = ShardIter(
+        comp_dict_dir=comp_dict_dir, func=add_edges, feat_index=feat_index, sources=sources, targets=targets,
+        all_p=all_p
+    )
+
+    comp_dict_iter()
+
+    sources: ndarray = concatenate([empty(0, dtype=int64)] + sources)
+    targets: ndarray = concatenate([empty(0, dtype=int32)] + targets)
+    all_p: ndarray = concatenate([empty(0, dtype=float64)] + all_p)
+
+    # Group the edges by their source feature and sort each group by p-value, keeping the order of the comparisons for
+    # equal p-values
+    order: ndarray = lexsort((all_p, sources))
+    n_feats: int = len(feat_index.headers)
+    offsets: ndarray = zeros(n_feats + 1, dtype=int64)
+    offsets[1:] = cumsum(bincount(sources, minlength=n_feats))
+
+    makedirs(adjacency_index_dir, exist_ok=True)
+    save_array(join(adjacency_index_dir, OFFSETS_FILE), offsets)
+    save_array(join(adjacency_index_dir, NEIGHBORS_FILE), targets[order])
+    save_array(join(adjacency_index_dir, P_FILE), all_p[order])
+
+
+def add_edges(
+    feat1: ndarray, feat2: ndarray, p: ndarray, headers: list, feat_index: FeatIndex, sources: list, targets: list,
+    all_p: list
+):
+    """Adds the comparisons of a shard as edges from the first feature to the second and the second to the first, with
+    the features given by their IDs in the feature index"""
+
+    ids: ndarray = feat_index.get_ids(feats=headers)
+    feat1: ndarray = ids[feat1]
+    feat2: ndarray = ids[feat2]
+    sources.extend([feat1.astype(int64), feat2.astype(int64)])
+    targets.extend([feat2.astype(int32), feat1.astype(int32)])
+
+    # The p-values are copied out of the memory mapped shard
+    all_p.extend([p.astype(float64), p.astype(float64)])
+
+
+class AdjacencyIndex:
+    """A memory mapped adjacency index. Only the neighbors of the features that are queried are read from disk"""
+
+    def __init__(self, adjacency_index_dir: str, feat_index: FeatIndex):
+        self.feat_index: FeatIndex = feat_index
+        self.offsets: ndarray = load_array(join(adjacency_index_dir, OFFSETS_FILE), mmap_mode='r')
+        self.neighbors: ndarray = load_array(join(adjacency_index_dir, NEIGHBORS_FILE), mmap_mode='r')
+        self.p: ndarray = load_array(join(adjacency_index_dir, P_FILE), mmap_mode='r')
+
+        assert len(self.offsets) == len(feat_index.headers) + 1
+        assert len(self.neighbors) == len(self.p) == self.offsets[-1]
+
+    def get_correlates(self, feat: str, alpha: float = None) -> list:
+        """Gets the features that a feature was compared to with a p-value below an alpha, or all of them if there is no
+        alpha, along with the p-values, from the most to the least significant"""
+
+        feat_id: int = self.feat_index.get_id(feat=feat)
+        start: int = int(self.offsets[feat_id])
+        stop: int = int(self.offsets[feat_id + 1])
+
+        # The p-values of the feature's neighbors are sorted so the ones below the alpha come first
+        if alpha is not None:
+            stop: int = start + int(searchsorted(self.p[start:stop], alpha, side='left'))
+
+        neighbors: list = self.neighbors[start:stop].tolist()
+        p: list = self.p[start:stop].tolist()
+        return [(self.feat_index.headers[neighbor], neighbor_p) for neighbor, neighbor_p in zip(neighbors, p)]
@@ -0,0 +1,370 @@
+"""Contains vectorized versions of the statistical tests in utils.utils that compare many columns at once. Throughout, a
+2-D array holds one column of the data set per row so a contiguous range of features is a contiguous block of memory"""
+
+from numpy import (
+    ndarray, abs as np_abs, clip, empty, errstate, newaxis, sqrt, nan, arange, bincount, minimum, sign, where, inf,
+    asarray, full, zeros, ones, nonzero, sort, cumsum
+)
+from functools import lru_cache
+from scipy.special import betaincc, stdtr, chdtrc, fdtrc, betainccinv, betaincinv, stdtrit, chdtri
+from scipy.stats import normaltest, rankdata
+
+from utils.utils import NORMALITY_ALPHA, MIN_CHISQ_FREQ, MIN_CAT_SIZE
+from utils.profiling import profiled, add_rejections, MIN_CHISQ_FREQ_KEY, MIN_CAT_SIZE_KEY
+
+# The relative margin below a critical value within which a statistic still gets an exact p-value, which covers the
+# error of inverting the distribution
+CRITICAL_MARGIN: float = 1e-6
+
+
+def not_normal_distributions(data: ndarray) -> ndarray:
+    """Checks which rows of a 2-D array do not follow a normal distribution"""
+
+    p: ndarray = normaltest(data, axis=1)[1]
+    return p < NORMALITY_ALPHA
+
+
+def moments(data: ndarray) -> tuple:
+    """Gets the mean and standard deviation of each row of a 2-D array. Constant rows get a standard deviation of
+    exactly zero, which floating point error would not otherwise guarantee"""
+
+    means: ndarray = data.mean(axis=1)
+    stds: ndarray = data.std(axis=1)
+    stds[(data == data[:, :1]).all(axis=1)] = 0.0
+    return means, stds
+
+
+def standardize(data: ndarray, means: ndarray, stds: ndarray) -> ndarray:
+    """Centers the rows of a 2-D array and scales them to unit length so the dot product of two rows is their Pearson
+    correlation coefficient. Constant rows become NaN, just as pearsonr and spearmanr return NaN for them"""
+
+    n: int = data.shape[1]
+
+    with errstate(invalid='ignore', divide='ignore'):
+        data: ndarray = (data - means[:, newaxis]) / (stds[:, newaxis] * sqrt(n))
+
+    data[stds == 0.0] = nan
+    return data
+
+
+def pearson_p_values(r: ndarray, n: int, alpha: float = None) -> ndarray:
+    """Converts Pearson correlation coefficients to two-sided p-values the same way pearsonr does. Given an alpha, the
+    p-values of coefficients below the critical coefficient are set to one rather than computed"""
+
+    ab: float = n / 2 - 1
+    r: ndarray = np_abs(clip(r, -1.0, 1.0))
+    p: ndarray = ones(r.shape)
+    survivors: ndarray = get_survivors(statistics=r, critical=critical_pearson_r(n=n, alpha=alpha))
+    p[survivors] = 2 * betaincc(ab, ab, (r[survivors] + 1) / 2)
+    return p
+
+
+def spearman_p_values(r: ndarray, n: int, alpha: float = None) -> ndarray:
+    """Converts Spearman correlation coefficients to two-sided p-values the same way spearmanr does. Given an alpha, the
+    p-values of coefficients below the critical coefficient are set to one rather than computed"""
+
+    dof: int = n - 2
+    p: ndarray = ones(r.shape)
+    survivors: ndarray = get_survivors(statistics=np_abs(r), critical=critical_spearman_r(n=n, alpha=alpha))
+    r: ndarray = r[survivors]
+
+    with errstate(divide='ignore', invalid='ignore'):
+        t: ndarray = r * sqrt((dof / ((r + 1.0) * (1.0 - r))).clip(0))
+
+    p[survivors] = 2 * stdtr(dof, -np_abs(t))
+    return p
+
+
+def get_survivors(statistics: ndarray, critical) -> ndarray:
+    """Checks which statistics could have a p-value at or below an alpha given their critical value for that alpha, or
+    None if there is no alpha. Statistics that are NaN survive so they get a p-value of NaN as usual"""
+
+    if critical is None:
+        return ones(statistics.shape, dtype=bool)
+
+    with errstate(invalid='ignore'):
+        return ~(statistics < critical * (1.0 - CRITICAL_MARGIN))
+
+
+@lru_cache(maxsize=None)
+def critical_pearson_r(n: int, alpha: float):
+    """Gets the absolute Pearson correlation coefficient of n samples with a two-sided p-value of alpha"""
+
+    if alpha is None:
+        return None
+
+    ab: float = n / 2 - 1
+    return 2 * betainccinv(ab, ab, alpha / 2) - 1
+
+
+@lru_cache(maxsize=None)
+def critical_spearman_r(n: int, alpha: float):
+    """Gets the absolute Spearman correlation coefficient of n samples with a two-sided p-value of alpha"""
+
+    if alpha is None:
+        return None
+
+    dof: int = n - 2
+    t: float = -stdtrit(dof, alpha / 2)
+    return sqrt(t ** 2 / (dof + t ** 2))
+
+
+@lru_cache(maxsize=None)
+def critical_f(dfn: int, dfd: int, alpha: float):
+    """Gets the F statistic with the given degrees of freedom with a p-value of alpha. The inverse of the complemented
+    F distribution comes from the incomplete beta function it is defined by, which is accurate for small alphas"""
+
+    if alpha is None:
+        return None
+
+    w: float = betaincinv(dfd / 2, dfn / 2, alpha)
+    return dfd * (1 - w) / (dfn * w)
+
+
+def critical_chi2(dof, alpha: float):
+    """Gets the chi squared statistic with the given degrees of freedom with a p-value of alpha"""
+
+    if alpha is None:
+        return None
+
+    return chdtri(dof, alpha)
+
+
+def num_num_tests(
+    standardized: ndarray, rank_standardized: ndarray, not_normal: ndarray, rows: ndarray, col_start: int,
+    col_stop: int, alpha: float = None, effect_sizes: bool = False
+):
+    """Computes the p-values between a block of numeric features and a contiguous range of numeric features with one
+    matrix product per test. Like num_num_test, a pair uses Spearman's correlation if either feature is not normally
+    distributed and Pearson's correlation otherwise. The result has one row per row feature and one column per feature
+    in the range. Given an alpha, p-values that are certain to be above it are set to one rather than computed. If
+    effect sizes are requested, the absolute correlation coefficients are returned along with the p-values"""
+
+    n: int = standardized.shape[1]
+    use_spearman: ndarray = not_normal[rows][:, newaxis] | not_normal[newaxis, col_start:col_stop]
+    use_pearson: ndarray = ~use_spearman
+    p: ndarray = empty(use_spearman.shape)
+    effects: ndarray = empty(use_spearman.shape)
+
+    if use_spearman.any():
+        with profiled(name='num_num_tests/spearman', n_pairs=use_spearman.sum()):
+            r: ndarray = rank_standardized[rows] @ rank_standardized[col_start:col_stop].T
+            p[use_spearman] = spearman_p_values(r=r[use_spearman], n=n, alpha=alpha)
+
+            if effect_sizes:
+                effects[use_spearman] = np_abs(r[use_spearman])
+
+    if use_pearson.any():
+        with profiled(name='num_num_tests/pearson', n_pairs=use_pearson.sum()):
+            r: ndarray = standardized[rows] @ standardized[col_start:col_stop].T
+            p[use_pearson] = pearson_p_values(r=r[use_pearson], n=n, alpha=alpha)
+
+            if effect_sizes:
+                effects[use_pearson] = np_abs(r[use_pearson])
+
+    if effect_sizes:
+        return p, effects
+
+    return p
+
+
+def num_num_row_tests(
+    standardized: ndarray, rank_standardized: ndarray, not_normal: ndarray, row: int, cols: ndarray,
+    alpha: float = None, effect_sizes: bool = False
+):
+    """Computes the p-values between one numeric feature and the numeric features at the given positions, which need
+    not be contiguous, with one matrix-vector product per test. Otherwise it is the same as num_num_tests for a single
+    row"""
+
+    use_spearman: ndarray = not_normal[row] | not_normal[cols]
+    use_pearson: ndarray = ~use_spearman
+    n: int = standardized.shape[1]
+    p: ndarray = empty(len(cols))
+    effects: ndarray = empty(len(cols))
+
+    if use_spearman.any():
+        with profiled(name='num_num_row_tests/spearman', n_pairs=use_spearman.sum()):
+            r: ndarray = rank_standardized[cols[use_spearman]] @ rank_standardized[row]
+            p[use_spearman] = spearman_p_values(r=r, n=n, alpha=alpha)
+            effects[use_spearman] = np_abs(r)
+
+    if use_pearson.any():
+        with profiled(name='num_num_row_tests/pearson', n_pairs=use_pearson.sum()):
+            r: ndarray = standardized[cols[use_pearson]] @ standardized[row]
+            p[use_pearson] = pearson_p_values(r=r, n=n, alpha=alpha)
+            effects[use_pearson] = np_abs(r)
+
+    if effect_sizes:
+        return p, effects
+
+    return p
+
+
+def nom_nom_tests(codes: ndarray, others: ndarray, alpha: float = None, effect_sizes: bool = False):
+    """Compares one nominal column to each row of a 2-D array of other nominal columns with chi squared tests, given the
+    integer codes of their categories. All the contingency tables come from a single bincount and, like nom_nom_test
+    and chi2_contingency, a table with any frequency below the minimum gets a p-value of infinity, a table with one
+    degree of freedom gets Yates' correction and a table without any degrees of freedom gets a p-value of one. Given an
+    alpha, p-values that are certain to be above it are set to one rather than computed. If effect sizes are requested,
+    Cramer's V of each table is returned along with the p-values"""
+
+    n_tables: int = len(others)
+
+    with profiled(name='nom_nom_tests/tables', n_pairs=n_tables):
+        n_samples: int = len(codes)
+        n_rows: int = codes.max() + 1
+        n_cols: int = others.max() + 1 if n_tables > 0 else 1
+        table_size: int = n_rows * n_cols
+        cells: ndarray = arange(n_tables)[:, newaxis] * table_size + codes[newaxis, :] * n_cols + others
+        tables: ndarray = bincount(cells.ravel(), minlength=n_tables * table_size).reshape(n_tables, n_rows, n_cols)
+
+        # Categories that are absent from a column do not get a row or column in the contingency table
+        row_sums: ndarray = tables.sum(axis=2)
+        col_sums: ndarray = tables.sum(axis=1)
+        present: ndarray = (row_sums[:, :, newaxis] > 0) & (col_sums[:, newaxis, :] > 0)
+        too_small: ndarray = ((tables < MIN_CHISQ_FREQ) & present).any(axis=(1, 2))
+        dof: ndarray = ((row_sums > 0).sum(axis=1) - 1) * ((col_sums > 0).sum(axis=1) - 1)
+
+    add_rejections(name=MIN_CHISQ_FREQ_KEY, n_rejected=too_small.sum(), n_total=n_tables)
+
+    with profiled(name='nom_nom_tests/chi2', n_pairs=n_tables):
+        expected: ndarray = row_sums[:, :, newaxis] * col_sums[:, newaxis, :] / n_samples
+        diff: ndarray = expected - tables
+        yates: ndarray = (dof == 1)[:, newaxis, newaxis]
+        observed: ndarray = where(yates, tables + minimum(0.5, np_abs(diff)) * sign(diff), tables)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            terms: ndarray = where(present, (observed - expected) ** 2 / expected, 0.0)
+
+        chi2: ndarray = terms.sum(axis=(1, 2))
+        p: ndarray = ones(n_tables)
+        survivors: ndarray = get_survivors(statistics=chi2, critical=critical_chi2(dof=dof, alpha=alpha)) & (dof > 0)
+        p[survivors] = chdtrc(dof[survivors], chi2[survivors])
+
+    p[too_small] = inf
+
+    if effect_sizes:
+        # Cramer's V is zero for a table without any degrees of freedom
+        min_dims: ndarray = minimum((row_sums > 0).sum(axis=1), (col_sums > 0).sum(axis=1)) - 1
+
+        with errstate(divide='ignore', invalid='ignore'):
+            effects: ndarray = where(min_dims > 0, sqrt(chi2 / (n_samples * min_dims)), 0.0)
+
+        return p, effects
+
+    return p
+
+
+def num_nom_tests(
+    codes: ndarray, numbers: ndarray, ranks: ndarray = None, alpha: float = None, effect_sizes: bool = False
+):
+    """Compares one nominal column to each row of a 2-D array of numeric columns, given the integer codes of the nominal
+    column's categories and optionally the ranks of the numeric columns. The sums, sums of squares and rank sums of each
+    group come from matrix products with the group indicators. Like num_nom_test, every comparison gets a p-value of
+    infinity if a category has fewer than the minimum number of samples and a numeric column is compared with the
+    Kruskal-Wallis test if it is not normally distributed within any category and with a one-way ANOVA otherwise. Given
+    an alpha, p-values that are certain to be above it are set to one rather than computed. If effect sizes are
+    requested, the eta squared of each ANOVA and the epsilon squared of each Kruskal-Wallis test are returned along with
+    the p-values"""
+
+    n_numeric: int = len(numbers)
+    group_sizes: ndarray = bincount(codes)
+    groups: ndarray = nonzero(group_sizes)[0]
+    group_sizes: ndarray = group_sizes[groups]
+
+    too_small: bool = bool((group_sizes < MIN_CAT_SIZE).any())
+    add_rejections(name=MIN_CAT_SIZE_KEY, n_rejected=n_numeric if too_small else 0, n_total=n_numeric)
+
+    if too_small:
+        return (full(n_numeric, inf), zeros(n_numeric)) if effect_sizes else full(n_numeric, inf)
+
+    numbers: ndarray = asarray(numbers, dtype=float)
+    n_samples: int = numbers.shape[1]
+    n_groups: int = len(groups)
+    indicators: ndarray = (codes[:, newaxis] == groups[newaxis, :]).astype(float)
+    not_normal: ndarray = zeros(n_numeric, dtype=bool)
+
+    with profiled(name='num_nom_tests/normaltest', n_pairs=n_numeric):
+        for group in groups:
+            not_normal |= not_normal_distributions(data=numbers[:, codes == group])
+
+    use_anova: ndarray = ~not_normal
+    p: ndarray = empty(n_numeric)
+    effects: ndarray = empty(n_numeric)
+
+    if use_anova.any():
+        with profiled(name='num_nom_tests/anova', n_pairs=use_anova.sum()):
+            p[use_anova], effects[use_anova] = anova_p_values(
+                numbers=numbers[use_anova], indicators=indicators, group_sizes=group_sizes, alpha=alpha,
+                effect_sizes=True
+            )
+
+    if not_normal.any():
+        if ranks is None:
+            ranks: ndarray = rankdata(numbers[not_normal], axis=1)
+        else:
+            ranks: ndarray = asarray(ranks, dtype=float)[not_normal]
+
+        rank_sums: ndarray = ranks @ indicators
+        h: ndarray = 12.0 / (n_samples * (n_samples + 1.0)) * (rank_sums ** 2 / group_sizes).sum(axis=1)
+        h -= 3 * (n_samples + 1)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            h /= tie_corrections(data=numbers[not_normal])
+
+        h_p: ndarray = ones(len(h))
+        survivors: ndarray = get_survivors(statistics=h, critical=critical_chi2(dof=n_groups - 1, alpha=alpha))
+        h_p[survivors] = chdtrc(n_groups - 1, h[survivors])
+        p[not_normal] = h_p
+        effects[not_normal] = h / (n_samples - 1)
+
+    if effect_sizes:
+        return p, effects
+
+    return p
+
+
+def anova_p_values(
+    numbers: ndarray, indicators: ndarray, group_sizes: ndarray, alpha: float = None, effect_sizes: bool = False
+):
+    """Computes the p-values of one-way ANOVAs of each row of a 2-D array of numeric columns split into groups by a 2-D
+    array of group indicators, with one column per group, the same way f_oneway does. Given an alpha, the p-values of F
+    statistics below the critical F statistic are set to one rather than computed. If effect sizes are requested, the
+    eta squared of each ANOVA is returned along with the p-values"""
+
+    n_samples: int = numbers.shape[1]
+    n_groups: int = len(group_sizes)
+
+    # Centering the columns first avoids the loss of precision when subtracting the large sums of squares
+    centered: ndarray = numbers - numbers.mean(axis=1, keepdims=True)
+    ss_total: ndarray = (centered ** 2).sum(axis=1)
+    ss_between: ndarray = ((centered @ indicators) ** 2 / group_sizes).sum(axis=1)
+    ss_within: ndarray = ss_total - ss_between
+
+    with errstate(divide='ignore', invalid='ignore'):
+        f: ndarray = (ss_between / (n_groups - 1)) / (ss_within / (n_samples - n_groups))
+
+    dfn: int = n_groups - 1
+    dfd: int = n_samples - n_groups
+    p: ndarray = ones(len(f))
+    survivors: ndarray = get_survivors(statistics=f, critical=critical_f(dfn=dfn, dfd=dfd, alpha=alpha))
+    p[survivors] = fdtrc(dfn, dfd, f[survivors])
+
+    if effect_sizes:
+        with errstate(divide='ignore', invalid='ignore'):
+            return p, ss_between / ss_total
+
+    return p
+
+
+def tie_corrections(data: ndarray) -> ndarray:
+    """Computes the tie correction factor of the Kruskal-Wallis test for each row of a 2-D array, as tiecorrect does"""
+
+    n_rows, n_cols = data.shape
+    sorted_data: ndarray = sort(data, axis=1)
+    new_value: ndarray = ones(data.shape, dtype=bool)
+    new_value[:, 1:] = sorted_data[:, 1:] != sorted_data[:, :-1]
+    value_ids: ndarray = cumsum(new_value, axis=1) - 1
+    tie_ids: ndarray = arange(n_rows)[:, newaxis] * n_cols + value_ids
+    tie_sizes: ndarray = bincount(tie_ids.ravel(), minlength=n_rows * n_cols).reshape(n_rows, n_cols).astype(float)
+    return 1.0 - (tie_sizes ** 3 - tie_sizes).sum(axis=1) / (n_cols ** 3 - n_cols)
@@ -0,0 +1,135 @@
+"""Contains functionality for checkpointing a job that computes a shard. Each completed unit of rows is saved as a
+partial shard in a checkpoint directory next to the final shard and recorded in a progress file so a restarted job can
+skip the units that are already done and merge the partial shards into the final shard"""
+
+from os import makedirs, rename, remove, rmdir, listdir, fsync
+from os.path import join, isfile, splitext
+from numpy import ndarray
+
+from utils.comp_shards import save_shard, load_shard, SHARD_EXT
+from utils.profiling import load_profile, PROFILE_EXT
+from utils.log_p_hist import LOG_P_HIST_EXT
+from utils.top_k import TOP_K_EXT
+
+CHECKPOINT_EXT: str = '.checkpoint'
+PROGRESS_FILE: str = 'progress.csv'
+PROGRESS_HEADER: str = 'Start Row,Stop Row,Number Skipped'
+PROGRESS_DELIMINATOR: str = ','
+
+
+def get_checkpoint_dir(shard_path: str) -> str:
+    """Gets the checkpoint directory of a shard, which is named after the shard"""
+
+    return splitext(shard_path)[0] + CHECKPOINT_EXT
+
+
+def get_partial_shard_path(checkpoint_dir: str, start: int, stop: int) -> str:
+    """Gets the path of the partial shard of a unit of rows"""
+
+    return join(checkpoint_dir, '{}-{}{}'.format(str(start).zfill(7), str(stop).zfill(7), SHARD_EXT))
+
+
+def save_partial_shard(checkpoint_dir: str, start: int, stop: int, shard: ndarray):
+    """Saves the partial shard of a unit of rows. The shard is renamed into place so a job killed while saving it never
+    leaves a partial file"""
+
+    path: str = get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop)
+    tmp_path: str = splitext(path)[0] + '.tmp' + SHARD_EXT
+    save_shard(path=tmp_path, shard=shard)
+    rename(tmp_path, path)
+
+
+def get_partial_profile_path(checkpoint_dir: str, start: int, stop: int) -> str:
+    """Gets the path of the profile of a unit of rows, which is saved next to its partial shard"""
+
+    return splitext(get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))[0] + PROFILE_EXT
+
+
+def get_partial_log_p_hist_path(checkpoint_dir: str, start: int, stop: int) -> str:
+    """Gets the path of the log p-value histogram of a unit of rows, which is saved next to its partial shard"""
+
+    return splitext(get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))[0] + LOG_P_HIST_EXT
+
+
+def get_partial_top_k_path(checkpoint_dir: str, start: int, stop: int) -> str:
+    """Gets the path of the top K table of a unit of rows, which is saved next to its partial shard"""
+
+    return splitext(get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))[0] + TOP_K_EXT
+
+
+def load_partial_profiles(checkpoint_dir: str, progress: list) -> list:
+    """Loads the profiles of the completed units of rows that have one. A unit has none if it was completed before
+    profiling was enabled"""
+
+    profiles: list = []
+
+    for start, stop, _ in progress:
+        path: str = get_partial_profile_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop)
+
+        if isfile(path):
+            profiles.append(load_profile(path=path))
+
+    return profiles
+
+
+def load_partial_shard(checkpoint_dir: str, start: int, stop: int) -> ndarray:
+    """Loads the partial shard of a unit of rows"""
+
+    return load_shard(path=get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop))
+
+
+def record_progress(checkpoint_dir: str, start: int, stop: int, n_skipped: int):
+    """Records a unit of rows as completed once its partial shard is saved"""
+
+    progress_path: str = join(checkpoint_dir, PROGRESS_FILE)
+    write_header: bool = not isfile(progress_path)
+
+    with open(progress_path, 'a') as f:
+        if write_header:
+            f.write(PROGRESS_HEADER + '\n')
+
+        f.write(PROGRESS_DELIMINATOR.join([str(start), str(stop), str(n_skipped)]) + '\n')
+        f.flush()
+        fsync(f.fileno())
+
+
+def load_progress(checkpoint_dir: str) -> list:
+    """Loads the start row, stop row and number of comparisons skipped of each completed unit of rows, creating the
+    checkpoint directory if there is none yet. A line cut short by a killed job is ignored along with its unit"""
+
+    makedirs(checkpoint_dir, exist_ok=True)
+    progress_path: str = join(checkpoint_dir, PROGRESS_FILE)
+
+    if not isfile(progress_path):
+        return []
+
+    progress: list = []
+
+    with open(progress_path, 'r') as f:
+        next(f)
+
+        for line in f:
+            if not line.endswith('\n'):
+                continue
+
+            row: list = line.strip().split(PROGRESS_DELIMINATOR)
+
+            if len(row) != 3:
+                continue
+
+            start, stop, n_skipped = row
+            start, stop, n_skipped = int(start), int(stop), int(n_skipped)
+
+            if isfile(get_partial_shard_path(checkpoint_dir=checkpoint_dir, start=start, stop=stop)):
+                progress.append((start, stop, n_skipped))
+
+    return sorted(progress)
+
+
+def remove_checkpoint(checkpoint_dir: str):
+    """Removes a checkpoint directory once its partial shards are merged into the final shard"""
+
+    for file_name in listdir(checkpoint_dir):
+        remove(join(checkpoint_dir, file_name))
+
+    rmdir(checkpoint_dir)
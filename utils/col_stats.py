@@ -0,0 +1,82 @@
+"""Contains functionality for reading and writing the column statistics of a data set, the statistics of each column
+that are computed once and shared by every comparison the column is in rather than recomputed for each pair"""
+
+from os import makedirs
+from os.path import join, basename, splitext
+from pickle import load, dump
+from numpy import ndarray, load as load_array, save as save_array, asarray
+
+COL_STATS_DIR: str = 'data/col-stats/{}'
+HEADERS_FILE: str = 'headers.p'
+NUMERIC_HEADERS_FILE: str = 'numeric-headers.p'
+NOMINAL_HEADERS_FILE: str = 'nominal-headers.p'
+CATEGORIES_FILE: str = 'categories.p'
+NORMALITY_P_FILE: str = 'normality-p.npy'
+MEANS_FILE: str = 'means.npy'
+STDS_FILE: str = 'stds.npy'
+RANKS_FILE: str = 'ranks.npy'
+CATEGORY_CODES_FILE: str = 'category-codes.npy'
+
+
+def get_col_stats_dir(data_path: str) -> str:
+    """Gets the directory of the column statistics of a data set. It is named after the data set file so the full data
+    set and each of its subsets (e.g. data/male-data.csv) have their own statistics"""
+
+    data_name: str = splitext(basename(data_path))[0]
+    return COL_STATS_DIR.format(data_name)
+
+
+def save_col_stats(
+    col_stats_dir: str, headers: list, numeric_headers: list, nominal_headers: list, categories: list,
+    normality_p: ndarray, means: ndarray, stds: ndarray, ranks: ndarray, category_codes: ndarray
+):
+    """Saves the column statistics of a data set. The numeric statistics have one row per numeric header and the
+    category codes have one row per nominal header"""
+
+    makedirs(col_stats_dir, exist_ok=True)
+
+    assert len(numeric_headers) == len(normality_p) == len(means) == len(stds) == len(ranks)
+    assert len(nominal_headers) == len(categories) == len(category_codes)
+
+    dump(headers, open(join(col_stats_dir, HEADERS_FILE), 'wb'))
+    dump(numeric_headers, open(join(col_stats_dir, NUMERIC_HEADERS_FILE), 'wb'))
+    dump(nominal_headers, open(join(col_stats_dir, NOMINAL_HEADERS_FILE), 'wb'))
+    dump(categories, open(join(col_stats_dir, CATEGORIES_FILE), 'wb'))
+    save_array(join(col_stats_dir, NORMALITY_P_FILE), normality_p)
+    save_array(join(col_stats_dir, MEANS_FILE), means)
+    save_array(join(col_stats_dir, STDS_FILE), stds)
+    save_array(join(col_stats_dir, RANKS_FILE), ranks)
+    save_array(join(col_stats_dir, CATEGORY_CODES_FILE), category_codes)
+
+
+class ColStats:
+    """The column statistics of a data set. The large arrays are memory mapped so only the rows that are used are
+    read"""
+
+    def __init__(self, col_stats_dir: str):
+        self.headers: list = load(open(join(col_stats_dir, HEADERS_FILE), 'rb'))
+        self.numeric_headers: list = load(open(join(col_stats_dir, NUMERIC_HEADERS_FILE), 'rb'))
+        self.nominal_headers: list = load(open(join(col_stats_dir, NOMINAL_HEADERS_FILE), 'rb'))
+        self.categories: list = load(open(join(col_stats_dir, CATEGORIES_FILE), 'rb'))
+        self.normality_p: ndarray = load_array(join(col_stats_dir, NORMALITY_P_FILE))
+        self.means: ndarray = load_array(join(col_stats_dir, MEANS_FILE))
+        self.stds: ndarray = load_array(join(col_stats_dir, STDS_FILE))
+        self.ranks: ndarray = load_array(join(col_stats_dir, RANKS_FILE), mmap_mode='r')
+        self.category_codes: ndarray = load_array(join(col_stats_dir, CATEGORY_CODES_FILE), mmap_mode='r')
+        self.numeric_idx: dict = {header: i for i, header in enumerate(self.numeric_headers)}
+        self.nominal_idx: dict = {header: i for i, header in enumerate(self.nominal_headers)}
+
+    def get_normality_p(self, header: str) -> float:
+        """Gets the p-value of the normality test of a numeric column"""
+
+        return self.normality_p[self.numeric_idx[header]]
+
+    def get_ranks(self, header: str) -> ndarray:
+        """Gets the ranks of the values of a numeric column"""
+
+        return asarray(self.ranks[self.numeric_idx[header]], dtype=float)
+
+    def get_category_codes(self, header: str) -> ndarray:
+        """Gets the integer codes of the categories of a nominal column"""
+
+        return asarray(self.category_codes[self.nominal_idx[header]])
@@ -0,0 +1,193 @@
+"""Contains functionality for the column store, a binary copy of a data set with one row per column so that a job can
+memory map just the range of columns it needs instead of re-reading the whole CSV"""
+
+from os import makedirs
+from os.path import join, basename, splitext
+from pickle import load, dump
+from numpy import ndarray, array, empty, load as load_array, searchsorted, unique, argsort, int32
+from numpy.lib.format import open_memmap
+
+from utils.utils import get_type, NUMERIC_TYPE
+
+COL_STORE_DIR: str = 'data/col-store/{}'
+HEADERS_FILE: str = 'headers.p'
+PTIDS_FILE: str = 'ptids.p'
+COL_TYPES_FILE: str = 'col-types.p'
+CATEGORIES_FILE: str = 'categories.p'
+NUMERIC_FILE: str = 'numeric.npy'
+CATEGORY_CODES_FILE: str = 'category-codes.npy'
+CSV_DELIMINATOR: str = ','
+ROW_CHUNK_SIZE: int = 64
+COL_CHUNK_SIZE: int = 4096
+
+
+def get_col_store_dir(data_path: str) -> str:
+    """Gets the directory of the column store of a data set, which is named after the data set file"""
+
+    data_name: str = splitext(basename(data_path))[0]
+    return COL_STORE_DIR.format(data_name)
+
+
+def write_col_store(data_path: str, col_store_dir: str, col_types: dict):
+    """Converts a data set CSV into a column store one chunk of lines at a time so the memory used does not depend on
+    the number of columns times the number of rows. The patient ID column is stored separately from the other columns"""
+
+    makedirs(col_store_dir, exist_ok=True)
+
+    with open(data_path, 'r') as f:
+        headers: list = next(f).strip().split(CSV_DELIMINATOR)[1:]
+        n_rows: int = sum(1 for line in f if line.strip() != '')
+
+    is_numeric: ndarray = array([get_type(header=header, col_types=col_types) == NUMERIC_TYPE for header in headers])
+    n_numeric: int = int(is_numeric.sum())
+    n_nominal: int = len(headers) - n_numeric
+    numeric: ndarray = open_memmap(join(col_store_dir, NUMERIC_FILE), mode='w+', shape=(n_numeric, n_rows))
+
+    category_codes: ndarray = open_memmap(
+        join(col_store_dir, CATEGORY_CODES_FILE), mode='w+', shape=(n_nominal, n_rows), dtype=int32
+    )
+
+    # The nominal columns are dictionary encoded with the codes given in the order the categories first appear
+    categories: list = [{} for _ in range(n_nominal)]
+    ptids: list = []
+    chunk: list = []
+
+    with open(data_path, 'r') as f:
+        next(f)
+
+        for line in f:
+            if line.strip() == '':
+                continue
+
+            row: list = line.strip().split(CSV_DELIMINATOR)
+
+            assert len(row) == len(headers) + 1
+
+            ptids.append(row[0])
+            chunk.append(row[1:])
+
+            if len(chunk) == ROW_CHUNK_SIZE:
+                write_chunk(
+                    chunk=chunk, start=len(ptids) - len(chunk), is_numeric=is_numeric, numeric=numeric,
+                    category_codes=category_codes, categories=categories
+                )
+
+                chunk: list = []
+
+    write_chunk(
+        chunk=chunk, start=len(ptids) - len(chunk), is_numeric=is_numeric, numeric=numeric,
+        category_codes=category_codes, categories=categories
+    )
+
+    assert len(ptids) == n_rows
+
+    numeric.flush()
+    category_codes.flush()
+    categories: list = [list(col_categories) for col_categories in categories]
+    dump(headers, open(join(col_store_dir, HEADERS_FILE), 'wb'))
+    dump(ptids, open(join(col_store_dir, PTIDS_FILE), 'wb'))
+    dump(col_types, open(join(col_store_dir, COL_TYPES_FILE), 'wb'))
+    dump(categories, open(join(col_store_dir, CATEGORIES_FILE), 'wb'))
+
+
+def write_chunk(
+    chunk: list, start: int, is_numeric: ndarray, numeric: ndarray, category_codes: ndarray, categories: list
+):
+    """Writes a chunk of lines of the data set into the columns of the column store"""
+
+    if len(chunk) == 0:
+        return
+
+    chunk: ndarray = array(chunk, dtype=object)
+    stop: int = start + len(chunk)
+    numeric[:, start:stop] = chunk[:, is_numeric].astype(float).T
+    nominal_chunk: ndarray = chunk[:, ~is_numeric].T
+    codes: ndarray = empty(nominal_chunk.shape, dtype=int32)
+
+    for i, (col, col_categories) in enumerate(zip(nominal_chunk, categories)):
+        for j, val in enumerate(col):
+            if val not in col_categories:
+                col_categories[val] = len(col_categories)
+
+            codes[i, j] = col_categories[val]
+
+    category_codes[:, start:stop] = codes
+
+
+class ColStore:
+    """A memory mapped column store. Only the columns that are sliced out of it are read from disk"""
+
+    def __init__(self, col_store_dir: str):
+        self.headers: list = load(open(join(col_store_dir, HEADERS_FILE), 'rb'))
+        self.ptids: list = load(open(join(col_store_dir, PTIDS_FILE), 'rb'))
+        self.col_types: dict = load(open(join(col_store_dir, COL_TYPES_FILE), 'rb'))
+        self.categories: list = load(open(join(col_store_dir, CATEGORIES_FILE), 'rb'))
+        self.numeric: ndarray = load_array(join(col_store_dir, NUMERIC_FILE), mmap_mode='r')
+        self.category_codes: ndarray = load_array(join(col_store_dir, CATEGORY_CODES_FILE), mmap_mode='r')
+
+        is_numeric: list = [
+            get_type(header=header, col_types=self.col_types) == NUMERIC_TYPE for header in self.headers
+        ]
+
+        # The indices of the headers whose columns are in each row of the numeric matrix and the category codes matrix
+        self.numeric_headers: ndarray = array([i for i, numeric in enumerate(is_numeric) if numeric], dtype=int)
+        self.nominal_headers: ndarray = array([i for i, numeric in enumerate(is_numeric) if not numeric], dtype=int)
+
+        assert len(self.numeric_headers) == len(self.numeric)
+        assert len(self.nominal_headers) == len(self.category_codes)
+
+    def get_numeric_range(self, start: int, stop: int) -> tuple:
+        """Gets the rows of the numeric matrix that hold the numeric columns among the headers from start to stop"""
+
+        return int(searchsorted(self.numeric_headers, start)), int(searchsorted(self.numeric_headers, stop))
+
+    def get_nominal_range(self, start: int, stop: int) -> tuple:
+        """Gets the rows of the category codes matrix that hold the nominal columns among the headers from start to
+        stop"""
+
+        return int(searchsorted(self.nominal_headers, start)), int(searchsorted(self.nominal_headers, stop))
+
+
+def write_subset_col_store(col_store: ColStore, col_store_dir: str, rows: ndarray):
+    """Writes the column store of a subset of the rows of a column store, a chunk of columns at a time, without parsing
+    the data set again. The nominal columns are encoded again with the codes given in the order the categories first
+    appear in the subset, so the result is the same as the column store of a data set of just the subset's rows"""
+
+    makedirs(col_store_dir, exist_ok=True)
+    n_rows: int = len(rows)
+
+    numeric: ndarray = open_memmap(
+        join(col_store_dir, NUMERIC_FILE), mode='w+', shape=(len(col_store.numeric), n_rows),
+        dtype=col_store.numeric.dtype
+    )
+
+    category_codes: ndarray = open_memmap(
+        join(col_store_dir, CATEGORY_CODES_FILE), mode='w+', shape=(len(col_store.category_codes), n_rows), dtype=int32
+    )
+
+    for start in range(0, len(numeric), COL_CHUNK_SIZE):
+        numeric[start:start + COL_CHUNK_SIZE] = col_store.numeric[start:start + COL_CHUNK_SIZE][:, rows]
+
+    categories: list = []
+
+    for start in range(0, len(category_codes), COL_CHUNK_SIZE):
+        chunk: ndarray = col_store.category_codes[start:start + COL_CHUNK_SIZE][:, rows]
+
+        for i, codes in enumerate(chunk):
+            # Order the categories in the subset by where they first appear
+            old_codes, first_idx, new_codes = unique(codes, return_index=True, return_inverse=True)
+            order: ndarray = argsort(first_idx)
+            ranks: ndarray = empty(len(order), dtype=int32)
+            ranks[order] = range(len(order))
+            chunk[i] = ranks[new_codes]
+            col_categories: list = col_store.categories[start + i]
+            categories.append([col_categories[code] for code in old_codes[order].tolist()])
+
+        category_codes[start:start + COL_CHUNK_SIZE] = chunk
+
+    numeric.flush()
+    category_codes.flush()
+    dump(col_store.headers, open(join(col_store_dir, HEADERS_FILE), 'wb'))
+    dump([col_store.ptids[row] for row in rows.tolist()], open(join(col_store_dir, PTIDS_FILE), 'wb'))
+    dump(col_store.col_types, open(join(col_store_dir, COL_TYPES_FILE), 'wb'))
+    dump(categories, open(join(col_store_dir, CATEGORIES_FILE), 'wb'))
@@ -0,0 +1,189 @@
+"""Contains functionality for comparison shards, the compact replacement for pickled comparison dictionaries. A shard
+holds the integer indices of the two features of each comparison and its p-value in one flat array that can be memory
+mapped, while the headers the indices refer to are saved once for the whole directory of shards"""
+
+from os import rename, listdir, fdopen, chmod
+from os.path import join, isfile, dirname
+from pickle import load, dump
+from tempfile import mkstemp
+from numpy import ndarray, dtype, int32, float64, empty, concatenate, save as save_array, load as load_array
+
+COMP_DICT_EXT: str = '.p'
+SHARD_EXT: str = '.npy'
+HEADERS_FILE: str = 'headers.p'
+MANIFEST_FILE: str = 'manifest.p'
+MANIFEST_FILES_KEY: str = 'files'
+MANIFEST_SHARDS_KEY: str = 'shards'
+FEAT1_FIELD: str = 'feat1'
+FEAT2_FIELD: str = 'feat2'
+P_FIELD: str = 'p'
+SHARD_DTYPE: dtype = dtype([(FEAT1_FIELD, int32), (FEAT2_FIELD, int32), (P_FIELD, float64)])
+
+
+def is_comp_file(file_name: str) -> bool:
+    """Checks if a file in a directory of comparisons is either a comparison dictionary or a comparison shard"""
+
+    if file_name == HEADERS_FILE or file_name == MANIFEST_FILE:
+        return False
+
+    return file_name.endswith(COMP_DICT_EXT) or file_name.endswith(SHARD_EXT)
+
+
+def save_headers(shard_dir: str, headers: list):
+    """Saves the headers that the feature indices of the shards in a directory refer to if they are not saved already.
+    The file is renamed into place so concurrent jobs writing the same headers never leave a partial file"""
+
+    headers_path: str = join(shard_dir, HEADERS_FILE)
+
+    if isfile(headers_path):
+        assert load_headers(shard_dir=shard_dir) == headers
+        return
+
+    # Each job gets its own temporary file so that jobs on different nodes never rename the same one
+    fd, tmp_path = mkstemp(dir=shard_dir, prefix=HEADERS_FILE + '.', suffix='.tmp')
+
+    with fdopen(fd, 'wb') as f:
+        dump(headers, f)
+
+    # The temporary file is only readable by its owner but the headers are shared like the shards
+    chmod(tmp_path, 0o644)
+    rename(tmp_path, headers_path)
+
+
+def load_headers(shard_dir: str) -> list:
+    """Loads the headers that the feature indices of the shards in a directory refer to"""
+
+    return load(open(join(shard_dir, HEADERS_FILE), 'rb'))
+
+
+def make_shard(feat1: ndarray, feat2: ndarray, p: ndarray) -> ndarray:
+    """Makes a shard from the indices of the first and second features of each comparison and their p-values"""
+
+    shard: ndarray = empty(len(p), dtype=SHARD_DTYPE)
+    shard[FEAT1_FIELD] = feat1
+    shard[FEAT2_FIELD] = feat2
+    shard[P_FIELD] = p
+    return shard
+
+
+def merge_shards(shards: list) -> ndarray:
+    """Concatenates shards into one"""
+
+    return concatenate([empty(0, dtype=SHARD_DTYPE)] + shards)
+
+
+def save_shard(path: str, shard: ndarray):
+    """Saves a shard"""
+
+    assert shard.dtype == SHARD_DTYPE
+
+    save_array(path, shard)
+
+
+def load_shard(path: str) -> ndarray:
+    """Memory maps a shard so its comparisons are only read from disk as they are used"""
+
+    return load_array(path, mmap_mode='r')
+
+
+def comp_dict_to_shard(comp_dict: dict, header_idx: dict) -> ndarray:
+    """Converts a comparison dictionary into a shard given the mapping of each header to its index"""
+
+    feat1: list = [header_idx[feat1] for feat1, _ in comp_dict.keys()]
+    feat2: list = [header_idx[feat2] for _, feat2 in comp_dict.keys()]
+    return make_shard(feat1=feat1, feat2=feat2, p=list(comp_dict.values()))
+
+
+def comp_dict_to_shard_and_headers(comp_dict: dict) -> tuple:
+    """Converts a comparison dictionary into a shard and the headers that its feature indices refer to, which are just
+    the headers in the comparison dictionary"""
+
+    header_idx: dict = {}
+
+    for feat1, feat2 in comp_dict.keys():
+        header_idx.setdefault(feat1, len(header_idx))
+        header_idx.setdefault(feat2, len(header_idx))
+
+    return comp_dict_to_shard(comp_dict=comp_dict, header_idx=header_idx), list(header_idx)
+
+
+def shard_to_comp_dict(shard: ndarray, headers: list) -> dict:
+    """Converts a shard into a comparison dictionary"""
+
+    comp_dict: dict = {}
+
+    for feat1, feat2, p in zip(shard[FEAT1_FIELD].tolist(), shard[FEAT2_FIELD].tolist(), shard[P_FIELD].tolist()):
+        comp_dict[(headers[feat1], headers[feat2])] = p
+
+    return comp_dict
+
+
+def load_comp_dict(path: str) -> dict:
+    """Loads a comparison dictionary from a file in either the pickled dictionary format or the shard format"""
+
+    if path.endswith(SHARD_EXT):
+        return shard_to_comp_dict(shard=load_shard(path=path), headers=load_headers(shard_dir=dirname(path)))
+
+    return load(open(path, 'rb'))
+
+
+def count_comps(path: str) -> int:
+    """Counts the comparisons in a file in either the pickled dictionary format or the shard format. Only the header of
+    a shard is read"""
+
+    if path.endswith(SHARD_EXT):
+        return len(load_shard(path=path))
+
+    return len(load(open(path, 'rb')))
+
+
+def make_manifest(comp_dict_dir: str, n_comps_per_shard: int) -> dict:
+    """Makes a manifest of logical shards of equal size over the comparison files in a directory without moving any
+    data. Each logical shard is a list of the (file, offset, count) ranges that make it up, in the order of the files"""
+
+    file_names: list = sorted(file_name for file_name in listdir(comp_dict_dir) if is_comp_file(file_name))
+    file_counts: dict = {}
+    logical_shards: list = []
+    logical_shard: list = []
+    n_comps: int = 0
+
+    for file_name in file_names:
+        file_count: int = count_comps(path=join(comp_dict_dir, file_name))
+        file_counts[file_name] = file_count
+        offset: int = 0
+
+        while offset < file_count:
+            count: int = min(file_count - offset, n_comps_per_shard - n_comps)
+            logical_shard.append((file_name, offset, count))
+            offset += count
+            n_comps += count
+
+            if n_comps == n_comps_per_shard:
+                logical_shards.append(logical_shard)
+                logical_shard: list = []
+                n_comps: int = 0
+
+    if len(logical_shard) > 0:
+        logical_shards.append(logical_shard)
+
+    return {MANIFEST_FILES_KEY: file_counts, MANIFEST_SHARDS_KEY: logical_shards}
+
+
+def save_manifest(comp_dict_dir: str, manifest: dict):
+    """Saves the manifest of a directory of comparisons, renaming it into place so jobs never read a partial file"""
+
+    manifest_path: str = join(comp_dict_dir, MANIFEST_FILE)
+    tmp_path: str = manifest_path + '.tmp'
+    dump(manifest, open(tmp_path, 'wb'))
+    rename(tmp_path, manifest_path)
+
+
+def load_manifest(comp_dict_dir: str) -> dict:
+    """Loads the manifest of a directory of comparisons or returns None if the directory has none"""
+
+    manifest_path: str = join(comp_dict_dir, MANIFEST_FILE)
+
+    if not isfile(manifest_path):
+        return None
+
+    return load(open(manifest_path, 'rb'))
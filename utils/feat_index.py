@@ -0,0 +1,84 @@
+"""Contains functionality for the feature index, which gives every feature of the data set an integer ID, its position
+in the data header without the PTID column, along with compact codes of its domain and data type. The IDs are the same
+as the feature indices of the comparison shards, so the features of a whole shard can be classified by indexing
+arrays"""
+
+from os import makedirs
+from os.path import join
+from pickle import load, dump
+from numpy import ndarray, array, arange, int8, save as save_array, load as load_array
+
+from utils.utils import get_domain, get_type, MRI_KEY, EXPRESSION_KEY, ADNIMERGE_KEY, NUMERIC_TYPE, NOMINAL_TYPE
+
+FEAT_INDEX_DIR: str = 'data/feat-index'
+HEADERS_FILE: str = 'headers.p'
+DOMAIN_CODES_FILE: str = 'domain-codes.npy'
+TYPE_CODES_FILE: str = 'type-codes.npy'
+CSV_DELIMINATOR: str = ','
+
+# The domain and data type of each code
+DOMAINS: list = [MRI_KEY, EXPRESSION_KEY, ADNIMERGE_KEY]
+DATA_TYPES: list = [NUMERIC_TYPE, NOMINAL_TYPE]
+
+
+def write_feat_index(data_path: str, col_types: dict, feat_index_dir: str = FEAT_INDEX_DIR):
+    """Creates the feature index from the header of the data set and the column types"""
+
+    makedirs(feat_index_dir, exist_ok=True)
+
+    with open(data_path, 'r') as f:
+        headers: list = next(f).strip().split(CSV_DELIMINATOR)[1:]
+
+    domain_codes: dict = {domain: code for code, domain in enumerate(DOMAINS)}
+    type_codes: dict = {data_type: code for code, data_type in enumerate(DATA_TYPES)}
+    domains: list = [domain_codes[get_domain(feat=header, col_types=col_types)] for header in headers]
+    types: list = [type_codes[get_type(header=header, col_types=col_types)] for header in headers]
+    dump(headers, open(join(feat_index_dir, HEADERS_FILE), 'wb'))
+    save_array(join(feat_index_dir, DOMAIN_CODES_FILE), array(domains, dtype=int8))
+    save_array(join(feat_index_dir, TYPE_CODES_FILE), array(types, dtype=int8))
+
+
+class FeatIndex:
+    """The feature index. The mapping from each header to its ID is only made the first time a header is looked up"""
+
+    def __init__(self, feat_index_dir: str = FEAT_INDEX_DIR):
+        self.headers: list = load(open(join(feat_index_dir, HEADERS_FILE), 'rb'))
+        self.domain_codes: ndarray = load_array(join(feat_index_dir, DOMAIN_CODES_FILE), mmap_mode='r')
+        self.type_codes: ndarray = load_array(join(feat_index_dir, TYPE_CODES_FILE), mmap_mode='r')
+        self.ids: dict = None
+        self.last_feats: list = None
+        self.last_ids: ndarray = None
+
+        assert len(self.headers) == len(self.domain_codes) == len(self.type_codes)
+
+    def get_id(self, feat: str) -> int:
+        """Gets the ID of a feature"""
+
+        if self.ids is None:
+            self.ids: dict = {header: i for i, header in enumerate(self.headers)}
+
+        return self.ids[feat]
+
+    def get_ids(self, feats: list) -> ndarray:
+        """Gets the IDs of a list of features, which are just their positions if the list is the headers themselves. The
+        IDs of the last list are kept so the shared headers of a directory of shards are only looked up once"""
+
+        if feats is not self.last_feats:
+            if feats == self.headers:
+                self.last_ids: ndarray = arange(len(feats))
+            else:
+                self.last_ids: ndarray = array([self.get_id(feat=feat) for feat in feats], dtype=int)
+
+            self.last_feats: list = feats
+
+        return self.last_ids
+
+    def get_domain(self, feat: str) -> str:
+        """Gets the domain of a feature"""
+
+        return DOMAINS[self.domain_codes[self.get_id(feat=feat)]]
+
+    def get_type(self, feat: str) -> str:
+        """Gets the data type of a feature"""
+
+        return DATA_TYPES[self.type_codes[self.get_id(feat=feat)]]
@@ -0,0 +1,140 @@
+"""Contains functionality for the heartbeats of the jobs. A job appends a record of its progress to its own file in a
+shared status directory as it runs, so the progress of a run of many jobs can be summarized without reading their
+outputs. A record holds the job's ID, the cells of its work that are done out of the total, the rate at which it
+compares pairs and its peak resident set size"""
+
+from os import makedirs, listdir, environ, getpid
+from os.path import join, isdir, splitext
+from json import dumps, loads
+from socket import gethostname
+from time import time
+
+from utils.memory import get_peak_rss
+
+STATUS_DIR_ENV_VAR: str = 'COMP_STATUS_DIR'
+STATUS_DIR: str = environ.get(STATUS_DIR_ENV_VAR, 'data/status')
+STATUS_EXT: str = '.jsonl'
+HEARTBEAT_INTERVAL: float = 60.0
+
+JOB_ID_KEY: str = 'job_id'
+HOST_KEY: str = 'host'
+PID_KEY: str = 'pid'
+START_TIME_KEY: str = 'start_time'
+TIME_KEY: str = 'time'
+CELLS_DONE_KEY: str = 'cells_done'
+CELLS_TOTAL_KEY: str = 'cells_total'
+PAIRS_DONE_KEY: str = 'pairs_done'
+CELLS_PER_SEC_KEY: str = 'cells_per_sec'
+PAIRS_PER_SEC_KEY: str = 'pairs_per_sec'
+RSS_KEY: str = 'rss_mb'
+DONE_KEY: str = 'done'
+
+
+def get_run_status_dir(run: str) -> str:
+    """Gets the directory of the heartbeat files of the jobs of a run"""
+
+    return join(STATUS_DIR, run)
+
+
+class Heartbeat:
+    """Records the progress of a job in its heartbeat file. The work of the job is counted in cells, some of which may
+    be done already if the job was restarted, and the comparisons it computes or reads are counted in pairs. A record is
+    appended when the job starts, at most once per interval as it progresses and when it is done"""
+
+    def __init__(self, run: str, job_id, n_cells: int, n_cells_done: int = 0, interval: float = HEARTBEAT_INTERVAL):
+        run_status_dir: str = get_run_status_dir(run=run)
+        makedirs(run_status_dir, exist_ok=True)
+
+        self.path: str = join(run_status_dir, str(job_id) + STATUS_EXT)
+        self.job_id: str = str(job_id)
+        self.n_cells: int = int(n_cells)
+        self.n_cells_done: int = int(n_cells_done)
+        self.n_cells_started_with: int = self.n_cells_done
+        self.n_pairs_done: int = 0
+        self.rss: float = 0.0
+        self.interval: float = interval
+        self.start_time: float = time()
+        self.last_beat_time: float = 0.0
+        self._write(done=False)
+
+    def add(self, n_cells: int, n_pairs: int, rss: float = None):
+        """Adds cells and pairs that were done, along with the peak resident set size of the process that did them if
+        it was not this one, and records a heartbeat if the interval has passed since the last one"""
+
+        self.n_cells_done += int(n_cells)
+        self.n_pairs_done += int(n_pairs)
+
+        if rss is not None:
+            self.rss: float = max(self.rss, rss)
+
+        if time() - self.last_beat_time >= self.interval:
+            self._write(done=False)
+
+    def finish(self):
+        """Records the final heartbeat of the job"""
+
+        self._write(done=True)
+
+    def _write(self, done: bool):
+        """Appends a record of the job's progress to its heartbeat file in a single write"""
+
+        now: float = time()
+        elapsed: float = max(now - self.start_time, 1e-9)
+
+        record: dict = {
+            JOB_ID_KEY: self.job_id,
+            HOST_KEY: gethostname(),
+            PID_KEY: getpid(),
+            START_TIME_KEY: self.start_time,
+            TIME_KEY: now,
+            CELLS_DONE_KEY: self.n_cells_done,
+            CELLS_TOTAL_KEY: self.n_cells,
+            PAIRS_DONE_KEY: self.n_pairs_done,
+            CELLS_PER_SEC_KEY: (self.n_cells_done - self.n_cells_started_with) / elapsed,
+            PAIRS_PER_SEC_KEY: self.n_pairs_done / elapsed,
+            RSS_KEY: max(self.rss, get_peak_rss()),
+            DONE_KEY: done
+        }
+
+        with open(self.path, 'a') as f:
+            f.write(dumps(record) + '\n')
+
+        self.last_beat_time: float = now
+
+
+def load_latest_records(run: str) -> dict:
+    """Loads the latest heartbeat record of each job of a run that has started, ignoring a line cut short by a killed
+    job"""
+
+    run_status_dir: str = get_run_status_dir(run=run)
+    records: dict = {}
+
+    if not isdir(run_status_dir):
+        return records
+
+    for file_name in sorted(listdir(run_status_dir)):
+        if not file_name.endswith(STATUS_EXT):
+            continue
+
+        latest: dict = None
+
+        with open(join(run_status_dir, file_name), 'r') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    latest: dict = loads(line)
+
+        if latest is not None:
+            records[splitext(file_name)[0]] = latest
+
+    return records
+
+
+def get_seconds_left(record: dict) -> float:
+    """Estimates the seconds a job has left from the cells it has left and its rate in its latest record"""
+
+    cells_left: int = record[CELLS_TOTAL_KEY] - record[CELLS_DONE_KEY]
+
+    if cells_left <= 0:
+        return 0.0
+
+    return cells_left / record[CELLS_PER_SEC_KEY] if record[CELLS_PER_SEC_KEY] > 0 else float('inf')
@@ -3,16 +3,35 @@
 from os import listdir
 from os.path import join
 from pickle import load
+from multiprocessing import Pool
+from math import ceil
+from itertools import islice
 from tqdm import tqdm
+from numpy import ndarray
+
+from utils.comp_shards import (
+    is_comp_file, load_shard, load_headers, load_manifest, comp_dict_to_shard_and_headers, SHARD_EXT, FEAT1_FIELD,
+    FEAT2_FIELD, P_FIELD, MANIFEST_FILES_KEY, MANIFEST_SHARDS_KEY
+)
+from utils.heartbeat import Heartbeat
+
+
+MAP_SECTIONS_PER_PROCESS: int = 4
 
 
 class CompDictIter:
-    """A base class for iterating through comparison dictionaries"""
+    """A base class for iterating through comparison dictionaries, which may be pickled dictionaries or shards. The
+    keyword arguments hold what the function aggregates, and given a function that merges the aggregates of one set of
+    keyword arguments into another, the comparison dictionaries can be processed in parallel with map_reduce. Given a
+    heartbeat, each comparison dictionary is added to it as a cell once it is processed"""
 
-    def __init__(self, comp_dict_dir: str, func: callable, **kwargs: dict):
+    def __init__(self, comp_dict_dir: str, func: callable, merge: callable = None, **kwargs: dict):
         self.comp_dict_dir: str = comp_dict_dir
         self.func: callable = func
+        self.merge: callable = merge
         self.kwargs: dict = kwargs
+        self.headers: list = None
+        self.heartbeat: Heartbeat = None
         self._remove_non_comp_files()
 
     def _remove_non_comp_files(self):
@@ -22,7 +41,7 @@ class CompDictIter:
         new_comp_dicts: list = []
 
         for comp_dict in comp_dicts:
-            if comp_dict.endswith('.p'):
+            if is_comp_file(comp_dict):
                 new_comp_dicts.append(comp_dict)
 
         comp_dicts: list = sorted(new_comp_dicts)
@@ -33,21 +52,119 @@ class CompDictIter:
 
         raise NotImplementedError
 
+    def _get_headers(self) -> list:
+        """Gets the headers that the feature indices of the shards refer to, loading them the first time"""
+
+        if self.headers is None:
+            self.headers: list = load_headers(shard_dir=self.comp_dict_dir)
+
+        return self.headers
+
     def __call__(self):
         for comp_dict in tqdm(self.comp_dicts):
-            comp_dict: str = join(self.comp_dict_dir, comp_dict)
-            comp_dict: dict = load(open(comp_dict, 'rb'))
+            n_comps: int = self._do_file(file_name=comp_dict)
+            self._add_to_heartbeat(n_comps=n_comps)
+
+    def _add_to_heartbeat(self, n_comps: int):
+        """Adds a processed comparison dictionary and its number of comparisons to the heartbeat if there is one"""
+
+        if self.heartbeat is not None:
+            self.heartbeat.add(n_cells=1, n_pairs=n_comps)
+
+    def _do_file(self, file_name: str, offset: int = 0, count: int = None) -> int:
+        """Performs the functionality on the comparisons of a file or, given a count, on that many of its comparisons
+        from an offset, returning the number of comparisons"""
+
+        is_shard: bool = file_name.endswith(SHARD_EXT)
+        path: str = join(self.comp_dict_dir, file_name)
+
+        if is_shard:
+            shard: ndarray = load_shard(path=path)
+
+            # Slicing the memory mapped shard reads only the comparisons in the range
+            if count is not None:
+                shard: ndarray = shard[offset:offset + count]
+
+            self._do_shard(shard=shard, headers=self._get_headers())
+            return len(shard)
+        else:
+            comp_dict: dict = load(open(path, 'rb'))
+
+            if count is not None:
+                comp_dict: dict = dict(islice(comp_dict.items(), offset, offset + count))
+
+            self._do_comp_dict(comp_dict=comp_dict)
+            return len(comp_dict)
+
+    def _do_shard(self, shard: ndarray, headers: list):
+        """Performs the functionality on each comparison in a shard"""
+
+        comps: zip = zip(shard[FEAT1_FIELD].tolist(), shard[FEAT2_FIELD].tolist(), shard[P_FIELD].tolist())
+
+        for feat1, feat2, p in comps:
+            self._do_iter(feat1=headers[feat1], feat2=headers[feat2], p=p)
 
-            for (feat1, feat2), p in comp_dict.items():
-                self._do_iter(feat1=feat1, feat2=feat2, p=p)
+    def _do_comp_dict(self, comp_dict: dict):
+        """Performs the functionality on each comparison in a comparison dictionary"""
+
+        for (feat1, feat2), p in comp_dict.items():
+            self._do_iter(feat1=feat1, feat2=feat2, p=p)
+
+    def _get_partial(self):
+        """Gets the aggregates of this iterator"""
+
+        return self.kwargs
+
+    def _merge_partials(self, partial, other_partial):
+        """Merges the aggregates of another iterator into those of this one, returning the merged aggregates"""
+
+        assert self.merge is not None
+
+        self.merge(partial, other_partial)
+        return partial
+
+    def map_reduce(self, n_processes: int):
+        """Processes the comparison dictionaries with a pool of processes. Each process aggregates a contiguous section
+        of the comparison dictionaries into its own copy of the keyword arguments and the partial aggregates are merged
+        pairwise, in the order of their sections, until one is left which is merged into this iterator's aggregates"""
+
+        n_sections: int = min(len(self.comp_dicts), n_processes * MAP_SECTIONS_PER_PROCESS)
+        section_size: int = ceil(len(self.comp_dicts) / n_sections) if n_sections > 0 else 1
+
+        sections: list = [
+            self.comp_dicts[start:start + section_size] for start in range(0, len(self.comp_dicts), section_size)
+        ]
+
+        with Pool(processes=n_processes) as pool:
+            # Every task gets a copy of this iterator, and thus of its empty aggregates, to fill with its own section
+            partials: list = pool.map(map_section, [(self, section) for section in sections])
+
+            while len(partials) > 1:
+                pairs: list = [(self, partials[i], partials[i + 1]) for i in range(0, len(partials) - 1, 2)]
+                odd_partial: list = partials[-1:] if len(partials) % 2 == 1 else []
+                partials: list = pool.map(reduce_partials, pairs) + odd_partial
+
+        for partial in partials:
+            self._merge_partials(self._get_partial(), partial)
 
 
 class IterByIdx(CompDictIter):
-    """Iterates through the comparison dictionaries in a given section and performs a given function on them"""
+    """Iterates through the comparison dictionaries in a given section and performs a given function on them. If the
+    directory has a manifest, the section is of its logical shards rather than of the files"""
 
     def __init__(self, comp_dict_dir: str, func: callable, idx: int, section_size: int, **kwargs: dict):
         super().__init__(comp_dict_dir=comp_dict_dir, func=func, **kwargs)
+        manifest: dict = load_manifest(comp_dict_dir=comp_dict_dir)
+        self.use_manifest: bool = manifest is not None
+
+        if self.use_manifest:
+            # A manifest made before comparison files were added or removed would skip or miss comparisons
+            assert sorted(manifest[MANIFEST_FILES_KEY]) == self.comp_dicts
+
+            self.comp_dicts: list = manifest[MANIFEST_SHARDS_KEY]
+
         n_dicts: int = len(self.comp_dicts)
+        self.n_comp_dicts: int = n_dicts
         self.start_idx: int = idx * section_size
 
         assert self.start_idx < n_dicts
@@ -55,6 +172,19 @@ class IterByIdx(CompDictIter):
         self.stop_idx: int = min(self.start_idx + section_size, n_dicts)
         self.comp_dicts: list = self.comp_dicts[self.start_idx:self.stop_idx]
 
+    def __call__(self):
+        if not self.use_manifest:
+            super().__call__()
+            return
+
+        for logical_shard in tqdm(self.comp_dicts):
+            n_comps: int = 0
+
+            for file_name, offset, count in logical_shard:
+                n_comps += self._do_file(file_name=file_name, offset=offset, count=count)
+
+            self._add_to_heartbeat(n_comps=n_comps)
+
     def _do_iter(self, feat1: str, feat2: str, p: float):
         """Implements abstract method"""
 
@@ -75,3 +205,103 @@ class BasicDictIter(CompDictIter):
             self.func(feat1=feat1, feat2=feat2, p=p, **self.kwargs)
         else:
             self.func(feat1=feat1, feat2=feat2, **self.kwargs)
+
+
+class ShardIter(CompDictIter):
+    """Iterates through all the comparison dictionaries in a directory and performs a given function on each whole shard
+    at once. The function gets the arrays of the indices of the first and second features of the comparisons, their
+    p-values and the headers the indices refer to. Pickled comparison dictionaries are converted to shards first"""
+
+    def _do_shard(self, shard: ndarray, headers: list):
+        """Overrides the base method to perform the function on the whole shard"""
+
+        self.func(feat1=shard[FEAT1_FIELD], feat2=shard[FEAT2_FIELD], p=shard[P_FIELD], headers=headers, **self.kwargs)
+
+    def _do_comp_dict(self, comp_dict: dict):
+        """Overrides the base method to convert the comparison dictionary to a shard"""
+
+        shard, headers = comp_dict_to_shard_and_headers(comp_dict=comp_dict)
+        self._do_shard(shard=shard, headers=headers)
+
+
+class ShardIterByIdx(ShardIter, IterByIdx):
+    """Iterates through the comparison dictionaries in a given section and performs a given function on each whole shard
+    at once, as with ShardIter"""
+
+
+class FusedIter(IterByIdx):
+    """Iterates through the comparison dictionaries in a given section once and performs every registered function on
+    each comparison, so several analyses share a single read of the comparison dictionaries. A function can also be
+    registered to be performed on each whole shard at once, as with ShardIterByIdx"""
+
+    def __init__(self, comp_dict_dir: str, idx: int, section_size: int):
+        super().__init__(comp_dict_dir=comp_dict_dir, func=None, idx=idx, section_size=section_size)
+        self.funcs: list = []
+
+    def register(self, func: callable, merge: callable = None, per_shard: bool = False, **kwargs: dict):
+        """Registers a function to perform on each comparison, or on each shard, with the given keyword arguments and
+        optionally the function that merges the aggregates of two sets of those keyword arguments"""
+
+        self.funcs.append((func, merge, per_shard, kwargs))
+
+    def _do_iter(self, feat1: str, feat2: str, p: float):
+        """Implements abstract method"""
+
+        for func, _, per_shard, kwargs in self.funcs:
+            if not per_shard:
+                func(feat1=feat1, feat2=feat2, p=p, **kwargs)
+
+    def _do_shard(self, shard: ndarray, headers: list):
+        """Overrides the base method to perform the functions registered per shard on the whole shard and then the
+        other functions on each of its comparisons"""
+
+        for func, _, per_shard, kwargs in self.funcs:
+            if per_shard:
+                func(feat1=shard[FEAT1_FIELD], feat2=shard[FEAT2_FIELD], p=shard[P_FIELD], headers=headers, **kwargs)
+
+        if not all(per_shard for _, _, per_shard, _ in self.funcs):
+            super()._do_shard(shard=shard, headers=headers)
+
+    def _do_comp_dict(self, comp_dict: dict):
+        """Overrides the base method to convert the comparison dictionary to a shard if any function is registered per
+        shard"""
+
+        if any(per_shard for _, _, per_shard, _ in self.funcs):
+            shard, headers = comp_dict_to_shard_and_headers(comp_dict=comp_dict)
+            self._do_shard(shard=shard, headers=headers)
+        else:
+            super()._do_comp_dict(comp_dict=comp_dict)
+
+    def _get_partial(self):
+        """Overrides the base method to get the aggregates of every registered function"""
+
+        return [kwargs for _, _, _, kwargs in self.funcs]
+
+    def _merge_partials(self, partial, other_partial):
+        """Overrides the base method to merge the aggregates of every registered function"""
+
+        for (_, merge, _, _), kwargs, other_kwargs in zip(self.funcs, partial, other_partial):
+            assert merge is not None
+
+            merge(kwargs, other_kwargs)
+
+        return partial
+
+
+def map_section(args: tuple):
+    """Aggregates a section of comparison dictionaries with a copy of an iterator, returning its aggregates"""
+
+    comp_dict_iter, section = args
+    comp_dict_iter.comp_dicts = section
+
+    # Only the main process records heartbeats, otherwise the cells of every section would be added to the same job
+    comp_dict_iter.heartbeat = None
+    comp_dict_iter()
+    return comp_dict_iter._get_partial()
+
+
+def reduce_partials(args: tuple):
+    """Merges the second of two partial aggregates into the first"""
+
+    comp_dict_iter, partial, other_partial = args
+    return comp_dict_iter._merge_partials(partial, other_partial)
@@ -0,0 +1,118 @@
+"""Contains functionality for the log p-value histograms of the comparisons, which are the compact summary from which
+the Benjamini-Hochberg threshold of the false discovery rate is found without holding the p-values in memory. Each bin
+is an equal range of the base 10 logarithm of the p-values, so the bins are fine for the small p-values where the
+threshold is. The p-values of skipped comparisons, which are infinity, are not tests and are not counted"""
+
+from os.path import splitext
+from numpy import (
+    ndarray, zeros, arange, bincount, isfinite, log10, floor, clip, cumsum, nonzero, sort, int64, errstate,
+    savez_compressed, load as load_arrays
+)
+
+LOG_P_HIST_EXT: str = '.log-p-hist.npz'
+COUNTS_KEY: str = 'counts'
+EXACT_ALPHA_KEY: str = 'exact_alpha'
+SHARD_ALPHA_KEY: str = 'shard_alpha'
+
+# The bins go from below the smallest positive float down to a p-value of zero up to a p-value of one
+LOG10_P_MIN: int = -324
+BINS_PER_DECADE: int = 100
+N_BINS: int = -LOG10_P_MIN * BINS_PER_DECADE
+
+
+def get_log_p_hist_path(shard_path: str) -> str:
+    """Gets the path of the log p-value histogram of a shard, which is saved next to the shard"""
+
+    return splitext(shard_path)[0] + LOG_P_HIST_EXT
+
+
+def make_log_p_hist() -> ndarray:
+    """Makes an empty log p-value histogram"""
+
+    return zeros(N_BINS, dtype=int64)
+
+
+def get_bins(p: ndarray) -> ndarray:
+    """Gets the bin of each of the given finite p-values. A p-value of zero goes in the first bin and one of one in the
+    last bin"""
+
+    with errstate(divide='ignore'):
+        bins: ndarray = floor((log10(p) - LOG10_P_MIN) * BINS_PER_DECADE)
+
+    return clip(bins, 0, N_BINS - 1).astype(int64)
+
+
+def get_bin_starts() -> ndarray:
+    """Gets the smallest p-value of each bin"""
+
+    starts: ndarray = 10.0 ** (LOG10_P_MIN + arange(N_BINS) / BINS_PER_DECADE)
+    starts[0] = 0.0
+    return starts
+
+
+def add_to_log_p_hist(log_p_hist: ndarray, p: ndarray):
+    """Adds the p-values of comparisons to a log p-value histogram with one bincount"""
+
+    p: ndarray = p[isfinite(p)]
+    log_p_hist += bincount(get_bins(p=p), minlength=N_BINS)
+
+
+def save_log_p_hist(path: str, log_p_hist: ndarray, exact_alpha: float, shard_alpha: float):
+    """Saves a log p-value histogram along with the alpha up to which its p-values were computed exactly and the alpha
+    that the comparisons in its shards were filtered at"""
+
+    with open(path, 'wb') as f:
+        savez_compressed(f, **{COUNTS_KEY: log_p_hist, EXACT_ALPHA_KEY: exact_alpha, SHARD_ALPHA_KEY: shard_alpha})
+
+
+def load_log_p_hist(path: str) -> tuple:
+    """Loads a log p-value histogram and the alpha up to which its p-values are exact and the alpha its shards were
+    filtered at"""
+
+    with load_arrays(path) as arrays:
+        return arrays[COUNTS_KEY], float(arrays[EXACT_ALPHA_KEY]), float(arrays[SHARD_ALPHA_KEY])
+
+
+def get_candidate_bins(log_p_hist: ndarray, q: float) -> ndarray:
+    """Gets the bins that may hold the Benjamini-Hochberg threshold at a false discovery rate, from the largest p-values
+    to the smallest. The threshold is the largest p-value that is at most its rank divided by the number of tests times
+    the rate, and the rank of a p-value in a bin is at most the number of p-values up to the end of the bin"""
+
+    n_tests: int = int(log_p_hist.sum())
+    n_up_to: ndarray = cumsum(log_p_hist)
+    candidates: ndarray = (log_p_hist > 0) & (get_bin_starts() * n_tests <= n_up_to * q)
+    return nonzero(candidates)[0][::-1]
+
+
+def get_threshold_in_bin(p: ndarray, n_below: int, n_tests: int, q: float) -> float:
+    """Gets the Benjamini-Hochberg threshold from the p-values of a bin, given the number of p-values below the bin, or
+    None if none of its p-values reach the threshold"""
+
+    p: ndarray = sort(p)
+    ranks: ndarray = n_below + arange(1, len(p) + 1)
+    below: ndarray = nonzero(p * n_tests <= ranks * q)[0]
+
+    if len(below) == 0:
+        return None
+
+    return float(p[below[-1]])
+
+
+def merge_log_p_hists(paths: list) -> tuple:
+    """Adds up the log p-value histograms at the given paths, which must have the same alphas, returning the merged
+    histogram and the alphas"""
+
+    merged: ndarray = make_log_p_hist()
+    alphas: tuple = None
+
+    for path in paths:
+        log_p_hist, exact_alpha, shard_alpha = load_log_p_hist(path=path)
+
+        assert alphas is None or alphas == (exact_alpha, shard_alpha)
+
+        merged += log_p_hist
+        alphas: tuple = (exact_alpha, shard_alpha)
+
+    assert alphas is not None
+
+    return merged, alphas[0], alphas[1]
@@ -0,0 +1,107 @@
+"""Contains functionality for generating the candidate numeric to numeric comparisons with locality sensitive hashing so
+that only they need exact tests. The sketch of a standardized numeric column is the signs of its projections onto
+random vectors, and the chance that a bit of two columns' sketches differs is the angle between them over pi, so the
+sketches of strongly correlated columns agree on most bits. The sketch is cut into bands and two columns are candidates
+if any of their bands are the same. Since a strong negative correlation is as strong as a positive one, a band and its
+complement are the same bucket. Longer bands make fewer, stronger candidates and more bands find weaker correlations"""
+
+from numpy import (
+    ndarray, arange, concatenate, unique, searchsorted, argsort, isin, union1d, int64, nan_to_num
+)
+from numpy.random import default_rng, Generator
+
+LSH_SEED: int = 0
+LSH_BAND_SIZE: int = 16
+
+# The fraction of the comparisons that are not candidates which get exact tests anyway, from which the number of
+# significant comparisons that the candidates miss is estimated
+VERIFY_FRACTION: float = 0.01
+
+
+def make_sketches(standardized: ndarray, n_bits: int, seed: int = LSH_SEED) -> ndarray:
+    """Makes the sign random projection sketch of each row of a 2-D array of standardized columns, which are all zeros
+    for constant columns"""
+
+    projections: ndarray = default_rng(seed).standard_normal((standardized.shape[1], n_bits))
+    return nan_to_num(standardized) @ projections > 0
+
+
+def get_band_keys(sketches: ndarray, n_bands: int, band_size: int = LSH_BAND_SIZE) -> ndarray:
+    """Gets the key of each band of each sketch, with one row per band. A band is flipped if its first bit is set so
+    that it has the same key as its complement"""
+
+    assert band_size < 63
+    assert sketches.shape[1] == n_bands * band_size
+
+    bands: ndarray = sketches.reshape(len(sketches), n_bands, band_size)
+    bands: ndarray = bands ^ bands[:, :, :1]
+    return (bands.astype(int64) @ (1 << arange(band_size, dtype=int64))).T
+
+
+def get_candidates(band_keys: ndarray, rows: ndarray) -> list:
+    """Gets the positions of the columns to the right of each of the given rows that share the bucket of any band with
+    it, in sorted order"""
+
+    orders: ndarray = argsort(band_keys, axis=1, kind='stable')
+    sorted_keys: list = [keys[order] for keys, order in zip(band_keys, orders)]
+    candidates: list = []
+
+    for row in rows:
+        buckets: list = []
+
+        for keys, order, row_key in zip(sorted_keys, orders, band_keys[:, row]):
+            buckets.append(order[searchsorted(keys, row_key, side='left'):searchsorted(keys, row_key, side='right')])
+
+        row_candidates: ndarray = unique(concatenate(buckets))
+        candidates.append(row_candidates[row_candidates > row])
+
+    return candidates
+
+
+def sample_non_candidates(
+    rows: ndarray, n_cols: int, candidates: list, fraction: float = VERIFY_FRACTION, seed: int = LSH_SEED
+) -> list:
+    """Samples a fraction of the columns to the right of each of the given rows that are not its candidates"""
+
+    rng: Generator = default_rng(seed)
+    samples: list = []
+
+    for row, row_candidates in zip(rows, candidates):
+        right: ndarray = arange(row + 1, n_cols)
+        sample: ndarray = right[rng.random(len(right)) < fraction]
+        samples.append(sample[~isin(sample, row_candidates)])
+
+    return samples
+
+
+def get_screened(
+    standardized: ndarray, rank_standardized: ndarray, rows: ndarray, n_bands: int, band_size: int = LSH_BAND_SIZE
+) -> tuple:
+    """Gets the candidates of each of the given rows from the sketches of both the standardized columns and their
+    standardized ranks, since either may be tested, along with the verification sample of the columns that are not
+    candidates"""
+
+    n_bits: int = n_bands * band_size
+
+    band_keys: ndarray = concatenate([
+        get_band_keys(sketches=make_sketches(standardized=cols, n_bits=n_bits), n_bands=n_bands, band_size=band_size)
+        for cols in (standardized, rank_standardized)
+    ])
+
+    candidates: list = get_candidates(band_keys=band_keys, rows=rows)
+    samples: list = sample_non_candidates(rows=rows, n_cols=len(standardized), candidates=candidates)
+    return candidates, samples
+
+
+def merge_screened(candidates: list, samples: list) -> list:
+    """Merges the candidates and the verification sample of each row into the sorted columns that get exact tests"""
+
+    return [union1d(row_candidates, sample) for row_candidates, sample in zip(candidates, samples)]
+
+
+def get_recall(n_found: int, n_sample_found: int, fraction: float = VERIFY_FRACTION) -> float:
+    """Estimates the fraction of the significant comparisons that are candidates from the number of significant
+    candidates and the number of significant comparisons in the verification sample"""
+
+    n_missed: float = n_sample_found / fraction
+    return n_found / (n_found + n_missed) if n_found + n_missed > 0 else 1.0
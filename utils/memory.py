@@ -0,0 +1,45 @@
+"""Contains functionality for sharing arrays between processes and measuring the memory that a process uses"""
+
+from multiprocessing.shared_memory import SharedMemory
+from resource import getrusage, RUSAGE_SELF
+from os.path import isfile
+from numpy import ndarray
+
+SMAPS_ROLLUP_PATH: str = '/proc/self/smaps_rollup'
+PRIVATE_FIELDS: tuple = ('Private_Clean:', 'Private_Dirty:')
+KB_PER_MB: int = 1024
+
+
+def share_array(array: ndarray) -> tuple:
+    """Copies an array into a block of shared memory, returning the block and an array backed by it. Processes forked
+    afterwards map the same pages rather than getting a copy on write of the array, so the memory does not grow with the
+    number of processes. The block must be unlinked by the process that created it once it is no longer needed"""
+
+    shared_memory: SharedMemory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared_array: ndarray = ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)
+    shared_array[...] = array
+    return shared_memory, shared_array
+
+
+def get_peak_rss() -> float:
+    """Gets the peak resident set size of this process in megabytes, which includes the shared pages it has read"""
+
+    # The maximum resident set size is in kilobytes on Linux
+    return getrusage(RUSAGE_SELF).ru_maxrss / KB_PER_MB
+
+
+def get_private_memory() -> float:
+    """Gets the memory that only this process is using in megabytes or None if the operating system does not report
+    it"""
+
+    if not isfile(SMAPS_ROLLUP_PATH):
+        return None
+
+    private_kb: int = 0
+
+    with open(SMAPS_ROLLUP_PATH, 'r') as f:
+        for line in f:
+            if line.startswith(PRIVATE_FIELDS):
+                private_kb += int(line.split()[1])
+
+    return private_kb / KB_PER_MB
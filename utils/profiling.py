@@ -0,0 +1,143 @@
+"""Contains the opt-in profiling of the comparisons. When profiling is enabled, either with the environment variable or
+by a job, the calls to each test and to each phase of the comparisons are counted and timed along with the number of
+pairs they cover, and the pairs that a test rejects for too small a frequency or category are counted. Otherwise every
+hook returns at once. The profile of each process is saved as JSON and the profiles of a job can be merged"""
+
+from os import environ
+from json import dump, load
+from time import perf_counter
+from contextlib import contextmanager
+
+PROFILING_ENV_VAR: str = 'COMP_PROFILE'
+PROFILE_EXT: str = '.profile.json'
+TIMERS_KEY: str = 'timers'
+REJECTIONS_KEY: str = 'rejections'
+CALLS_KEY: str = 'calls'
+SECONDS_KEY: str = 'seconds'
+PAIRS_KEY: str = 'pairs'
+REJECTED_KEY: str = 'rejected'
+TOTAL_KEY: str = 'total'
+MIN_CHISQ_FREQ_KEY: str = 'MIN_CHISQ_FREQ'
+MIN_CAT_SIZE_KEY: str = 'MIN_CAT_SIZE'
+
+profiling: bool = environ.get(PROFILING_ENV_VAR, '') not in ('', '0')
+timers: dict = {}
+rejections: dict = {}
+
+
+def enable_profiling():
+    """Enables profiling in this process and the processes it forks afterwards"""
+
+    global profiling
+
+    profiling = True
+
+
+def is_profiling() -> bool:
+    """Checks if profiling is enabled"""
+
+    return profiling
+
+
+@contextmanager
+def profiled(name: str, n_pairs: int = 0):
+    """Times the code in the context under a name, counting a call and the number of pairs it covers, if any"""
+
+    if not profiling:
+        yield
+        return
+
+    start_time: float = perf_counter()
+
+    try:
+        yield
+    finally:
+        add_time(name=name, seconds=perf_counter() - start_time, n_pairs=n_pairs)
+
+
+def add_time(name: str, seconds: float, n_pairs: int = 0):
+    """Adds a call that took a number of seconds and covered a number of pairs to the timer of a name"""
+
+    if not profiling:
+        return
+
+    timer: dict = timers.setdefault(name, {CALLS_KEY: 0, SECONDS_KEY: 0.0, PAIRS_KEY: 0})
+    timer[CALLS_KEY] += 1
+    timer[SECONDS_KEY] += seconds
+    timer[PAIRS_KEY] += int(n_pairs)
+
+
+def add_rejections(name: str, n_rejected: int, n_total: int):
+    """Adds the number of pairs a test rejected out of the number of pairs it was given"""
+
+    if not profiling:
+        return
+
+    counts: dict = rejections.setdefault(name, {REJECTED_KEY: 0, TOTAL_KEY: 0})
+    counts[REJECTED_KEY] += int(n_rejected)
+    counts[TOTAL_KEY] += int(n_total)
+
+
+def get_profile() -> dict:
+    """Gets the profile of this process so far"""
+
+    return {TIMERS_KEY: timers, REJECTIONS_KEY: rejections}
+
+
+def reset_profile():
+    """Clears the profile of this process so the next one saved only has what came after"""
+
+    timers.clear()
+    rejections.clear()
+
+
+def save_profile(path: str, profile: dict = None):
+    """Saves a profile, that of this process by default, as JSON"""
+
+    with open(path, 'w') as f:
+        dump(get_profile() if profile is None else profile, f, indent=2, sort_keys=True)
+
+
+def load_profile(path: str) -> dict:
+    """Loads a profile"""
+
+    with open(path, 'r') as f:
+        return load(f)
+
+
+def merge_profiles(profiles: list) -> dict:
+    """Merges profiles by adding their counts and times"""
+
+    merged: dict = {TIMERS_KEY: {}, REJECTIONS_KEY: {}}
+
+    for profile in profiles:
+        for section in [TIMERS_KEY, REJECTIONS_KEY]:
+            for name, counts in profile[section].items():
+                merged_counts: dict = merged[section].setdefault(name, {key: 0 for key in counts})
+
+                for key, count in counts.items():
+                    merged_counts[key] += count
+
+    return merged
+
+
+def report_profile(profile: dict):
+    """Prints the timers of a profile from the slowest and the share of the pairs that each test rejected"""
+
+    print('Profile:')
+
+    for name, timer in sorted(profile[TIMERS_KEY].items(), key=lambda item: -item[1][SECONDS_KEY]):
+        line: str = '{}: {} Calls, {:.3f} Seconds'.format(name, timer[CALLS_KEY], timer[SECONDS_KEY])
+
+        if timer[PAIRS_KEY] > 0 and timer[SECONDS_KEY] > 0:
+            line += ', {} Pairs, {:.1f} Pairs Per Second'.format(
+                timer[PAIRS_KEY], timer[PAIRS_KEY] / timer[SECONDS_KEY]
+            )
+
+        print(line)
+
+    for name, counts in sorted(profile[REJECTIONS_KEY].items()):
+        share: float = counts[REJECTED_KEY] / counts[TOTAL_KEY] if counts[TOTAL_KEY] > 0 else 0.0
+        print('Rejected By {}: {} Of {} Pairs ({:.2f}%)'.format(
+            name, counts[REJECTED_KEY], counts[TOTAL_KEY], share * 100
+        ))
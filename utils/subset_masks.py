@@ -0,0 +1,61 @@
+"""Contains functionality for the row masks of the subsets of the data set, which select the rows of the individuals in
+a subset from the full data set so a subset can be analyzed without a copy of its own. The masks are saved as the
+indices of the rows in the subset"""
+
+from os import makedirs
+from os.path import join, isfile
+from numpy import ndarray, array, zeros, int32, save as save_array, load as load_array
+
+from utils.utils import SUBSET_PATH
+
+SUBSET_ROWS_DIR: str = 'data/subset-rows'
+SUBSET_ROWS_FILE: str = '{}.npy'
+CSV_DELIMINATOR: str = ','
+
+
+def get_subset_rows_path(subset: str) -> str:
+    """Gets the path of the row indices of a subset"""
+
+    return join(SUBSET_ROWS_DIR, SUBSET_ROWS_FILE.format(subset))
+
+
+def save_subset_rows(subset: str, rows: ndarray):
+    """Saves the indices of the rows of the full data set that are in a subset"""
+
+    makedirs(SUBSET_ROWS_DIR, exist_ok=True)
+    save_array(get_subset_rows_path(subset=subset), array(rows, dtype=int32))
+
+
+def get_subset_ptids(subset: str) -> set:
+    """Gets the patient IDs of the individuals in a subset from the first field of each line of its data set"""
+
+    ptids: set = set()
+
+    with open(SUBSET_PATH.format(subset), 'r') as f:
+        next(f)
+
+        for line in f:
+            if line.strip() != '':
+                ptids.add(line.split(CSV_DELIMINATOR, 1)[0])
+
+    return ptids
+
+
+def get_subset_mask(subset: str, ptids: list) -> ndarray:
+    """Gets the boolean mask of the rows of the full data set, given its patient IDs in order, that are in a subset. The
+    mask comes from the saved row indices of the subset or, for a subset that only has a data set, from its patient
+    IDs"""
+
+    rows_path: str = get_subset_rows_path(subset=subset)
+
+    if isfile(rows_path):
+        mask: ndarray = zeros(len(ptids), dtype=bool)
+        mask[load_array(rows_path)] = True
+        return mask
+
+    subset_ptids: set = get_subset_ptids(subset=subset)
+    mask: ndarray = array([ptid in subset_ptids for ptid in ptids], dtype=bool)
+
+    assert mask.sum() == len(subset_ptids)
+
+    return mask
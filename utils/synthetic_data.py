@@ -0,0 +1,103 @@
+"""Contains functionality for generating a synthetic data set with the shape of the real one: a PTID column, ADNIMERGE
+columns, most of them nominal with the cardinalities of the real ones, then many numeric expression and MRI columns. A
+few latent factors, one of them the severity of the diagnosis, are planted in the columns so some of the comparisons of
+every type are significant. The same seed always gives the same data set"""
+
+from pickle import dump
+from numpy import ndarray, array, column_stack, newaxis, round as np_round
+from numpy.random import Generator, default_rng
+
+from utils.utils import NUMERIC_TYPE, NOMINAL_TYPE
+
+CSV_DELIMINATOR: str = ','
+N_LATENT_FACTORS: int = 8
+ROW_CHUNK_SIZE: int = 64
+
+# The baseline diagnoses and the severity that each one adds to the latent severity of an individual
+DIAGNOSES: list = ['CN', 'SMC', 'EMCI', 'LMCI', 'AD']
+DIAGNOSIS_PROBS: list = [0.28, 0.1, 0.2, 0.25, 0.17]
+DIAGNOSIS_SEVERITIES: list = [0.0, 0.2, 0.6, 1.2, 2.0]
+
+# The other nominal ADNIMERGE columns with their categories and the probabilities of the categories
+NOMINAL_COLS: dict = {
+    'PTGENDER': (['Male', 'Female'], [0.54, 0.46]),
+    'PTETHCAT': (['Not Hisp/Latino', 'Hisp/Latino', 'Unknown'], [0.95, 0.04, 0.01]),
+    'PTRACCAT': (
+        ['White', 'Black', 'Asian', 'More than one', 'Am Indian/Alaskan', 'Hawaiian/Other PI', 'Unknown'],
+        [0.9, 0.05, 0.02, 0.015, 0.005, 0.005, 0.005]
+    ),
+    'PTMARRY': (['Married', 'Widowed', 'Divorced', 'Never married', 'Unknown'], [0.75, 0.1, 0.09, 0.05, 0.01]),
+    'COLPROT': (['ADNI1', 'ADNIGO', 'ADNI2', 'ADNI3'], [0.4, 0.1, 0.35, 0.15]),
+    'SITE': ([str(site) for site in range(2, 70)], None)
+}
+
+
+def write_synthetic_data(
+    data_path: str, col_types_path: str, n_rows: int, n_expression: int, n_mri: int, seed: int = 0
+):
+    """Writes a synthetic data set with the given number of individuals and expression and MRI columns and the column
+    types of its ADNIMERGE columns"""
+
+    rng: Generator = default_rng(seed)
+    ptids: list = ['{:03d}_S_{:04d}'.format(rng.integers(2, 1000), i) for i in range(n_rows)]
+    factors: ndarray = rng.normal(size=(n_rows, N_LATENT_FACTORS))
+    diagnoses: ndarray = rng.choice(len(DIAGNOSES), size=n_rows, p=DIAGNOSIS_PROBS)
+    severity: ndarray = array(DIAGNOSIS_SEVERITIES)[diagnoses] + 0.3 * factors[:, 0]
+
+    # Carrying more APOE4 alleles makes a worse diagnosis more likely
+    apoe4: ndarray = (rng.random(n_rows) < 0.15 + 0.15 * severity).astype(int)
+    apoe4 += (rng.random(n_rows) < 0.05 + 0.05 * severity).astype(int)
+
+    nominal: dict = {'DX_bl': array(DIAGNOSES, dtype=object)[diagnoses], 'APOE4': apoe4.astype(str).astype(object)}
+
+    for header, (categories, probs) in NOMINAL_COLS.items():
+        nominal[header] = array(categories, dtype=object)[rng.choice(len(categories), size=n_rows, p=probs)]
+
+    numeric: dict = {
+        'AGE': np_round(73 + 6 * rng.normal(size=n_rows) + 1.5 * severity, 1),
+        'PTEDUCAT': rng.integers(8, 21, size=n_rows).astype(float),
+        'MMSE': (30 - np_round(2 * severity + rng.exponential(0.8, size=n_rows))).clip(0, 30),
+        'ADAS13': np_round(8 + 9 * severity + 4 * rng.normal(size=n_rows), 2).clip(0, 85),
+        'CDRSB': np_round(severity.clip(0) * rng.random(n_rows) * 4) / 2
+    }
+
+    adnimerge_headers: list = list(nominal) + list(numeric)
+    col_types: dict = {header: NOMINAL_TYPE for header in nominal}
+    col_types.update({header: NUMERIC_TYPE for header in numeric})
+    adnimerge_cols: list = list(nominal.values()) + [col.astype(object) for col in numeric.values()]
+
+    expression: ndarray = make_numeric_cols(rng=rng, factors=factors, severity=severity, n_cols=n_expression)
+    mri: ndarray = make_numeric_cols(rng=rng, factors=factors, severity=severity, n_cols=n_mri)
+    expression_headers: list = ['{:08d}_at'.format(11715100 + i) for i in range(n_expression)]
+    mri_headers: list = ['MRI_{:06d}'.format(i) for i in range(n_mri)]
+    headers: list = ['PTID'] + adnimerge_headers + expression_headers + mri_headers
+
+    with open(data_path, 'w') as f:
+        f.write(CSV_DELIMINATOR.join(headers) + '\n')
+
+        for start in range(0, n_rows, ROW_CHUNK_SIZE):
+            stop: int = min(start + ROW_CHUNK_SIZE, n_rows)
+            chunk: ndarray = column_stack(
+                [array(ptids[start:stop], dtype=object)] + [col[start:stop] for col in adnimerge_cols] +
+                [expression[start:stop].astype(str).astype(object), mri[start:stop].astype(str).astype(object)]
+            )
+
+            for row in chunk:
+                f.write(CSV_DELIMINATOR.join(str(val) for val in row) + '\n')
+
+    dump(col_types, open(col_types_path, 'wb'))
+
+
+def make_numeric_cols(rng: Generator, factors: ndarray, severity: ndarray, n_cols: int) -> ndarray:
+    """Makes numeric columns as noise plus the contribution of one latent factor, chosen for each column. Some of the
+    columns also depend on the severity and some are skewed so they are not normally distributed"""
+
+    n_rows: int = len(factors)
+    loadings: ndarray = rng.uniform(0.0, 1.0, size=n_cols) * (rng.random(n_cols) < 0.5)
+    factor_idx: ndarray = rng.integers(0, N_LATENT_FACTORS, size=n_cols)
+    severity_loadings: ndarray = rng.uniform(0.0, 0.8, size=n_cols) * (rng.random(n_cols) < 0.2)
+    cols: ndarray = rng.normal(size=(n_rows, n_cols)) + factors[:, factor_idx] * loadings
+    cols += severity[:, newaxis] * severity_loadings
+    skewed: ndarray = rng.random(n_cols) < 0.3
+    cols[:, skewed] = rng.exponential(size=(n_rows, int(skewed.sum()))) + cols[:, skewed] * 0.5
+    return np_round(cols, 4)
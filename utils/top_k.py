@@ -0,0 +1,124 @@
+"""Contains functionality for keeping the K strongest comparisons of each feature, which are those with the smallest
+p-values, with ties broken by the largest effect size and then by the smallest partner. A top K table holds one entry
+per feature and partner and has at most K entries per feature, so its memory is bounded by the number of features no
+matter how many comparisons there are. Since the order of the entries is total, the top K of the union of any tables is
+the same regardless of the order they are merged in, so the tables of threads, jobs and runs can be merged freely"""
+
+from os.path import splitext
+from numpy import (
+    ndarray, dtype, empty, ones, concatenate, lexsort, arange, maximum, where, int32, float64, isfinite,
+    savez_compressed, load as load_arrays
+)
+
+TOP_K_EXT: str = '.top-k.npz'
+TABLE_KEY: str = 'table'
+K_KEY: str = 'k'
+FEAT_FIELD: str = 'feat'
+PARTNER_FIELD: str = 'partner'
+P_FIELD: str = 'p'
+EFFECT_FIELD: str = 'effect'
+TOP_K_DTYPE: dtype = dtype([(FEAT_FIELD, int32), (PARTNER_FIELD, int32), (P_FIELD, float64), (EFFECT_FIELD, float64)])
+
+# The fewest new entries that are buffered before they are merged into the table
+MIN_BUFFER_SIZE: int = 2 ** 16
+
+
+def get_top_k_path(shard_path: str) -> str:
+    """Gets the path of the top K table of a shard, which is saved next to the shard"""
+
+    return splitext(shard_path)[0] + TOP_K_EXT
+
+
+def make_top_k_table(feat: ndarray, partner: ndarray, p: ndarray, effect: ndarray) -> ndarray:
+    """Makes a top K table, which is not yet bounded, from the features, their partners, p-values and effect sizes"""
+
+    table: ndarray = empty(len(p), dtype=TOP_K_DTYPE)
+    table[FEAT_FIELD] = feat
+    table[PARTNER_FIELD] = partner
+    table[P_FIELD] = p
+    table[EFFECT_FIELD] = effect
+    return table
+
+
+def select_top_k(table: ndarray, k: int) -> ndarray:
+    """Keeps the K strongest entries of each feature in a table, sorted by feature and then from the strongest"""
+
+    order: ndarray = lexsort((table[PARTNER_FIELD], -table[EFFECT_FIELD], table[P_FIELD], table[FEAT_FIELD]))
+    table: ndarray = table[order]
+    return table[get_ranks(table=table) < k]
+
+
+def get_ranks(table: ndarray) -> ndarray:
+    """Gets the rank of each entry of a sorted table within its feature, which is its position minus the position of
+    the feature's first entry"""
+
+    new_feat: ndarray = ones(len(table), dtype=bool)
+    new_feat[1:] = table[FEAT_FIELD][1:] != table[FEAT_FIELD][:-1]
+    positions: ndarray = arange(len(table))
+    return positions - maximum.accumulate(where(new_feat, positions, 0))
+
+
+def merge_top_k_tables(tables: list, k: int) -> ndarray:
+    """Merges top K tables into one"""
+
+    return select_top_k(table=concatenate([empty(0, dtype=TOP_K_DTYPE)] + tables), k=k)
+
+
+class TopK:
+    """Keeps the top K table of the comparisons added to it. The comparisons are buffered and merged into the table once
+    there are as many of them as there are entries in the table, so the cost of merging is spread over the comparisons
+    and the memory stays within a constant factor of the table's"""
+
+    def __init__(self, k: int):
+        self.k: int = k
+        self.table: ndarray = empty(0, dtype=TOP_K_DTYPE)
+        self.buffer: list = []
+        self.buffer_size: int = 0
+
+    def add(self, feat1: ndarray, feat2: ndarray, p: ndarray, effect: ndarray):
+        """Adds comparisons, which are entries of both of their features, ignoring those without a finite p-value"""
+
+        finite: ndarray = isfinite(p)
+        feat1, feat2, p, effect = feat1[finite], feat2[finite], p[finite], effect[finite]
+        self.buffer.append(make_top_k_table(feat=feat1, partner=feat2, p=p, effect=effect))
+        self.buffer.append(make_top_k_table(feat=feat2, partner=feat1, p=p, effect=effect))
+        self.buffer_size += 2 * len(p)
+
+        if self.buffer_size >= max(len(self.table), MIN_BUFFER_SIZE):
+            self._merge_buffer()
+
+    def get_table(self) -> ndarray:
+        """Gets the top K table of the comparisons added so far"""
+
+        self._merge_buffer()
+        return self.table
+
+    def reset(self):
+        """Removes all the comparisons"""
+
+        self.table: ndarray = empty(0, dtype=TOP_K_DTYPE)
+        self.buffer: list = []
+        self.buffer_size: int = 0
+
+    def _merge_buffer(self):
+        """Merges the buffered comparisons into the table"""
+
+        if self.buffer_size > 0:
+            self.table: ndarray = merge_top_k_tables(tables=[self.table] + self.buffer, k=self.k)
+
+        self.buffer: list = []
+        self.buffer_size: int = 0
+
+
+def save_top_k_table(path: str, table: ndarray, k: int):
+    """Saves a top K table along with its K"""
+
+    with open(path, 'wb') as f:
+        savez_compressed(f, **{TABLE_KEY: table, K_KEY: k})
+
+
+def load_top_k_table(path: str) -> tuple:
+    """Loads a top K table and its K"""
+
+    with load_arrays(path) as arrays:
+        return arrays[TABLE_KEY], int(arrays[K_KEY])
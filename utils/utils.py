@@ -4,8 +4,11 @@ from pickle import load
 from os import mkdir
 from os.path import isdir
 from scipy.stats import chi2_contingency, pearsonr, f_oneway, kruskal, spearmanr, normaltest
-from numpy import array
-from pandas import DataFrame
+from numpy import array, ndarray, argsort, bincount, cumsum, split
+from pandas import factorize
+
+from utils.col_stats import ColStats
+from utils.profiling import profiled, add_rejections, MIN_CHISQ_FREQ_KEY, MIN_CAT_SIZE_KEY
 
 NUMERIC_TYPE: str = 'numeric'
 NOMINAL_TYPE: str = 'nominal'
@@ -114,8 +117,9 @@ def get_comp_key(feat1: str, feat2: str) -> tuple:
     return tuple(sorted([feat1, feat2]))
 
 
-def compare(header1: str, header2: str, dataset_cols: dict, col_types: dict) -> float:
-    """Computes a correlation between two columns in the data set, given their headers"""
+def compare(header1: str, header2: str, dataset_cols: dict, col_types: dict, col_stats: ColStats = None) -> float:
+    """Computes a correlation between two columns in the data set, given their headers. If the column statistics of the
+    data set are given, the normality, ranks and category codes of the columns are read from them"""
 
     list1: list = dataset_cols[header1]
     list2: list = dataset_cols[header2]
@@ -125,13 +129,26 @@ def compare(header1: str, header2: str, dataset_cols: dict, col_types: dict) ->
     stat = None
 
     if type1 == NOMINAL_TYPE and type2 == NOMINAL_TYPE:
-        stat: float = nom_nom_test(list1=list1, list2=list2)
+        with profiled(name='compare/nom_nom', n_pairs=1):
+            stat: float = nom_nom_test(list1=list1, list2=list2)
     elif type1 == NOMINAL_TYPE and type2 == NUMERIC_TYPE:
-        stat: float = num_nom_test(numbers=list2, categories=list1)
+        codes: ndarray = None if col_stats is None else col_stats.get_category_codes(header=header1)
+
+        with profiled(name='compare/num_nom', n_pairs=1):
+            stat: float = num_nom_test(numbers=list2, categories=list1, category_codes=codes)
     elif type2 == NOMINAL_TYPE and type1 == NUMERIC_TYPE:
-        stat: float = num_nom_test(numbers=list1, categories=list2)
+        codes: ndarray = None if col_stats is None else col_stats.get_category_codes(header=header2)
+
+        with profiled(name='compare/num_nom', n_pairs=1):
+            stat: float = num_nom_test(numbers=list1, categories=list2, category_codes=codes)
     elif type1 == NUMERIC_TYPE and type2 == NUMERIC_TYPE:
-        stat: float = num_num_test(list1=list1, list2=list2)
+        with profiled(name='compare/num_num', n_pairs=1):
+            if col_stats is None:
+                stat: float = num_num_test(list1=list1, list2=list2)
+            else:
+                stat: float = cached_num_num_test(
+                    header1=header1, header2=header2, list1=list1, list2=list2, col_stats=col_stats
+                )
     else:
         print("ERROR: Non-specified type at " + header1 + " x " + header2)
         exit(1)
@@ -142,45 +159,65 @@ def compare(header1: str, header2: str, dataset_cols: dict, col_types: dict) ->
 def nom_nom_test(list1: list, list2: list) -> float:
     """Runs a comparison of two nominal columns using a chi squared test if the table frequencies are high enough"""
 
-    idx: list = list(set(list1))
-    cols: list = list(set(list2))
-    n_cols: int = len(cols)
-    n_rows: int = len(idx)
-    contig_table: list = [[0 for _ in range(n_cols)] for _ in range(n_rows)]
+    # Encode the categories as integer codes, keeping missing values as a category of their own
+    with profiled(name='nom_nom_test/contingency_table'):
+        codes1: ndarray = factorize(array(list1, dtype=object), use_na_sentinel=False)[0]
+        codes2: ndarray = factorize(array(list2, dtype=object), use_na_sentinel=False)[0]
+        contig_table: ndarray = contingency_table(codes1=codes1, codes2=codes2)
 
-    for i in range(len(list1)):
-        row_num: int = idx.index(list1[i])
-        col_num: int = cols.index(list2[i])
-        contig_table[row_num][col_num] += 1
+    too_small: bool = bool((contig_table < MIN_CHISQ_FREQ).any())
+    add_rejections(name=MIN_CHISQ_FREQ_KEY, n_rejected=too_small, n_total=1)
 
-    contig_table: DataFrame = DataFrame(contig_table, index=idx, columns=cols)
-
-    if (contig_table < MIN_CHISQ_FREQ).any().any():
+    if too_small:
         return float('inf')
 
-    p: float = chi2_contingency(contig_table)[1]
+    with profiled(name='nom_nom_test/chi2_contingency'):
+        p: float = chi2_contingency(contig_table)[1]
+
     return p
 
 
-def num_nom_test(numbers: list, categories) -> float:
-    """Computes correlation between a numeric and nominal variable using ANOVA or kruskal-wallis"""
+def contingency_table(codes1: ndarray, codes2: ndarray) -> ndarray:
+    """Builds the contingency table of two nominal columns from the integer codes of their categories with one bincount.
+    Only the categories that are present get a row or column in the table"""
 
-    table: list = split_numbers_by_category(numbers=numbers, categories=categories)
+    n_cols: int = codes2.max() + 1
+    counts: ndarray = bincount(codes1 * n_cols + codes2, minlength=(codes1.max() + 1) * n_cols)
+    contig_table: ndarray = counts.reshape(-1, n_cols)
+    return contig_table[contig_table.sum(axis=1) > 0][:, contig_table.sum(axis=0) > 0]
 
-    not_normal: bool = False
 
-    for group in table:
-        if len(group) < MIN_CAT_SIZE:
-            return float('inf')
+def num_nom_test(numbers: list, categories, category_codes: ndarray = None) -> float:
+    """Computes correlation between a numeric and nominal variable using ANOVA or kruskal-wallis. If the integer codes
+    of the categories are given, the numbers are split by those instead, which is much faster"""
+
+    with profiled(name='num_nom_test/split'):
+        if category_codes is None:
+            table: list = split_numbers_by_category(numbers=numbers, categories=categories)
+        else:
+            table: list = split_numbers_by_codes(numbers=numbers, codes=category_codes)
+
+    # Check the sizes of all the groups before their normality so the result does not depend on the order of the groups
+    too_small: bool = any(len(group) < MIN_CAT_SIZE for group in table)
+    add_rejections(name=MIN_CAT_SIZE_KEY, n_rejected=too_small, n_total=1)
+
+    if too_small:
+        return float('inf')
+
+    not_normal: bool = False
 
-        if not_normal_distribution(group):
-            not_normal: bool = True
-            break
+    with profiled(name='num_nom_test/normaltest'):
+        for group in table:
+            if not_normal_distribution(group):
+                not_normal: bool = True
+                break
 
     if not_normal:
-        p: float = kruskal(*table)[1]
+        with profiled(name='num_nom_test/kruskal'):
+            p: float = kruskal(*table)[1]
     else:
-        p: float = f_oneway(*table)[1]
+        with profiled(name='num_nom_test/f_oneway'):
+            p: float = f_oneway(*table)[1]
 
     return p
 
@@ -197,6 +234,15 @@ def split_numbers_by_category(numbers: list, categories: list) -> list:
     return table
 
 
+def split_numbers_by_codes(numbers: list, codes: ndarray) -> list:
+    """Splits a numerical variable by the corresponding integer codes of its categories"""
+
+    order: ndarray = argsort(codes, kind='stable')
+    counts: ndarray = bincount(codes)
+    counts: ndarray = counts[counts > 0]
+    return split(array(numbers)[order], cumsum(counts)[:-1])
+
+
 def not_normal_distribution(data: list) -> bool:
     """Checks if a numeric variable follows a normal distribution"""
 
@@ -211,8 +257,31 @@ def not_normal_distribution(data: list) -> bool:
 def num_num_test(list1: list, list2: list) -> float:
     """Computes a correlation coefficient between two numeric columns"""
 
-    if not_normal_distribution(data=list1) or not_normal_distribution(data=list2):
-        p: float = spearmanr(array(list1), array(list2))[1]
+    with profiled(name='num_num_test/normaltest'):
+        not_normal: bool = not_normal_distribution(data=list1) or not_normal_distribution(data=list2)
+
+    if not_normal:
+        with profiled(name='num_num_test/spearmanr'):
+            p: float = spearmanr(array(list1), array(list2))[1]
+    else:
+        with profiled(name='num_num_test/pearsonr'):
+            p: float = pearsonr(array(list1), array(list2))[1]
+
+    return p
+
+
+def cached_num_num_test(header1: str, header2: str, list1: list, list2: list, col_stats: ColStats) -> float:
+    """Computes the same correlation coefficient as num_num_test using the normality and ranks in the column
+    statistics"""
+
+    not_normal1: bool = col_stats.get_normality_p(header=header1) < NORMALITY_ALPHA
+    not_normal2: bool = col_stats.get_normality_p(header=header2) < NORMALITY_ALPHA
+
+    if not_normal1 or not_normal2:
+        # Spearman's correlation coefficient is the Pearson correlation coefficient of the ranks
+        ranks1: ndarray = col_stats.get_ranks(header=header1)
+        ranks2: ndarray = col_stats.get_ranks(header=header2)
+        p: float = pearsonr(ranks1, ranks2)[1]
     else:
         p: float = pearsonr(array(list1), array(list2))[1]
 